@@ -0,0 +1,62 @@
+"""citation_graph.CitationGraph 생성(간선 추출 + CSR + PageRank)과 특허별 공동 인용/서지 결합 조회 시간을 잽니다.
+
+노드 수와 특허당 데이터셋 안 인용 수를 정해 cited_lens_ids 컬럼을 합성합니다. (인용은 앞쪽 특허로 치우치게)
+실행: python benchmarks/bench_citation_graph.py --nodes 50000 --refs 10 40
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from citation_graph import CitationGraph  # noqa: E402
+from synthetic_patents import lens_id_of  # noqa: E402
+
+
+def make_dataset(num_nodes, refs_per_node, seed=0):
+    """특허 i는 평균 refs_per_node건의 앞쪽 특허와 같은 수의 데이터셋 밖 특허를 인용합니다."""
+    rng = np.random.default_rng(seed)
+    lens_ids = np.array([lens_id_of(i) for i in range(num_nodes)], dtype=object)
+    counts = rng.poisson(refs_per_node, num_nodes)
+    citing = np.repeat(np.arange(num_nodes), counts)
+    cited = (citing * rng.random(len(citing)) ** 0.5).astype(np.int64)   # 최근 특허일수록 덜 인용됨
+    outside = np.char.add("999-", rng.integers(0, 10**9, len(citing)).astype(str)).astype(object)
+    names = np.where(rng.random(len(citing)) < 0.5, lens_ids[cited], outside)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    cited_lens_ids = ['; '.join(names[bounds[i]:bounds[i + 1]]) for i in range(num_nodes)]
+    return pd.DataFrame({'lens_id': lens_ids, 'cited_lens_ids': cited_lens_ids, 'title': lens_ids})
+
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=50000)
+    parser.add_argument('--refs', type=float, nargs='+', default=[10, 40], help="특허당 평균 인용 수 (절반은 데이터셋 밖)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'노드':>8} {'간선':>10} {'생성(+PageRank)':>16} {'공동 인용 조회':>14} {'서지 결합 조회':>14}")
+    for refs in args.refs:
+        df = make_dataset(args.nodes, refs)
+        build = best_ms(lambda: CitationGraph(df), 1)
+        graph = CitationGraph(df)
+        node = int(np.argmax(graph.cited_in_corpus))   # 가장 많이 인용된 특허 (조회 비용이 가장 큼)
+        cocitation = best_ms(lambda: graph.cocitation(node), args.repeat)
+        coupling = best_ms(lambda: graph.coupling(node), args.repeat)
+        print(f"{args.nodes:>8,} {graph.num_edges:>10,} {build:>14,.0f}ms {cocitation:>12.1f}ms {coupling:>12.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""대시보드 지표 계산 시간을 기존 방식(재실행마다 전체 재계산)과 dashboard_metrics(데이터셋별 캐시)로 비교합니다.
+
+실행: python benchmarks/bench_dashboard.py --rows 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_excel_export import make_parquet  # noqa: E402
+from dashboard_metrics import compute_dashboard_metrics, get_dashboard_metrics  # noqa: E402
+from record_sinks import load_patents  # noqa: E402
+
+
+def legacy_metrics(df):
+    """main.py/create_dashboard가 재실행마다 하던 계산"""
+    unique_applicants = df['applicants'].str.split(';').str[0].str.strip().nunique()
+    avg_citations = df['cited_by_patent_count'].mean()
+    df['application_year'] = pd.to_numeric(df['application_year'], errors='coerce')
+    yearly_counts = df['application_year'].value_counts().sort_index()
+    applicant_counts = df['applicants'].str.split(';').str[0].str.strip().value_counts().nlargest(10)
+    nationality_counts = df['applicant_nationality'].value_counts().nlargest(15)
+    ipc_counts = df['main_ipc_field'].value_counts().nlargest(15)
+    top_cited = df.sort_values(by='cited_by_patent_count', ascending=False).head(10)
+    return unique_applicants, avg_citations, yearly_counts, applicant_counts, nationality_counts, ipc_counts, top_cited
+
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "patents.parquet")
+        make_parquet(path, args.rows)
+        df = load_patents(path)
+
+    print(f"{args.rows:,}행")
+    print(f"기존 방식 (재실행마다)      {best_ms(lambda: legacy_metrics(df.copy()), args.repeat):9.2f} ms")
+    print(f"지표 계산 (데이터셋당 1회)  {best_ms(lambda: compute_dashboard_metrics(df), args.repeat):9.2f} ms")
+    get_dashboard_metrics(df)
+    print(f"캐시 적중 (재실행마다)      {best_ms(lambda: get_dashboard_metrics(df), args.repeat):9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
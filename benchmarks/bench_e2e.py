@@ -0,0 +1,238 @@
+"""목업 Lens 서버(mock_lens_server.py)를 띄워 다운로드부터 대시보드 로딩까지 단계별 처리량을 잽니다.
+
+단계 (각각 별도 프로세스에서 실행해 최대 RSS(instrumentation.peak_rss_mb) 증가분을 최대 메모리로 봄):
+  download      get_total_hits + save_all_patents_to_csv(output_format='parquet')  (main.py 다운로드 경로)
+  parse         parse_patents_batch (HTTP 없이 미리 만든 페이지만)
+  csv_export    save_all_patents_to_csv(output_format='csv')
+  excel_export  excel_export.excel_file (download 단계의 Parquet)
+  dashboard     load_patents + 대시보드 지표 + 패싯 색인 + 인용 그래프
+보고: 레코드/초, 페이지/초, 최대 메모리(MB, import 이후 증가분), 첫 행까지 시간(TTFR)
+
+실행: python benchmarks/bench_e2e.py --docs 20000
+      python benchmarks/bench_e2e.py --docs 20000 --save-baseline local     (benchmarks/baselines/local.json)
+      python benchmarks/bench_e2e.py --docs 20000 --compare reference       (기준과 비교, 회귀가 있으면 종료 코드 1)
+      python benchmarks/bench_e2e.py --latency-ms 50 --error-429 0.05 --error-5xx 0.01   (지연/오류 주입)
+      for n in 0 1 2 4 8; do python benchmarks/bench_e2e.py --stages download --parse-workers $n; done   (파싱 프로세스 수별 처리량)
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from instrumentation import peak_rss_mb  # noqa: E402
+from mock_lens_server import add_server_arguments, server_options, start_server_process  # noqa: E402
+from synthetic_patents import make_page  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+STAGES = ("download", "parse", "csv_export", "excel_export", "dashboard")
+API_KEY = "bench-e2e"
+PAGE_SIZE = 100
+REGRESSION_TOLERANCE = 0.20   # 처리량이 이만큼 줄거나 최대 메모리/TTFR이 이만큼 늘면 회귀로 봄
+TTFR_NOISE_S = 0.02           # TTFR 차이가 이보다 작으면 비율이 커도 회귀로 보지 않음 (수 ms 단위는 잡음)
+
+
+def _pages_fetched():
+    from lens_client import transfer_stats
+    return sum(totals["pages"] for totals in transfer_stats.summary().values())
+
+
+class _FirstRow:
+    """on_records 콜백: 첫 레코드 묶음이 도착한 시각을 남깁니다."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def __call__(self, records):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self.start
+
+
+# --- 단계 (반환값: records, pages, ttfr 초). prepare_<단계>가 있으면 측정 전에 불러 입력을 만듭니다. ---
+def stage_download(workdir, num_docs, prepared=None):
+    from patent_searcher import get_total_hits, save_all_patents_to_csv
+    first_row = _FirstRow()
+    _, error = get_total_hits(API_KEY, {})
+    path, _, error = save_all_patents_to_csv(API_KEY, {}, output_format='parquet', on_records=first_row) if not error else (None, 0, error)
+    if error:
+        raise RuntimeError(error)
+    os.replace(path, os.path.join(workdir, "download.parquet"))
+    import pyarrow.parquet as pq
+    return pq.read_metadata(os.path.join(workdir, "download.parquet")).num_rows, _pages_fetched(), first_row.seconds
+
+
+def prepare_parse(workdir, num_docs):
+    return [make_page(start, min(PAGE_SIZE, num_docs - start)) for start in range(0, num_docs, PAGE_SIZE)]
+
+
+def stage_parse(workdir, num_docs, pages):
+    from batch_parser import parse_patents_batch
+    start, ttfr, records = time.perf_counter(), None, 0
+    for page in pages:
+        records += len(parse_patents_batch(page))
+        ttfr = ttfr or time.perf_counter() - start
+    return records, len(pages), ttfr
+
+
+def stage_csv_export(workdir, num_docs, prepared=None):
+    from patent_searcher import save_all_patents_to_csv
+    first_row, num_records = _FirstRow(), 0
+    path, _, error = save_all_patents_to_csv(API_KEY, {}, output_format='csv', on_records=first_row)
+    if error:
+        raise RuntimeError(error)
+    with open(path, encoding='utf-8-sig') as f:
+        num_records = sum(1 for _ in f) - 1
+    os.remove(path)
+    return num_records, _pages_fetched(), first_row.seconds
+
+
+def stage_excel_export(workdir, num_docs, prepared=None):
+    import pyarrow.parquet as pq
+    from excel_export import excel_file
+    path = os.path.join(workdir, "download.parquet")
+    with excel_file(path):
+        pass
+    return pq.read_metadata(path).num_rows, 0, None
+
+
+def stage_dashboard(workdir, num_docs, prepared=None):
+    from citation_graph import get_citation_graph
+    from dashboard_metrics import get_dashboard_metrics
+    from facet_index import get_facet_index
+    from record_sinks import load_patents
+    start = time.perf_counter()
+    df = load_patents(os.path.join(workdir, "download.parquet"))
+    ttfr = time.perf_counter() - start
+    get_dashboard_metrics(df)
+    get_facet_index(df)
+    get_citation_graph(df)
+    return len(df), 0, ttfr
+
+
+def _run_stage(stage, workdir, num_docs, api_url, result_queue, parse_workers=0):
+    os.environ["LENS_API_URL"] = api_url   # lens_client가 import될 때 읽으므로 그 전에 설정
+    import batch_parser, excel_export, lens_client, openpyxl, pandas, patent_searcher, record_sinks  # noqa: F401,E401  (import 비용은 측정에서 제외)
+    import parallel_parse
+    parallel_parse.configure(parse_workers)
+    if parse_workers:  # 워커 프로세스 시작 비용도 측정에서 제외
+        list(parallel_parse.get_parse_pool(parse_workers).map(abs, range(parse_workers * 4)))
+    try:
+        prepare = globals().get(f"prepare_{stage}")
+        prepared = prepare(workdir, num_docs) if prepare else None
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        records, pages, ttfr = globals()[f"stage_{stage}"](workdir, num_docs, prepared)
+        seconds = time.perf_counter() - start
+        result_queue.put({"records": records, "pages": pages, "seconds": round(seconds, 3),
+                          "records_per_sec": round(records / seconds, 1), "pages_per_sec": round(pages / seconds, 1) if pages else None,
+                          "peak_rss_mb": round(peak_rss_mb() - baseline, 1), "ttfr_s": round(ttfr, 4) if ttfr is not None else None})
+    except Exception as e:
+        result_queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def measure(stage, workdir, num_docs, api_url, repeat=1, parse_workers=0):
+    """단계를 repeat번 (매번 새 프로세스에서) 실행해 가장 빠른 결과를 돌려줍니다."""
+    best = None
+    for _ in range(repeat):
+        result_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_run_stage, args=(stage, workdir, num_docs, api_url, result_queue, parse_workers))
+        process.start()
+        result = result_queue.get()
+        process.join()
+        if "error" in result:
+            return result
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+# --- 기준 저장/비교 ---
+def save_baseline(name, report):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    """단계별 변화율을 출력하고 회귀 목록을 돌려줍니다. (처리량은 감소, 메모리/TTFR은 증가가 나쁨)"""
+    if baseline["config"] != report["config"]:
+        print(f"주의: 측정 조건이 기준과 다릅니다. 기준 {baseline['config']}")
+    regressions = []
+    for stage, result in report["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before or "error" in result or "error" in before:
+            continue
+        cells = []
+        for metric, higher_is_better in (("records_per_sec", True), ("peak_rss_mb", False), ("ttfr_s", False)):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            noise = metric == "ttfr_s" and abs(new - old) < TTFR_NOISE_S
+            flag = " ▼" if worse > tolerance and not noise else ""
+            if flag:
+                regressions.append(f"{stage}.{metric}")
+            cells.append(f"{metric} {old:g} -> {new:g} ({change:+.0%}){flag}")
+        print(f"  {stage:<13} " + "  ".join(cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_server_arguments(parser)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--save-baseline', metavar='NAME', help="결과를 benchmarks/baselines/NAME.json으로 저장")
+    parser.add_argument('--compare', metavar='NAME', help="benchmarks/baselines/NAME.json과 비교")
+    parser.add_argument('--repeat', type=int, default=3, help="단계마다 반복 실행해 가장 빠른 결과를 씀")
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument('--parse-workers', type=int, default=0, help="download/csv_export 단계의 파싱 프로세스 수 (0이면 다운로드 스레드에서 파싱)")
+    args = parser.parse_args()
+    if args.docs > 50000:
+        parser.error("save_all_patents_to_csv는 50,000건까지만 받습니다. --docs를 50000 이하로 주세요.")
+    if {'excel_export', 'dashboard'} & set(args.stages) and 'download' not in args.stages:
+        parser.error("excel_export/dashboard 단계는 download 단계의 결과 파일을 씁니다.")
+
+    server, api_url = start_server_process(args.docs, args.source, **server_options(args))
+    report = {"config": {"docs": args.docs, "source": args.source, "repeat": args.repeat, **server_options(args),
+                         **({"parse_workers": args.parse_workers} if args.parse_workers else {})},
+              "environment": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+              "stages": {}}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for stage in STAGES:
+                if stage not in args.stages:
+                    continue
+                result = report["stages"][stage] = measure(stage, workdir, args.docs, api_url, args.repeat, args.parse_workers)
+                if "error" in result:
+                    print(f"{stage:<13} 실패: {result['error']}")
+                    continue
+                pages = f"{result['pages_per_sec']:8,.1f} 페이지/초" if result['pages_per_sec'] else " " * 16
+                ttfr = f"TTFR {result['ttfr_s'] * 1000:8.1f} ms" if result['ttfr_s'] is not None else ""
+                print(f"{stage:<13} {result['records']:>8,}건 {result['seconds']:7.2f}초  {result['records_per_sec']:10,.0f} 건/초"
+                      f"  {pages}  최대 메모리 +{result['peak_rss_mb']:7.1f} MB  {ttfr}")
+    finally:
+        server.terminate()
+
+    if args.save_baseline:
+        print(f"기준 저장: {save_baseline(args.save_baseline, report)}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json"), encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"기준 '{args.compare}'과 비교 (허용 {args.tolerance:.0%}):")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"회귀: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
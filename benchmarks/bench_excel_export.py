@@ -0,0 +1,76 @@
+"""엑셀 내보내기의 최대 메모리(RSS)를 기존 방식(DataFrame 전체 -> BytesIO)과 excel_export.write_excel(스트리밍)으로 비교합니다.
+
+합성 특허로 행 수별 Parquet을 만든 뒤, 측정마다 별도 프로세스에서 실행해 최대 RSS(instrumentation.peak_rss_mb) 증가분을 봅니다.
+실행: python benchmarks/bench_excel_export.py --rows 5000 50000
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from batch_parser import parse_patents_batch  # noqa: E402
+from instrumentation import peak_rss_mb  # noqa: E402
+from record_sinks import ParquetSink  # noqa: E402
+from synthetic_patents import make_page  # noqa: E402
+
+
+def make_parquet(path, num_rows):
+    sink = ParquetSink(path)
+    for start in range(0, num_rows, 1000):
+        sink.writerows(parse_patents_batch(make_page(start, min(1000, num_rows - start))))
+    sink.close()
+
+
+def export_in_memory(path):
+    import pandas as pd
+    from record_sinks import load_patents
+    df_all = load_patents(path)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer: df_all.to_excel(writer, index=False, sheet_name='Sheet1')
+    return len(output.getvalue())
+
+
+def export_streaming(path):
+    from excel_export import excel_file
+    with excel_file(path) as f:
+        return os.fstat(f.fileno()).st_size
+
+
+def _run(func_name, path, result_queue):
+    import excel_export, openpyxl, pandas, record_sinks  # noqa: F401  (import 비용은 측정에서 제외)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    size = globals()[func_name](path)
+    result_queue.put((peak_rss_mb() - baseline, time.perf_counter() - start, size))
+
+
+def measure(func_name, path):
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(func_name, path, result_queue))
+    process.start()
+    result = result_queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000, 50000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_rows in args.rows:
+            path = os.path.join(tmp, f"patents_{num_rows}.parquet")
+            make_parquet(path, num_rows)
+            for func_name in ("export_in_memory", "export_streaming"):
+                peak_mb, seconds, size = measure(func_name, path)
+                print(f"{num_rows:>8,}행  {func_name:<18} 최대 메모리 +{peak_mb:7.1f} MB  {seconds:6.1f}초  파일 {size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""다값 필드 교차 필터(출원인 하나를 고르고 그 출원인의 CPC 서브클래스 구성 보기) 시간을
+문자열 스캔(str.split/str.contains) 방식과 facet_index.FacetIndex로 비교합니다.
+
+실행: python benchmarks/bench_facets.py --rows 50000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_excel_export import make_parquet  # noqa: E402
+from facet_index import FacetIndex  # noqa: E402
+from record_sinks import load_patents  # noqa: E402
+
+
+def scan_cross_filter(df, applicant):
+    """문자열 스캔: 출원인 목록에 applicant가 있는 행의 CPC 서브클래스별 건수"""
+    selected = df[df['applicants'].str.split('; ').apply(lambda names: applicant in names)]
+    return selected['cpc_classifications'].str.split('; ').explode().str[:4].groupby(level=0).unique().explode().value_counts()
+
+
+def index_cross_filter(index, applicant):
+    return index.counts('cpc_subclass', index.select({'applicant': [applicant]}))
+
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'행 수':>8} {'색인 생성':>10} {'스캔 방식':>10} {'색인 방식':>10} {'배율':>7}")
+    for num_rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "patents.parquet")
+            make_parquet(path, num_rows)
+            df = load_patents(path)
+
+        build_ms = best_ms(lambda: FacetIndex(df), 1)
+        index = FacetIndex(df)
+        applicant = index.counts('applicant', top=1).index[0]
+
+        # 두 방식의 결과가 같아야 비교가 의미 있음
+        expected = scan_cross_filter(df, applicant)
+        actual = index_cross_filter(index, applicant)
+        assert expected.sort_index().to_dict() == actual.sort_index().to_dict(), "교차 필터 결과 불일치"
+
+        scan = best_ms(lambda: scan_cross_filter(df, applicant), args.repeat)
+        indexed = best_ms(lambda: index_cross_filter(index, applicant), args.repeat)
+        print(f"{num_rows:>8,} {build_ms:>8.0f}ms {scan:>8.1f}ms {indexed:>8.2f}ms {scan / indexed:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
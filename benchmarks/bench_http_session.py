@@ -0,0 +1,114 @@
+"""요청마다 새 연결을 여는 기존 방식(requests.post)과 LensClient(커넥션 풀 세션)의 요청당 지연 시간을 비교합니다.
+
+기본은 로컬 테스트 서버를 띄워 측정하며, --handshake-ms로 새 연결마다 드는 TCP+TLS 수립 비용을 흉내 냅니다.
+실제 API로 측정하려면: python benchmarks/bench_http_session.py --url https://api.lens.org/patent/search --api-key KEY -n 20
+"""
+import argparse
+import gzip
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lens_client import LensClient  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+
+
+def make_page(num_records=100):
+    patents = [{"lens_id": f"000-000-{i:03d}", "jurisdiction": "US", "doc_number": str(i),
+                "biblio": {"invention_title": [{"text": f"Synthetic patent {i}"}]},
+                "abstract": [{"text": "lorem ipsum " * 80}]} for i in range(num_records)]
+    return json.dumps({"total": num_records, "data": patents}).encode('utf-8')
+
+
+def start_local_server(handshake_ms):
+    page = make_page()
+    page_gzip = gzip.compress(page)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive 허용
+
+        def setup(self):
+            super().setup()
+            self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            time.sleep(handshake_ms / 1000)  # 새 연결 1회당 수립 비용 흉내
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            body = page_gzip if use_gzip else page
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/patent/search"
+
+
+def measure(label, call, n):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - t) * 1000)
+    total = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<28} mean {statistics.mean(latencies):8.2f} ms | p50 {statistics.median(latencies):8.2f} ms | "
+          f"p95 {p95:8.2f} ms | 합계 {total:7.2f} s")
+    return statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="측정할 검색 API 주소 (생략 시 로컬 서버)")
+    parser.add_argument('--api-key', default='benchmark')
+    parser.add_argument('-n', type=int, default=200, help="방식별 요청 횟수")
+    parser.add_argument('--handshake-ms', type=float, default=30.0, help="로컬 서버에서 새 연결마다 더할 지연(ms)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_local_server(args.handshake_ms)
+        print(f"로컬 서버 {url} (새 연결당 {args.handshake_ms:.0f} ms)")
+
+    payload = {"query": {"match_all": {}}, "size": 100}
+    headers = {'Authorization': f'Bearer {args.api_key}', 'Content-Type': 'application/json'}
+
+    def per_call():
+        response = requests.post(url, headers=headers, data=json.dumps(payload), timeout=30)
+        response.raise_for_status()
+        response.json()
+
+    # 속도 제한이 측정에 끼지 않도록 넉넉한 limiter를 사용 (실제 API 측정 시에는 기본 limiter 권장)
+    limiter = RateLimiter(requests_per_second=1e6, burst=1e6) if server else None
+    client = LensClient(args.api_key, base_url=url, rate_limiter=limiter)
+
+    baseline = measure("requests.post (요청마다 연결)", per_call, args.n)
+    pooled = measure("LensClient (커넥션 풀)", lambda: client.search(payload), args.n)
+    print(f"요청당 절감: {baseline - pooled:.2f} ms ({(1 - pooled / baseline) * 100:.0f}%)")
+
+    client.close()
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""일괄 파싱 이전의 레코드 단위 파서(baseline_parse_patent)와 parse_patents_batch의 처리량(records/sec)을 비교합니다.
+
+parse_patent는 이제 parse_patents_batch를 감싼 함수라 기준이 될 수 없으므로, 바꾸기 전의 parse_patent를 여기에 그대로 얼려 두고
+측정 전에 두 파서의 결과가 픽스처 페이지에서 같은지 확인합니다.
+
+benchmarks/fixtures/*.json.gz 의 기록된 페이지를 사용합니다. (record_fixtures.py로 추가 기록 가능)
+실행: python benchmarks/bench_parser.py [--repeat 20]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch_parser import _parse_date, parse_patents_batch  # noqa: E402
+from dedup import simple_family_id  # noqa: E402
+from projections import get_profile  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def baseline_parse_patent(patent_json, include_raw=False, profile=None):
+    """일괄 파싱 이전의 parse_patent (비교 기준으로 고정한 사본, 레코드마다 strptime/현재 연도/프로필 조회를 반복함)"""
+    biblio = patent_json.get('biblio', {})
+    legal = patent_json.get('legal_status', {})
+    parties = biblio.get('parties', {})
+    application_ref = biblio.get('application_reference', {})
+    families = patent_json.get('families', {})
+
+    applicants_list = parties.get('applicants', [])
+    inventors_list = parties.get('inventors', [])
+    ipc_list = biblio.get('classifications_ipcr', {}).get('classifications', [])
+    cpc_list = biblio.get('classifications_cpc', {}).get('classifications', [])
+    priority_claims = biblio.get('priority_claims', {}).get('claims', [])
+    references_cited = biblio.get('references_cited', {})
+    cited_by = biblio.get('cited_by', {})
+
+    application_date_str = application_ref.get('date')
+    publication_date_str = patent_json.get('date_published')
+    grant_date_str = legal.get('grant_date')
+    abstract_list = patent_json.get('abstract', [])
+    abstract_text = abstract_list[0].get('text') if abstract_list else None
+
+    original_applicant_residence = applicants_list[0].get('residence') if applicants_list else None
+    original_priority_country = priority_claims[0].get('jurisdiction') if priority_claims else None
+
+    final_applicant_nationality = original_applicant_residence or original_priority_country or 'N/A'
+    application_year = application_date_str[:4] if application_date_str else 'N/A'
+    main_ipc_field = ipc_list[0].get('symbol')[:4] if ipc_list else 'N/A'
+    num_applicants = len(applicants_list)
+    is_co_owned = num_applicants > 1
+
+    time_to_grant_days = None
+    if grant_date_str and application_date_str:
+        try:
+            time_to_grant_days = (datetime.strptime(grant_date_str, "%Y-%m-%d") - datetime.strptime(application_date_str, "%Y-%m-%d")).days
+        except: pass
+
+    cited_by_patent_count = cited_by.get('patent_count', 0)
+    citations_per_year = 0.0
+    if cited_by_patent_count > 0 and publication_date_str:
+        try:
+            citations_per_year = cited_by_patent_count / (datetime.now().year - int(publication_date_str[:4]) + 1)
+        except: pass
+
+    citation_patent_count = references_cited.get('patent_count', 0)
+    citation_npl_count = references_cited.get('npl_count', 0)
+    total_citations = citation_patent_count + citation_npl_count
+    science_linkage_ratio = (citation_npl_count / total_citations) if total_citations > 0 else 0.0
+
+    parsed = {
+        'title': biblio.get('invention_title', [{}])[0].get('text'),
+        'abstract': abstract_text,
+        'applicants': '; '.join([p.get('extracted_name', {}).get('value', '') for p in applicants_list]),
+        'inventors': '; '.join([p.get('extracted_name', {}).get('value', '') for p in inventors_list]),
+        'application_date': application_date_str,
+        'publication_date': publication_date_str,
+        'grant_date': grant_date_str,
+        'application_year': application_year,
+        'publication_number': patent_json.get('doc_number'),
+        'application_number': application_ref.get('doc_number'),
+        'jurisdiction': patent_json.get('jurisdiction'),
+        'applicant_nationality': final_applicant_nationality,
+        'SOURCE_applicant_residence': original_applicant_residence,
+        'SOURCE_priority_country': original_priority_country,
+        'main_ipc_field': main_ipc_field,
+        'ipc_classifications': '; '.join([c.get('symbol') for c in ipc_list]),
+        'cpc_classifications': '; '.join([c.get('symbol') for c in cpc_list]),
+        'lens_id': patent_json.get('lens_id'),
+        'is_granted': legal.get('granted'),
+        'patent_status': legal.get('patent_status'),
+        'cited_by_patent_count': cited_by_patent_count,
+        'citation_patent_count': citation_patent_count,
+        'citation_npl_count': citation_npl_count,
+        'total_citations': total_citations,
+        'cited_lens_ids': '; '.join([c['patcit']['lens_id'] for c in references_cited.get('citations', [])
+                                     if c.get('patcit', {}).get('lens_id')]),
+        'citations_per_year': round(citations_per_year, 2),
+        'science_linkage_ratio': round(science_linkage_ratio, 2),
+        'time_to_grant_days': time_to_grant_days,
+        'num_applicants': num_applicants,
+        'is_co_owned': is_co_owned,
+        'simple_family_size': families.get('simple_family', {}).get('size'),
+        'simple_family_id': simple_family_id(patent_json),
+    }
+    if profile:
+        for column in get_profile(profile)["null_columns"]:
+            parsed[column] = None
+    if include_raw:
+        parsed['raw_json'] = json.dumps(patent_json, ensure_ascii=False)
+    return parsed
+
+
+def load_fixture_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json.gz"))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            pages.append(json.load(f)["data"])
+    return pages
+
+
+def measure(label, parse_pages, pages, repeat):
+    num_records = sum(len(page) for page in pages)
+    best = float('inf')
+    for _ in range(repeat):
+        _parse_date.cache_clear() # 반복 측정 사이에 날짜 캐시가 남지 않도록 매번 비움
+        start = time.perf_counter()
+        parse_pages(pages)
+        best = min(best, time.perf_counter() - start)
+    rate = num_records / best
+    print(f"{label:<24} {rate:>12,.0f} records/sec  (최단 {best * 1000:.1f} ms / {num_records:,}건)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--include-raw', action='store_true', help="raw_json 직렬화까지 포함해 측정")
+    args = parser.parse_args()
+
+    pages = load_fixture_pages()
+    if not pages:
+        sys.exit("픽스처가 없습니다. 먼저 python benchmarks/record_fixtures.py --synthetic 을 실행하세요.")
+
+    # 두 파서의 결과가 같아야 비교가 의미 있음
+    for page in pages:
+        assert parse_patents_batch(page, args.include_raw) == [baseline_parse_patent(p, args.include_raw) for p in page], "파서 결과 불일치"
+
+    old = measure("baseline_parse_patent", lambda ps: [[baseline_parse_patent(p, args.include_raw) for p in page] for page in ps],
+                  pages, args.repeat)
+
+    new = measure("parse_patents_batch", lambda ps: [parse_patents_batch(page, args.include_raw) for page in ps], pages, args.repeat)
+    print(f"속도 향상: {new / old:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""projection 프로필별 페이지당 전송량(bytes/page)을 비교합니다.
+
+기본(오프라인): benchmarks/fixtures/*.json.gz 의 기록된 페이지에 프로필의 include를 적용해
+JSON 크기와 gzip 압축 크기(응답이 압축돼 전송될 때의 근사치)를 잽니다.
+--api-key를 주면 실제 Lens API에 프로필마다 한 페이지씩 요청해 응답 크기와 응답 시간을 잽니다.
+실행: python benchmarks/bench_projection.py [--api-key KEY] [--query "battery"] [--size 100]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lens_client import get_client, transfer_stats  # noqa: E402
+from projections import PROFILES, project_document  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json.gz"))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            pages.append(json.load(f)["data"])
+    return pages
+
+
+def measure_offline(pages):
+    print(f"{'프로필':<14} {'JSON bytes/page':>16} {'gzip bytes/page':>16} {'대비(raw archive)':>18}")
+    results = {}
+    for name, profile in PROFILES.items():
+        sizes = [json.dumps({"data": [project_document(doc, profile["include"]) for doc in page]}, ensure_ascii=False).encode('utf-8')
+                 for page in pages]
+        results[name] = (sum(map(len, sizes)) / len(sizes), sum(len(gzip.compress(s)) for s in sizes) / len(sizes))
+    baseline = results["raw archive"][0]
+    for name, (raw_bytes, gzip_bytes) in results.items():
+        print(f"{name:<14} {raw_bytes:>16,.0f} {gzip_bytes:>16,.0f} {raw_bytes / baseline:>17.0%}")
+
+
+def measure_live(api_key, query, size):
+    client = get_client(api_key)
+    for name, profile in PROFILES.items():
+        client.search({"query": {"query_string": {"query": query}}, "size": size, "include": profile["include"]}, label=name)
+    print(f"{'프로필':<14} {'bytes/page':>12} {'wire bytes/page':>16} {'ms/page':>9}")
+    for name, stat in transfer_stats.summary().items():
+        print(f"{name:<14} {stat['bytes_per_page']:>12,.0f} {stat['wire_bytes_per_page']:>16,.0f} {stat['ms_per_page']:>9,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--api-key', help="실제 API로 측정 (없으면 픽스처로 오프라인 측정)")
+    parser.add_argument('--query', default="battery")
+    parser.add_argument('--size', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.api_key:
+        measure_live(args.api_key, args.query, args.size)
+        return
+    pages = load_fixture_pages()
+    if not pages:
+        sys.exit("픽스처가 없습니다. 먼저 python benchmarks/record_fixtures.py --synthetic 을 실행하세요.")
+    measure_offline(pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Lens /patent/search를 흉내 내는 로컬 HTTP 서버 (API 키/쿼터 없이 다운로드 경로를 측정하기 위한 것).
+
+지원: size, include(projections.project_document로 필드 투영), scroll/scroll_id(끝나면 204), size=0 건수 조회,
+      검색식 중 match_all / bool.must / bool.must_not / range·exists(date_published, application_reference.date,
+      legal_status.grant_date) / terms(lens_id) / term(legal_status.granted). 그 밖의 조건(query_string, match 등)은 모든 문서에 맞는 것으로 봅니다.
+주입: 요청마다 지연(--latency-ms), 확률적 429(retry-after 헤더 포함)/503, 분당 요청 한도(--rpm, 남은 요청 수 헤더).
+문서: 합성 특허(synthetic_patents.make_patent) 또는 기록된 픽스처(fixtures/*.json.gz)를 lens_id만 바꿔 반복 재생.
+
+단독 실행: python benchmarks/mock_lens_server.py --docs 50000 --port 8765
+  → LENS_API_URL=http://127.0.0.1:8765/patent/search streamlit run main.py  (API 키는 아무 값)
+"""
+import argparse
+import glob
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from projections import project_document  # noqa: E402
+from synthetic_patents import lens_id_of, make_patent  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DATE_FIELDS = {
+    "date_published": lambda doc: doc.get("date_published"),
+    "application_reference.date": lambda doc: doc.get("biblio", {}).get("application_reference", {}).get("date"),
+    "legal_status.grant_date": lambda doc: doc.get("legal_status", {}).get("grant_date"),
+}
+
+
+def load_corpus(num_docs, source='synthetic'):
+    """num_docs개의 특허 문서. source='recorded'면 기록된 픽스처를 돌려 쓰되 lens_id는 문서마다 다르게 바꿉니다."""
+    if source == 'synthetic':
+        return [make_patent(i) for i in range(num_docs)]
+    recorded = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json.gz"))):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            recorded.extend(json.load(f)["data"])
+    if not recorded:
+        sys.exit("픽스처가 없습니다. 먼저 python benchmarks/record_fixtures.py 를 실행하세요.")
+    return [dict(recorded[i % len(recorded)], lens_id=lens_id_of(i)) for i in range(num_docs)]
+
+
+class MockLensState:
+    """코퍼스, include별 직렬화 캐시, scroll 컨텍스트, 요청 한도/오류 주입 상태 (핸들러 스레드들이 공유)."""
+
+    def __init__(self, docs, latency_ms=0.0, error_429=0.0, error_5xx=0.0, retry_after=0.05, rpm=60000, seed=0):
+        self.docs = docs
+        self.lens_ids = {doc["lens_id"]: i for i, doc in enumerate(docs)}
+        self.dates = {field: np.array([get(doc) or '' for doc in docs]) for field, get in DATE_FIELDS.items()}
+        self.granted = np.array([bool(doc.get("legal_status", {}).get("granted")) for doc in docs])
+        self.latency = latency_ms / 1000
+        self.error_429, self.error_5xx, self.retry_after = error_429, error_5xx, retry_after
+        self.rpm = rpm
+        self._random = random.Random(seed)
+        self._serialized = {}     # include 키 -> 문서별 JSON bytes (처음 요청될 때 채움)
+        self._scrolls = {}        # scroll_id -> (남은 문서 번호, include 키, size)
+        self._window = deque()    # 최근 1분 요청 시각
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def doc_bytes(self, indices, include):
+        key = tuple(include) if include else None
+        with self._lock:
+            cache = self._serialized.setdefault(key, {})
+        parts = []
+        for i in indices:
+            data = cache.get(i)
+            if data is None:
+                doc = project_document(self.docs[i], include) if include else self.docs[i]
+                data = cache[i] = json.dumps(doc, ensure_ascii=False).encode('utf-8')
+            parts.append(data)
+        return parts
+
+    def match(self, query):
+        """검색식 -> 맞는 문서 번호 배열"""
+        return np.flatnonzero(self._mask(query))
+
+    def _mask(self, query):
+        n = len(self.docs)
+        if "bool" in query:
+            mask = np.ones(n, dtype=bool)
+            for clause in query["bool"].get("must", []):
+                mask &= self._mask(clause)
+            for clause in query["bool"].get("must_not", []):
+                mask &= ~self._mask(clause)
+            return mask
+        if "exists" in query:
+            values = self.dates.get(query["exists"]["field"])
+            return np.ones(n, dtype=bool) if values is None else values != ''
+        if "range" in query:
+            (field, bounds), = query["range"].items()
+            values = self.dates.get(field)
+            if values is None:
+                return np.ones(n, dtype=bool)
+            mask = values != ''
+            if "gte" in bounds: mask &= values >= bounds["gte"]
+            if "lte" in bounds: mask &= values <= bounds["lte"]
+            return mask
+        if "terms" in query and "lens_id" in query["terms"]:
+            mask = np.zeros(n, dtype=bool)
+            mask[[self.lens_ids[i] for i in query["terms"]["lens_id"] if i in self.lens_ids]] = True
+            return mask
+        if "term" in query and "legal_status.granted" in query["term"]:
+            return self.granted == bool(query["term"]["legal_status.granted"])
+        return np.ones(n, dtype=bool)
+
+    def admit(self):
+        """오류 주입과 분당 한도 확인. 반환값: (상태 코드 또는 None, 추가 헤더)"""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if self.rpm and len(self._window) >= self.rpm:
+                return 429, {"x-rate-limit-retry-after-seconds": f"{60 - (now - self._window[0]):.3f}"}
+            roll = self._random.random()
+            if roll < self.error_429:
+                return 429, {"x-rate-limit-retry-after-seconds": f"{self.retry_after:.3f}"}
+            if roll < self.error_429 + self.error_5xx:
+                return 503, {}
+            self._window.append(now)
+            remaining = self.rpm - len(self._window) if self.rpm else 10**6
+            return None, {"x-rate-limit-remaining-request-per-minute": str(remaining)}
+
+    def search(self, payload):
+        """요청 payload -> (상태 코드, 응답 bytes)"""
+        if "scroll_id" in payload:
+            with self._lock:
+                context = self._scrolls.get(payload["scroll_id"])
+                if context is not None:
+                    remaining, include, size = context
+                    page, rest = remaining[:size], remaining[size:]
+                    if len(page):
+                        self._scrolls[payload["scroll_id"]] = (rest, include, size)
+                    else:
+                        del self._scrolls[payload["scroll_id"]]
+            if context is None or not len(page):
+                return 204, b''
+            return 200, self._body(page, include, total=0, scroll_id=payload["scroll_id"])
+
+        hits = self.match(payload.get("query", {"match_all": {}}))
+        size, include = payload.get("size", 10), payload.get("include")
+        page = hits[:size]
+        scroll_id = None
+        if "scroll" in payload and size:
+            scroll_id = uuid.uuid4().hex
+            with self._lock:
+                self._scrolls[scroll_id] = (hits[size:], include, size)
+        return 200, self._body(page, include, total=len(hits), scroll_id=scroll_id)
+
+    def _body(self, page, include, total, scroll_id):
+        head = json.dumps({"total": total, **({"scroll_id": scroll_id} if scroll_id else {})})[:-1].encode('utf-8')
+        return head + b', "data": [' + b','.join(self.doc_bytes(page, include)) + b']}'
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive (LensClient 커넥션 풀 재사용)
+        disable_nagle_algorithm = True  # 헤더와 본문을 따로 쓰므로 (Nagle + delayed ACK로 응답마다 40ms 지연되지 않도록)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if state.latency:
+                time.sleep(state.latency)
+            status, headers = state.admit()
+            body = b''
+            if status is None:
+                status, body = state.search(payload)
+            if status == 200 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=1)
+                headers['Content-Encoding'] = 'gzip'
+            elif status >= 400:
+                body = json.dumps({"message": f"mock error {status}"}).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=0, num_docs=20000, source='synthetic', ready=None, **options):
+    """서버를 띄우고 요청을 처리합니다. ready(Queue)를 주면 준비된 뒤 주소를 넣어 줍니다."""
+    state = MockLensState(load_corpus(num_docs, source), **options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    url = f"http://127.0.0.1:{server.server_address[1]}/patent/search"
+    if ready is not None:
+        ready.put(url)
+    server.serve_forever()
+
+
+def start_server_process(num_docs=20000, source='synthetic', **options):
+    """별도 프로세스에서 서버를 띄워 (프로세스, 주소)를 돌려줍니다. (측정 대상과 GIL을 나눠 쓰지 않도록)"""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, kwargs=dict(num_docs=num_docs, source=source, ready=ready, **options),
+                                      daemon=True)
+    process.start()
+    return process, ready.get(timeout=600)
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--docs', type=int, default=20000, help="코퍼스 문서 수")
+    parser.add_argument('--source', choices=['synthetic', 'recorded'], default='synthetic')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="요청마다 더할 서버 지연")
+    parser.add_argument('--error-429', type=float, default=0.0, help="429 응답 확률")
+    parser.add_argument('--error-5xx', type=float, default=0.0, help="503 응답 확률")
+    parser.add_argument('--retry-after', type=float, default=0.05, help="주입한 429의 retry-after 초")
+    parser.add_argument('--rpm', type=int, default=60000, help="분당 요청 한도 (0이면 무제한)")
+
+
+def server_options(args):
+    return dict(latency_ms=args.latency_ms, error_429=args.error_429, error_5xx=args.error_5xx,
+                retry_after=args.retry_after, rpm=args.rpm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    ready = multiprocessing.Queue()
+    threading.Thread(target=lambda: print(f"Mock Lens 서버: {ready.get()} ({args.docs:,}건)", flush=True), daemon=True).start()
+    serve(args.port, args.docs, args.source, ready=ready, **server_options(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""파서 벤치마크용 픽스처 페이지를 benchmarks/fixtures/ 에 기록합니다.
+
+실제 API 응답 기록: python benchmarks/record_fixtures.py --api-key KEY --query "battery" --pages 5
+합성 문서 기록:     python benchmarks/record_fixtures.py --synthetic --pages 5
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def write_page(name, patents):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, f"{name}.json.gz")
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump({"data": patents}, f, ensure_ascii=False)
+    print(f"{path}: {len(patents)}건")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--api-key')
+    parser.add_argument('--query', default='battery', help="일반 검색어 (title/abstract)")
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--synthetic', action='store_true')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from synthetic_patents import make_page
+        for n in range(args.pages):
+            write_page(f"synthetic_page_{n:02d}", make_page(n * 100, 100))
+        return
+
+    if not args.api_key:
+        parser.error("--api-key 또는 --synthetic 중 하나가 필요합니다.")
+    from patent_searcher import iter_patent_pages
+    search_params = {"query_type": "simple", "search_term": args.query, "search_fields": ["title", "abstract"]}
+    pages = iter_patent_pages(args.api_key, search_params, limit=args.pages * 100, parse_page=None)
+    for n, (patents, _) in enumerate(pages):
+        write_page(f"recorded_page_{n:02d}", patents)
+
+
+if __name__ == '__main__':
+    main()
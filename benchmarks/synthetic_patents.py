@@ -0,0 +1,76 @@
+"""Lens /patent/search 응답 형식을 흉내 낸 합성 특허 문서 생성기 (벤치마크/목업 서버용)."""
+import random
+from datetime import date, timedelta
+
+JURISDICTIONS = ["US", "KR", "JP", "CN", "EP", "WO", "DE"]
+IPC_SYMBOLS = ["H01M10/0525", "H01M4/131", "G06N3/04", "G06N20/00", "H04W72/04", "A61K31/00", "B60L58/12", "C01B32/05"]
+STATUSES = ["ACTIVE", "PENDING", "EXPIRED", "DISCONTINUED", "PATENTED"]
+CITE_WINDOW = 20000
+WORDS = ("battery electrode lithium solid state electrolyte neural network semiconductor wafer signal "
+         "antenna vehicle charging polymer composite catalyst sensor").split()
+
+
+def _iso(d):
+    return d.isoformat()
+
+
+def lens_id_of(i):
+    """i번째 합성 특허의 lens_id"""
+    return f"{i // 10**12 % 1000:03d}-{i // 10**9 % 1000:03d}-{i // 10**6 % 1000:03d}-{i // 1000 % 1000:03d}-{i % 1000:03d}"
+
+
+def _cited_lens_id(i, rng):
+    """인용 대상: 절반은 바로 앞쪽(최근 CITE_WINDOW건)의 합성 특허, 나머지는 데이터셋 밖의 특허"""
+    if i and rng.random() < 0.5:
+        return lens_id_of(rng.randint(max(0, i - CITE_WINDOW), i - 1))
+    return f"{rng.randint(0, 999):03d}-{rng.randint(0, 999):03d}-{rng.randint(0, 999):03d}-{rng.randint(0, 999):03d}-{rng.randint(0, 999):03d}"
+
+
+def make_patent(i, rng=None):
+    """i번째 합성 특허 문서 하나를 만듭니다. 같은 i와 시드면 같은 문서가 나옵니다."""
+    rng = rng or random.Random(i)
+    app_date = date(1995, 1, 1) + timedelta(days=rng.randint(0, 11000))
+    pub_date = app_date + timedelta(days=rng.randint(300, 900))
+    granted = rng.random() < 0.55
+    jurisdiction = rng.choice(JURISDICTIONS)
+    family_id = i // rng.choice([1, 2, 3])
+
+    applicants = [{"extracted_name": {"value": f"APPLICANT {rng.randint(0, 400)} CO LTD"},
+                   **({"residence": rng.choice(JURISDICTIONS)} if rng.random() < 0.8 else {})}
+                  for _ in range(rng.choice([1, 1, 1, 2, 3]))]
+    inventors = [{"extracted_name": {"value": f"INVENTOR {rng.randint(0, 5000)}"}} for _ in range(rng.randint(1, 6))]
+    ipcs = [{"symbol": rng.choice(IPC_SYMBOLS)} for _ in range(rng.randint(0, 5))]
+    cpcs = [{"symbol": rng.choice(IPC_SYMBOLS)} for _ in range(rng.randint(0, 8))]
+    cited_ids = [_cited_lens_id(i, rng) for _ in range(rng.randint(0, 12))]
+    npl_count = rng.choice([0, 0, 1, 2, 5])
+
+    biblio = {
+        "invention_title": [{"text": " ".join(rng.choices(WORDS, k=6)).capitalize(), "lang": "en"}],
+        "parties": {"applicants": applicants, "inventors": inventors},
+        "application_reference": {"jurisdiction": jurisdiction, "doc_number": f"{app_date.year}{i:07d}", "date": _iso(app_date)},
+        "priority_claims": {"claims": [{"jurisdiction": rng.choice(JURISDICTIONS), "date": _iso(app_date)}] if rng.random() < 0.7 else []},
+        "classifications_ipcr": {"classifications": ipcs},
+        "classifications_cpc": {"classifications": cpcs},
+        "references_cited": {"patent_count": len(cited_ids), "npl_count": npl_count,
+                             "citations": [{"patcit": {"lens_id": lens_id}} for lens_id in cited_ids]},
+        "cited_by": {"patent_count": rng.choice([0, 0, 1, 3, 8, 20, 75])},
+    }
+    return {
+        "lens_id": lens_id_of(i),
+        "jurisdiction": jurisdiction,
+        "doc_number": f"{rng.randint(1000000, 9999999)}",
+        "kind": "B1" if granted else "A1",
+        "date_published": _iso(pub_date),
+        "biblio": biblio,
+        "legal_status": {"granted": granted, "patent_status": rng.choice(STATUSES),
+                         **({"grant_date": _iso(pub_date + timedelta(days=rng.randint(0, 700)))} if granted else {})},
+        "families": {"simple_family": {"size": rng.randint(1, 6), "id": family_id,
+                                       "members": [{"lens_id": f"fam-{family_id}"}]}},
+        "abstract": [{"text": " ".join(rng.choices(WORDS, k=rng.randint(40, 140))), "lang": "en"}] if rng.random() < 0.95 else [],
+    }
+
+
+def make_page(start, size, seed=0):
+    """start번부터 size개의 합성 특허를 Lens 검색 응답 형식의 'data' 목록으로 만듭니다."""
+    rng = random.Random(seed * 1_000_003 + start)
+    return [make_patent(start + k, rng) for k in range(size)]
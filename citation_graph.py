@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from dashboard_metrics import cached_per_dataset
+from facet_index import explode_values
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-9
+PAGERANK_MAX_ITER = 100
+TOP_INFLUENTIAL = 10
+TOP_RELATED = 10
+PATENT_COLUMNS = ['title', 'applicants', 'application_date', 'lens_id']
+
+
+def _csr(src, dst, num_nodes):
+    """(src, dst) 순으로 정렬된 간선 -> indptr. 노드 i의 이웃은 dst[indptr[i]:indptr[i + 1]]"""
+    return np.concatenate(([0], np.cumsum(np.bincount(src, minlength=num_nodes)))).astype(np.int64)
+
+
+def _gather(indptr, indices, nodes):
+    """여러 노드의 이웃을 한 배열로 이어 붙입니다. (노드마다 반복하지 않고 한 번에 인덱싱)"""
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return indices[offsets + np.arange(lengths.sum())]
+
+
+# ==============================================================================
+#  데이터셋 안의 인용 그래프 (정수 노드 번호 + CSR 배열, 모든 계산은 벡터 연산)
+# ==============================================================================
+class CitationGraph:
+    """데이터셋의 특허끼리의 인용 관계. 행 i의 특허가 행 j의 특허를 인용하면 간선 i -> j 입니다.
+
+    cited_lens_ids 컬럼(파싱할 때 뽑아 둔 인용 특허 lens_id)을 행 번호로 바꿔 정방향(인용한 특허)과
+    역방향(인용받은 특허) CSR 배열로 두고, 데이터셋 안 피인용 수와 PageRank 영향력은 만들 때 한 번 계산합니다.
+    공동 인용(co-citation)과 서지 결합(bibliographic coupling)은 특허 하나를 기준으로 필요할 때 셉니다.
+    """
+
+    def __init__(self, df):
+        n = self.num_nodes = len(df)
+        if 'cited_lens_ids' in df.columns:
+            rows, codes, values = explode_values(df['cited_lens_ids'])
+        else:
+            rows, codes, values = np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, dtype=object)
+
+        # lens_id -> 행 번호 (같은 lens_id가 여러 행이면 첫 행), 데이터셋 밖의 특허는 -1
+        lens_ids = df['lens_id'].reset_index(drop=True)
+        first_rows = lens_ids[~lens_ids.duplicated()]
+        positions = pd.Index(first_rows.to_numpy()).get_indexer(values)
+        targets = np.where(positions >= 0, first_rows.index.to_numpy()[positions], -1)[codes]
+
+        keep = (targets >= 0) & (targets != rows)
+        edges = np.sort(rows[keep].astype(np.int64) * max(n, 1) + targets[keep])
+        edges = edges[np.concatenate(([True], edges[1:] != edges[:-1]))] if len(edges) else edges  # 같은 인용은 한 번만
+        src, dst = (edges // max(n, 1)).astype(np.int32), (edges % max(n, 1)).astype(np.int32)
+        self.num_edges = len(edges)
+
+        self.forward_indptr, self.forward = _csr(src, dst, n), dst
+        order = np.lexsort((src, dst))
+        self.backward_indptr, self.backward = _csr(dst[order], src[order], n), src[order]
+
+        self.references_in_corpus = np.diff(self.forward_indptr)   # 데이터셋 안에서 인용한 특허 수
+        self.cited_in_corpus = np.diff(self.backward_indptr)       # 데이터셋 안에서 인용받은 횟수
+        self.pagerank = self._pagerank(src, dst)
+
+    def _pagerank(self, src, dst):
+        """인용한 특허가 인용받은 특허에게 점수를 나눠 주는 PageRank. (인용이 없는 특허의 점수는 전체에 고르게)"""
+        n = self.num_nodes
+        if not n:
+            return np.empty(0)
+        out_degree = self.references_in_corpus
+        inverse_out = np.divide(1.0, out_degree, out=np.zeros(n), where=out_degree > 0)
+        dangling = out_degree == 0
+        rank = np.full(n, 1.0 / n)
+        for _ in range(PAGERANK_MAX_ITER):
+            flow = np.bincount(dst, weights=(rank * inverse_out)[src], minlength=n)
+            new_rank = PAGERANK_DAMPING * flow + (PAGERANK_DAMPING * rank[dangling].sum() + 1 - PAGERANK_DAMPING) / n
+            converged = np.abs(new_rank - rank).sum() < PAGERANK_TOLERANCE
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def cocitation(self, node):
+        """node와 함께 인용된 횟수(공동 인용)를 특허별로 셉니다."""
+        citing = self.backward[self.backward_indptr[node]:self.backward_indptr[node + 1]]
+        counts = np.bincount(_gather(self.forward_indptr, self.forward, citing), minlength=self.num_nodes)
+        counts[node] = 0
+        return counts
+
+    def coupling(self, node):
+        """node와 같은 특허를 인용한 횟수(서지 결합)를 특허별로 셉니다."""
+        cited = self.forward[self.forward_indptr[node]:self.forward_indptr[node + 1]]
+        counts = np.bincount(_gather(self.backward_indptr, self.backward, cited), minlength=self.num_nodes)
+        counts[node] = 0
+        return counts
+
+    # --- 대시보드용 표 ---
+    def top_influential(self, df, top=TOP_INFLUENTIAL):
+        """PageRank 상위 특허 표 (df는 그래프를 만든 데이터셋)"""
+        nodes = np.argsort(-self.pagerank, kind='stable')[:top]
+        table = df.iloc[nodes][[c for c in PATENT_COLUMNS if c in df.columns]].reset_index(drop=True)
+        table['cited_in_corpus'] = self.cited_in_corpus[nodes]
+        table['pagerank'] = self.pagerank[nodes] * self.num_nodes   # 1.0 = 평균
+        table.index = nodes
+        return table
+
+    def related(self, df, node, kind='cocitation', top=TOP_RELATED):
+        """node와 공동 인용('cocitation') 또는 서지 결합('coupling')이 많은 특허 표 (0회 제외)"""
+        counts = self.cocitation(node) if kind == 'cocitation' else self.coupling(node)
+        nodes = np.argsort(-counts, kind='stable')[:top]
+        nodes = nodes[counts[nodes] > 0]
+        table = df.iloc[nodes][[c for c in PATENT_COLUMNS if c in df.columns]].reset_index(drop=True)
+        table['shared'] = counts[nodes]
+        table.index = nodes
+        return table
+
+
+def get_citation_graph(df):
+    """데이터셋별로 캐시된 CitationGraph를 돌려줍니다. (같은 데이터셋이면 다시 만들지 않음)"""
+    return cached_per_dataset('citations', df, CitationGraph)
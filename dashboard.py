@@ -1,26 +1,38 @@
+import time
 import streamlit as st
 import pandas as pd
+from dashboard_metrics import TOP_CATEGORIES, get_dashboard_metrics
+from facet_index import FACET_LABELS
 
 def create_dashboard(df: pd.DataFrame):
     """
     주어진 데이터프레임을 사용하여 특허 분석 대시보드를 생성합니다.
+    지표는 dashboard_metrics에서 데이터셋마다 한 번만 계산해 캐시한 값을 씁니다.
     """
     st.header("📊 분석 대시보드")
-    st.success(f"**총 {len(df):,}건**의 특허 데이터를 기반으로 분석합니다.")
+    render_dashboard_metrics(get_dashboard_metrics(df))
+
+
+def render_dashboard_metrics(metrics):
+    """
+    compute_dashboard_metrics / LiveAggregates.to_metrics 결과를 그립니다. (다운로드 중 실시간 집계도 같은 화면)
+    """
+    st.success(f"**총 {metrics['total']:,}건**의 특허 데이터를 기반으로 분석합니다.")
+    if metrics.get('approximate'):
+        st.caption("⚡ 빠른 분석: Lens 서버 집계 결과입니다. 출원인/국적/IPC는 첫 번째 값이 아닌 특허의 모든 출원인/분류 기준이라 "
+                   "전체 다운로드 결과와 조금 다를 수 있습니다.")
     st.markdown("---")
 
     # --- 1. 핵심 요약 ---
     st.subheader("🔢 한눈에 보는 핵심 요약")
     col1, col2, col3 = st.columns(3)
-    unique_applicants = df['applicants'].str.split(';').str[0].str.strip().nunique()
-    avg_citations = df['cited_by_patent_count'].mean()
 
     with col1:
-        st.metric(label="총 특허 수", value=f"{len(df):,} 건")
+        st.metric(label="총 특허 수", value=f"{metrics['total']:,} 건")
     with col2:
-        st.metric(label="핵심 출원인 수", value=f"{unique_applicants:,} 곳")
+        st.metric(label="핵심 출원인 수", value=f"{metrics['unique_applicants']:,} 곳")
     with col3:
-        st.metric(label="평균 피인용 수", value=f"{avg_citations:.1f} 회")
+        st.metric(label="평균 피인용 수", value=f"{metrics['avg_citations']:.1f} 회")
 
     st.markdown("---")
 
@@ -29,31 +41,126 @@ def create_dashboard(df: pd.DataFrame):
     with col_graph1:
         # 연도별 출원 동향
         st.subheader("📈 연도별 출원 동향")
-        df['application_year'] = pd.to_numeric(df['application_year'], errors='coerce')
-        yearly_counts = df['application_year'].value_counts().sort_index()
-        st.bar_chart(yearly_counts)
+        st.bar_chart(metrics['yearly_counts'])
 
         # 핵심 출원인 (Top 10)
         st.subheader("🏢 핵심 출원인 (Top 10)")
-        main_applicant = df['applicants'].str.split(';').str[0].str.strip()
-        applicant_counts = main_applicant.value_counts().nlargest(10)
-        st.bar_chart(applicant_counts)
+        st.bar_chart(metrics['top_applicants'])
 
     with col_graph2:
         # 출원인 국적 분포
         st.subheader("🌍 출원인 국적 분포 (Top 15)")
-        nationality_counts = df['applicant_nationality'].value_counts().nlargest(15)
-        st.bar_chart(nationality_counts)
+        st.bar_chart(metrics['nationality_counts'])
 
         # 주요 기술 분야 (IPC) 분포
         st.subheader("🔬 주요 기술 분야 분포 (Top 15)")
-        ipc_counts = df['main_ipc_field'].value_counts().nlargest(15)
-        st.bar_chart(ipc_counts)
+        st.bar_chart(metrics['ipc_counts'])
         st.caption("IPC(국제특허분류) 코드 4단위 기준")
 
     st.markdown("---")
 
     # --- 3. 상세 데이터 ---
     st.subheader("⭐ 가장 많이 인용된 특허 Top 10")
-    top_cited_patents = df.sort_values(by='cited_by_patent_count', ascending=False).head(10)
-    st.dataframe(top_cited_patents[['title', 'applicants', 'application_date', 'cited_by_patent_count']])
\ No newline at end of file
+    st.dataframe(metrics['top_cited'])
+
+
+FACET_OPTION_LIMIT = 300    # 선택 목록에 보여줄 값 수 (건수 많은 순)
+
+
+@st.fragment
+def render_facet_explorer(index):
+    """
+    FacetIndex로 다값 필드(모든 출원인/발명자/IPC/CPC 단계)를 교차 필터합니다.
+    예: 출원인을 고르면 그 출원인 특허의 CPC 서브클래스 구성을 봅니다. (이 부분만 다시 그림)
+    """
+    st.subheader("🧭 교차 필터 (출원인 · 발명자 · IPC/CPC)")
+    names = [name for name in FACET_LABELS if name in index.facets]
+    selection = {}
+    filter_columns = st.columns(2)
+    for slot, (column, default) in enumerate(zip(filter_columns, ('applicant', 'cpc_subclass'))):
+        with column:
+            name = st.selectbox(f"필터 {slot + 1}", names, index=names.index(default), format_func=FACET_LABELS.get,
+                                key=f"facet_filter_{slot}")
+            # 다른 필터가 걸린 상태의 건수를 보여줘 선택지를 좁혀감
+            options = index.counts(name, index.select(selection), top=FACET_OPTION_LIMIT)
+            selection.setdefault(name, []).extend(st.multiselect(
+                f"{FACET_LABELS[name]} 값", options.index, format_func=lambda value, o=options: f"{value} ({o[value]:,})",
+                key=f"facet_values_{slot}"))
+
+    breakdown = st.selectbox("구성을 볼 필드", names, index=names.index('cpc_subclass'), format_func=FACET_LABELS.get)
+    start = time.perf_counter()
+    mask = index.select(selection)
+    counts = index.counts(breakdown, mask, top=TOP_CATEGORIES)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"선택된 특허 {int(mask.sum()):,}건 / 전체 {index.num_rows:,}건 · 계산 {elapsed_ms:.1f} ms")
+    st.bar_chart(counts)
+
+
+@st.fragment
+def render_citation_panel(df, graph):
+    """
+    CitationGraph로 데이터셋 안의 인용 관계를 보여줍니다. (영향력 상위 특허, 선택한 특허의 공동 인용/서지 결합)
+    """
+    st.subheader("🕸️ 인용 네트워크 (데이터셋 안)")
+    if not graph.num_edges:
+        st.info("데이터셋 안에서 서로 인용한 특허가 없습니다. (인용 목록은 '전체 분석 필드' 또는 '원본 보관' 범위로 받은 경우에만 있습니다)")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric(label="데이터셋 안 인용 관계", value=f"{graph.num_edges:,} 건")
+    with col2:
+        st.metric(label="인용받은 특허 수", value=f"{int((graph.cited_in_corpus > 0).sum()):,} 건")
+
+    st.markdown("**영향력 상위 특허 (PageRank, 1.0 = 평균)**")
+    influential = graph.top_influential(df)
+    st.dataframe(influential, hide_index=True)
+
+    node = st.selectbox("관련 특허를 볼 특허", influential.index,
+                        format_func=lambda n: f"{influential.at[n, 'title']} ({influential.at[n, 'lens_id']})")
+    col_cocited, col_coupled = st.columns(2)
+    with col_cocited:
+        st.markdown("**함께 인용된 특허 (공동 인용)**")
+        st.dataframe(graph.related(df, node, 'cocitation'), hide_index=True)
+    with col_coupled:
+        st.markdown("**같은 특허를 인용한 특허 (서지 결합)**")
+        st.dataframe(graph.related(df, node, 'coupling'), hide_index=True)
+
+
+STAGE_LABELS = {
+    'wait_for_page': "페이지 대기 (API)", 'parse': "파싱", 'raw_archive': "원본 JSON 보관", 'write': "파일 쓰기",
+    'convert': "CSV → Parquet 변환", 'live_aggregates': "실시간 집계", 'resolve_ids': "lens_id 확인 (API)",
+    'store_put': "저장소 반영 (파싱 포함)", 'excel_export': "엑셀 생성", 'load_dataset': "데이터셋 불러오기",
+    'parse_wait': "파싱 결과 대기 (워커)",
+}
+
+
+def render_performance_panel(perf, title="⏱️ 성능"):
+    """
+    instrumentation.Trace 요약(검색/다운로드 한 번)을 접을 수 있는 패널로 보여줍니다.
+    대기/단계 시간은 스레드별 시간의 합이라 병렬 다운로드에서는 전체 시간보다 클 수 있습니다.
+    """
+    if not perf:
+        return
+    requests = perf["requests"]
+    with st.expander(f"{title} · {perf['elapsed']:.2f}초"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(label="API 요청", value=f"{requests['count']:,} 회",
+                      help=f"실패 {requests['errors']:,}회 · 응답 {requests['bytes'] / 1024 / 1024:,.1f} MB "
+                           f"(전송 {requests['wire_bytes'] / 1024 / 1024:,.1f} MB)")
+        with col2:
+            st.metric(label="요청 지연 p50 / p95", value=f"{requests.get('p50_ms', 0):,.0f} / {requests.get('p95_ms', 0):,.0f} ms")
+        with col3:
+            st.metric(label="재시도 · 속도 제한 대기", value=f"{sum(perf['retries'].values()):,} 회 · {perf['rate_limited_seconds']:.1f}초",
+                      help=", ".join(f"{reason}: {count}회" for reason, count in perf['retries'].items()) or None)
+        with col4:
+            st.metric(label="최대 메모리", value=f"{perf['peak_rss_mb']:,.0f} MB", delta=f"+{perf['peak_rss_growth_mb']:,.0f} MB",
+                      delta_color="off")
+        if perf.get('records') and perf['elapsed']:
+            st.caption(f"처리 {perf['records']:,}건 · 평균 {perf['records'] / perf['elapsed']:,.0f}건/초")
+        if perf["stages"]:
+            stages = pd.DataFrame([
+                {"단계": STAGE_LABELS.get(name, name), "호출": stage["calls"], "시간(초)": round(stage["seconds"], 3),
+                 "건수": stage["records"], "건/초": round(stage["records_per_sec"]) if stage["records_per_sec"] else None}
+                for name, stage in perf["stages"].items()]).sort_values("시간(초)", ascending=False)
+            st.dataframe(stages, hide_index=True)
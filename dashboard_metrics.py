@@ -0,0 +1,230 @@
+import heapq
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_CACHED_DATASETS = 8
+TOP_APPLICANTS = 10
+TOP_CATEGORIES = 15
+TOP_CITED = 10
+TOP_CITED_COLUMNS = ['title', 'applicants', 'application_date', 'cited_by_patent_count', 'lens_id']
+
+_caches = {}    # 이름 -> OrderedDict(fingerprint -> 계산 결과)
+_lock = threading.Lock()
+_dataset_owner = None   # set_dataset_owner로 지정한 DatasetRegistry (그 데이터셋의 파생 결과는 거기에 캐시)
+
+
+def set_dataset_owner(registry):
+    """파생 결과를 캐시할 DatasetRegistry를 지정합니다. 그 저장소의 데이터셋에서 만든 결과는 저장소의 메모리 예산에 포함되고
+    데이터셋을 내릴 때 같이 버려집니다. (그 밖의 DataFrame은 이 모듈의 LRU 캐시를 씀)
+    """
+    global _dataset_owner
+    _dataset_owner = registry
+
+
+def dataset_fingerprint(df):
+    """데이터셋을 구분하는 키. df.attrs['fingerprint']가 있으면 그대로 쓰고, 없으면 lens_id와 피인용 수로 해시를 만들어
+    df.attrs에 기록합니다. (같은 DataFrame 객체로 다시 그릴 때는 해시를 다시 계산하지 않음)
+    """
+    fingerprint = df.attrs.get('fingerprint')
+    if fingerprint is None:
+        columns = [c for c in ('lens_id', 'cited_by_patent_count') if c in df.columns]
+        hashed = pd.util.hash_pandas_object(df[columns], index=False).sum() if columns else 0
+        fingerprint = df.attrs['fingerprint'] = f"{len(df)}:{int(hashed)}"
+    return fingerprint
+
+
+def primary_applicants(df):
+    """출원인 목록의 첫 번째 이름만 뽑은 category 컬럼. 문자열 처리는 고유한 출원인 목록마다 한 번만 합니다."""
+    applicants = df['applicants'].astype('category')
+    names = applicants.cat.categories.to_series().str.split(';').str[0].str.strip()
+    lookup = np.append(names.to_numpy(dtype=object), None) # 코드 -1(결측)은 마지막 None을 가리킴
+    return pd.Series(lookup[applicants.cat.codes.to_numpy()], index=df.index, dtype='category')
+
+
+def _top_counts(values, n):
+    """category 컬럼의 상위 n개 빈도 (0건인 범주는 빼고, 차트용으로 일반 인덱스로 바꿈)"""
+    counts = values.value_counts()
+    counts = counts[counts > 0].nlargest(n)
+    counts.index = counts.index.astype(object)
+    return counts
+
+
+# ==============================================================================
+#  대시보드 지표 계산 (데이터셋마다 한 번만 계산하고 fingerprint로 캐시)
+# ==============================================================================
+def compute_dashboard_metrics(df):
+    """대시보드에 필요한 모든 지표를 계산합니다. df는 수정하지 않습니다."""
+    main_applicant = primary_applicants(df)
+    years = pd.to_numeric(df['application_year'], errors='coerce')
+    cited = df['cited_by_patent_count']
+    return {
+        "total": len(df),
+        "unique_applicants": main_applicant.nunique(),
+        "avg_citations": cited.mean(),
+        "yearly_counts": years.value_counts().sort_index(),
+        "top_applicants": _top_counts(main_applicant, TOP_APPLICANTS),
+        "nationality_counts": _top_counts(df['applicant_nationality'].astype('category'), TOP_CATEGORIES),
+        "ipc_counts": _top_counts(df['main_ipc_field'].astype('category'), TOP_CATEGORIES),
+        "top_cited": df.loc[cited.nlargest(TOP_CITED).index, [c for c in TOP_CITED_COLUMNS if c in df.columns]],
+    }
+
+
+def cached_per_dataset(name, df, build):
+    """build(df) 결과를 dataset_fingerprint 기준으로 캐시해 돌려줍니다.
+
+    set_dataset_owner로 지정한 DatasetRegistry의 데이터셋이면 그 저장소에, 아니면 이름별 LRU 캐시(최근 MAX_CACHED_DATASETS개)에 둡니다.
+    """
+    key = dataset_fingerprint(df)
+    if _dataset_owner is not None:
+        owned, value = _dataset_owner.derived(key, name, lambda: build(df))
+        if owned:
+            return value
+    with _lock:
+        cache = _caches.setdefault(name, OrderedDict())
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    value = build(df)
+    with _lock:
+        cache[key] = value
+        while len(cache) > MAX_CACHED_DATASETS:
+            cache.popitem(last=False)
+    return value
+
+
+def get_dashboard_metrics(df):
+    """데이터셋별로 캐시된 지표를 돌려줍니다. (같은 데이터셋이면 재실행 시 계산하지 않음)"""
+    return cached_per_dataset('metrics', df, compute_dashboard_metrics)
+
+
+# ==============================================================================
+#  패밀리 단위 보기 (simple family마다 대표 문서 한 건, 다시 받지 않고 불러온 데이터셋에서 바로 만듦)
+# ==============================================================================
+FAMILY_RULES = {
+    'earliest': "가장 먼저 출원된 문서",
+    'most_cited': "피인용이 가장 많은 문서",
+    'jurisdiction': "선호 관할 순서 (US > EP > WO > JP > CN > KR)",
+}
+JURISDICTION_PREFERENCE = ('US', 'EP', 'WO', 'JP', 'CN', 'KR')
+
+
+def _family_rank(df, rule):
+    """대표 문서 선택 기준 (작을수록 우선)."""
+    if rule == 'earliest':
+        return pd.to_datetime(df['application_date']).fillna(pd.Timestamp.max)
+    if rule == 'most_cited':
+        return -df['cited_by_patent_count'].fillna(0).astype('int64')
+    if rule == 'jurisdiction':
+        preference = {code: i for i, code in enumerate(JURISDICTION_PREFERENCE)}
+        return df['jurisdiction'].astype(object).map(preference).fillna(len(preference))
+    raise ValueError(f"알 수 없는 패밀리 대표 규칙: {rule} (사용 가능: {', '.join(FAMILY_RULES)})")
+
+
+def collapse_families(df, rule='earliest'):
+    """simple_family_id마다 rule(FAMILY_RULES)로 고른 대표 문서만 남긴 DataFrame을 원래 행 순서대로 돌려줍니다.
+
+    패밀리 정보가 없는 문서(컬럼이 없는 이전 파일, 패밀리 필드를 받지 않은 행)는 각자 하나의 패밀리로 봅니다.
+    동점이면 lens_id가 작은 문서를 고릅니다. df는 수정하지 않습니다.
+    """
+    family = df['simple_family_id'].fillna(df['lens_id']) if 'simple_family_id' in df.columns else df['lens_id']
+    ranked = pd.DataFrame({'family': family, 'rank': _family_rank(df, rule), 'lens_id': df['lens_id']}, index=df.index)
+    chosen = ranked.sort_values(['rank', 'lens_id'], kind='stable').drop_duplicates('family').index
+    collapsed = df[df.index.isin(chosen)]
+    collapsed.attrs = {'fingerprint': f"{dataset_fingerprint(df)}/family:{rule}"}  # 지표/패싯/인용 그래프 캐시를 문서 단위와 따로 둠
+    return collapsed
+
+
+def get_family_view(df, rule='earliest'):
+    """데이터셋별로 캐시된 패밀리 단위 DataFrame."""
+    return cached_per_dataset(f'families:{rule}', df, lambda df: collapse_families(df, rule))
+
+
+# ==============================================================================
+#  다운로드 중 실시간 집계 (페이지마다 O(페이지) 갱신, 병합 가능)
+# ==============================================================================
+def _present(value):
+    """Parquet으로 읽었을 때 결측이 되는 값('', 'N/A', None)을 걸러냅니다."""
+    return value not in (None, '', 'N/A')
+
+
+class LiveAggregates:
+    """파싱된 레코드 페이지를 받을 때마다 대시보드 지표를 누적합니다.
+
+    연도/출원인/국적/IPC는 Counter로, 피인용 Top 10은 크기가 고정된 힙으로 유지하므로
+    갱신 비용은 페이지 크기에만 비례하고, 샤드별 집계는 merge()로 합칠 수 있습니다.
+    to_metrics()는 compute_dashboard_metrics와 같은 형태의 dict를 돌려줍니다.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.citation_sum = 0
+        self.citation_count = 0
+        self.years = Counter()
+        self.applicants = Counter()
+        self.nationalities = Counter()
+        self.ipc_fields = Counter()
+        self._top_cited = []    # (피인용 수, -순번, 행) 최소 힙, 크기 TOP_CITED
+        self._lock = threading.Lock()
+
+    def update(self, records):
+        with self._lock:
+            for record in records:
+                year = record.get('application_year')
+                if isinstance(year, str) and year.isdigit():
+                    self.years[int(year)] += 1
+                applicants = record.get('applicants')
+                if _present(applicants):
+                    self.applicants[applicants.split(';')[0].strip()] += 1
+                if _present(record.get('applicant_nationality')):
+                    self.nationalities[record['applicant_nationality']] += 1
+                if _present(record.get('main_ipc_field')):
+                    self.ipc_fields[record['main_ipc_field']] += 1
+
+                cited = record.get('cited_by_patent_count')
+                if cited is not None:
+                    self.citation_sum += cited
+                    self.citation_count += 1
+                    # 같은 피인용 수면 먼저 들어온 특허를 남김 (nlargest(keep='first')와 같은 순서)
+                    entry = (cited, -self.total, {c: record.get(c) for c in TOP_CITED_COLUMNS})
+                    if len(self._top_cited) < TOP_CITED:
+                        heapq.heappush(self._top_cited, entry)
+                    elif entry[:2] > self._top_cited[0][:2]:
+                        heapq.heapreplace(self._top_cited, entry)
+                self.total += 1
+
+    def merge(self, other):
+        """다른 LiveAggregates(예: 다른 샤드)의 집계를 더합니다."""
+        with self._lock, other._lock:
+            self.total += other.total
+            self.citation_sum += other.citation_sum
+            self.citation_count += other.citation_count
+            self.years.update(other.years)
+            self.applicants.update(other.applicants)
+            self.nationalities.update(other.nationalities)
+            self.ipc_fields.update(other.ipc_fields)
+            self._top_cited = heapq.nlargest(TOP_CITED, self._top_cited + other._top_cited, key=lambda e: e[:2])
+            heapq.heapify(self._top_cited)
+        return self
+
+    def to_metrics(self):
+        with self._lock:
+            top_cited = sorted(self._top_cited, key=lambda e: e[:2], reverse=True)
+            return {
+                "total": self.total,
+                "unique_applicants": len(self.applicants),
+                "avg_citations": self.citation_sum / self.citation_count if self.citation_count else float('nan'),
+                "yearly_counts": pd.Series(self.years, dtype='int64').sort_index().rename_axis('application_year').rename('count'),
+                "top_applicants": _counter_top(self.applicants, TOP_APPLICANTS, 'applicants'),
+                "nationality_counts": _counter_top(self.nationalities, TOP_CATEGORIES, 'applicant_nationality'),
+                "ipc_counts": _counter_top(self.ipc_fields, TOP_CATEGORIES, 'main_ipc_field'),
+                "top_cited": pd.DataFrame([row for _, _, row in top_cited], columns=TOP_CITED_COLUMNS),
+            }
+
+
+def _counter_top(counter, n, name):
+    pairs = counter.most_common(n)
+    return pd.Series([count for _, count in pairs], index=pd.Index([key for key, _ in pairs], dtype=object, name=name),
+                     dtype='int64', name='count')
@@ -0,0 +1,222 @@
+import atexit
+import os
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 Windows에서는 다른 프로세스의 사본 폴더를 정리하지 않음
+    psutil = None
+
+from instrumentation import span
+from patent_searcher import build_query
+from query_cache import make_cache_key
+from record_sinks import load_patents
+
+DEFAULT_DATASET_DIR = os.environ.get("LENS_DATASET_DIR", os.path.join(os.path.expanduser("~"), ".lenspatent", "datasets"))
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("LENS_DATASET_BUDGET_MB", "1024"))
+MAX_SPILLED_DATASETS = 64
+# '; '로 연결된 다값 문자열 컬럼은 같은 값이 여러 행에 반복되므로 사전 인코딩(category)으로 읽음 (지표/패싯도 category를 그대로 씀)
+DICTIONARY_COLUMNS = ('applicants', 'inventors', 'ipc_classifications', 'cpc_classifications')
+EXCLUDED_COLUMNS = ('raw_json',)   # 원본 JSON은 대시보드에 두지 않음 (특허를 열어볼 때 RawDocumentStore에서 읽음)
+
+
+def _pid_alive(pid):
+    """pid 프로세스가 아직 살아 있는지. 알 수 없으면 살아 있다고 봅니다. (다른 프로세스의 사본을 지우지 않도록)"""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == 'nt':  # Windows의 os.kill(pid, 0)은 프로세스를 종료시킴
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # 권한 없음 등: 프로세스는 있음
+        return True
+    return True
+
+
+def _sweep_dead_dirs(root):
+    """root 아래 <pid> 폴더 중 이미 끝난(비정상 종료/재시작된) 프로세스의 사본 폴더를 지웁니다."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name.isdigit() and int(name) != os.getpid() and not _pid_alive(int(name)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def estimate_bytes(value, _seen=None):
+    """파생 결과(DataFrame, 지표 dict, 패싯 색인, 인용 그래프 등)가 차지하는 대략의 메모리 크기(바이트)."""
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k, _seen) + estimate_bytes(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v, _seen) for v in value)
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + estimate_bytes(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+def dataset_key(search_params, fetched_at, profile=None, variant='full'):
+    """정규화한 검색식(build_query)과 필드 범위, 종류(full/delta/saved)의 해시 + 받은 시각으로 데이터셋 id를 만듭니다."""
+    digest = make_cache_key({"query": build_query(search_params), "profile": profile, "variant": variant})
+    return f"{digest[:16]}-{int(fetched_at or 0)}"
+
+
+# ==============================================================================
+#  프로세스 전체가 공유하는 데이터셋 저장소 (세션은 dataset_id만 들고 있음)
+# ==============================================================================
+class DatasetRegistry:
+    """대시보드로 불러온 데이터셋을 dataset_id 하나에 한 벌만 메모리에 둡니다.
+
+    등록할 때 결과 Parquet을 root/<pid> 아래로 하드 링크(안 되면 복사)해 두므로, 원래 작업/저장된 검색을 지워도 열어 둔 세션은 계속 읽을 수 있습니다.
+    DataFrame은 처음 get할 때 메모리 맵으로 읽고 (원본 JSON 제외, 다값 문자열은 사전 인코딩, 중복 lens_id 제거),
+    메모리에 올린 전체 크기가 memory_budget_mb를 넘으면 가장 오래 안 쓴 것부터 내립니다. 내린 데이터셋은 다음 get에서 디스크 사본을 다시 읽습니다.
+    디스크 사본은 max_spilled개까지만 두고, 넘으면 가장 오래 안 쓴 데이터셋을 등록에서 뺍니다. (그 id로 get하면 None)
+    데이터셋에서 만든 파생 결과(지표, 패밀리 보기, 패싯 색인, 인용 그래프)는 derived()로 그 데이터셋 항목에 두어
+    크기를 예산에 함께 세고, 데이터셋을 메모리에서 내릴 때 같이 버립니다.
+    """
+
+    def __init__(self, root=DEFAULT_DATASET_DIR, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, max_spilled=MAX_SPILLED_DATASETS):
+        # 프로세스마다 따로 둠: 같은 디렉터리를 쓰는 다른 서버 프로세스의 사본은 건드리지 않고, 이 pid의 이전 사본과
+        # 이미 끝난 프로세스가 남긴 사본만 지움. 정상 종료할 때는 이 프로세스의 사본도 지움
+        _sweep_dead_dirs(root)
+        root = os.path.join(root, str(os.getpid()))
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root, exist_ok=True)
+        atexit.register(shutil.rmtree, root, ignore_errors=True)
+        self.root = root
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.max_spilled = max_spilled
+        self._entries = OrderedDict()   # dataset_id -> {"path", "label", "df", "derived", "bytes", "lock"} (최근 사용 순)
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.loads = self.hits = self.evictions = 0
+
+    def register(self, path, search_params, fetched_at, profile=None, variant='full', label=None):
+        """결과 Parquet을 등록하고 dataset_id를 돌려줍니다. 같은 id가 이미 있으면 그대로 씁니다. (읽기는 get에서)"""
+        dataset_id = dataset_key(search_params, fetched_at, profile, variant)
+        with self._lock:
+            if dataset_id in self._entries:
+                self._entries.move_to_end(dataset_id)
+                return dataset_id
+        spill_path = os.path.join(self.root, f"{dataset_id}.parquet")
+        temp_path = f"{spill_path}.{threading.get_ident()}.tmp"
+        try:
+            os.link(path, temp_path)
+        except OSError:
+            shutil.copyfile(path, temp_path)
+        os.replace(temp_path, spill_path)
+        with self._lock:
+            if dataset_id not in self._entries:
+                self._entries[dataset_id] = {"path": spill_path, "label": label, "df": None, "derived": {}, "bytes": 0,
+                                             "lock": threading.Lock()}
+                self._trim_spilled()
+        return dataset_id
+
+    def get(self, dataset_id):
+        """데이터셋 DataFrame. 등록되지 않았거나 디스크 사본까지 정리된 id면 None. 돌려준 DataFrame은 수정하지 마세요."""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(dataset_id)
+        with entry["lock"]:   # 같은 데이터셋을 여러 세션이 동시에 열어도 한 번만 읽음
+            df = entry["df"]
+            if df is not None:
+                with self._lock:
+                    self.hits += 1
+                return df
+            df = self._load(dataset_id, entry["path"])
+            with self._lock:
+                if self._entries.get(dataset_id) is entry:
+                    entry.update(df=df, bytes=int(df.memory_usage(index=True, deep=True).sum()))
+                    self.resident_bytes += entry["bytes"]
+                    self.loads += 1
+                    self._evict(keep=dataset_id)
+        return df
+
+    def derived(self, fingerprint, name, build):
+        """데이터셋(또는 그 패밀리 보기)의 fingerprint에 대한 파생 결과 build()를 데이터셋 항목에 캐시해 돌려줍니다.
+
+        반환값: (이 저장소의 데이터셋인지, 결과). 저장소에 없는 데이터셋이면 (False, None)이라 호출한 쪽이 따로 캐시합니다.
+        fingerprint는 dataset_id 또는 'dataset_id/...' 형식입니다. (DatasetRegistry가 읽은 DataFrame의 attrs['fingerprint'])
+        """
+        dataset_id = fingerprint.split('/', 1)[0]
+        key = (name, fingerprint)
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                return False, None
+            if key in entry["derived"]:
+                return True, entry["derived"][key]
+        with entry["lock"]:   # 같은 파생 결과를 여러 세션이 동시에 만들지 않도록
+            with self._lock:
+                if key in entry["derived"]:
+                    return True, entry["derived"][key]
+            value = build()
+            size = estimate_bytes(value)
+            with self._lock:
+                if self._entries.get(dataset_id) is entry and entry["df"] is not None: # 내려간 데이터셋의 결과는 캐시하지 않음
+                    entry["derived"][key] = value
+                    entry["bytes"] += size
+                    self.resident_bytes += size
+                    self._evict(keep=dataset_id)
+        return True, value
+
+    def label(self, dataset_id):
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+        return entry["label"] if entry else None
+
+    def stats(self):
+        with self._lock:
+            return {"datasets": len(self._entries), "resident": sum(1 for e in self._entries.values() if e["df"] is not None),
+                    "resident_mb": self.resident_bytes / 1024 / 1024, "budget_mb": self.memory_budget / 1024 / 1024,
+                    "loads": self.loads, "hits": self.hits, "evictions": self.evictions}
+
+    def _load(self, dataset_id, path):
+        columns = [name for name in pq.read_schema(path).names if name not in EXCLUDED_COLUMNS]
+        with span("load_dataset") as s:
+            df = load_patents(path, columns=columns, read_dictionary=[c for c in DICTIONARY_COLUMNS if c in columns])
+            s.records = len(df)
+        if df['lens_id'].duplicated().any():
+            df = df.drop_duplicates(subset=['lens_id'], keep='first')
+        df.attrs['fingerprint'] = dataset_id  # 대시보드 지표/패싯/인용 그래프 캐시 키
+        return df
+
+    def _evict(self, keep):
+        """(lock 보유 상태에서) 메모리 예산을 넘으면 가장 오래 안 쓴 데이터셋부터 파생 결과와 함께 메모리에서 내립니다. (디스크 사본은 남김)"""
+        for dataset_id, entry in self._entries.items():
+            if self.resident_bytes <= self.memory_budget:
+                break
+            if dataset_id == keep or entry["df"] is None:
+                continue
+            self.resident_bytes -= entry["bytes"]
+            entry.update(df=None, derived={}, bytes=0)
+            self.evictions += 1
+
+    def _trim_spilled(self):
+        """(lock 보유 상태에서) 디스크 사본이 max_spilled개를 넘으면 가장 오래 안 쓴 데이터셋을 등록에서 뺍니다."""
+        while len(self._entries) > self.max_spilled:
+            _, entry = self._entries.popitem(last=False)
+            self.resident_bytes -= entry["bytes"]
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
@@ -0,0 +1,80 @@
+import hashlib
+
+import numpy as np
+
+MERGE_MIN = 4096    # 최근 추가분이 이만큼(또는 정렬된 배열의 1/8) 쌓이면 정렬된 배열로 합침
+
+
+def _id_key(lens_id):
+    """lens_id -> uint64 키. 'ddd-ddd-ddd-ddd-ddd' 형식은 숫자 15자리를 그대로 정수로 쓰고 (충돌 없음),
+    그 밖의 값은 blake2b 8바이트 해시에 최상위 비트를 세워 숫자 키(10^15 미만)와 겹치지 않게 합니다.
+    """
+    digits = lens_id.replace('-', '') if lens_id else ''
+    if len(digits) == 15 and digits.isdigit():
+        return int(digits)
+    return int.from_bytes(hashlib.blake2b((lens_id or '').encode('utf-8'), digest_size=8).digest(), 'big') | (1 << 63)
+
+
+# ==============================================================================
+#  다운로드 중 lens_id 중복 제거용 집합 (문자열 set 대신 정렬된 uint64 배열)
+# ==============================================================================
+class SeenIds:
+    """이미 받은 lens_id 집합. lens_id마다 8바이트만 쓰므로 샤드 다운로드처럼 수백만 건을 받아도 메모리가 작습니다.
+
+    최근 추가분은 작은 set에 두었다가 일정량이 쌓이면 정렬된 배열로 합치고, 조회는 페이지 단위로 searchsorted 한 번에 합니다.
+    """
+
+    def __init__(self, lens_ids=()):
+        self._sorted = np.empty(0, dtype=np.uint64)
+        self._recent = set()
+        self.add_new(list(lens_ids))
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, lens_id):
+        if not lens_id: # id가 없는 레코드는 중복 여부를 알 수 없으므로 본 적 없는 것으로 봄
+            return False
+        key = _id_key(lens_id)
+        return key in self._recent or bool(self._in_sorted(np.array([key], dtype=np.uint64))[0])
+
+    def add_new(self, lens_ids):
+        """lens_id 목록을 넣고, 처음 나온 것(목록 안에서 반복되면 첫 번째만)이면 True인 bool 목록을 돌려줍니다.
+
+        lens_id가 없는(None/'') 레코드는 서로 같은 키로 묶지 않도록 넣지 않고 항상 True입니다.
+        """
+        keys = [_id_key(lens_id) if lens_id else None for lens_id in lens_ids]
+        known = iter(self._in_sorted(np.array([key for key in keys if key is not None], dtype=np.uint64)))
+        fresh = []
+        for key in keys:
+            if key is None:
+                fresh.append(True)
+                continue
+            new = not next(known) and key not in self._recent
+            if new:
+                self._recent.add(key)
+            fresh.append(new)
+        if len(self._recent) > max(MERGE_MIN, len(self._sorted) // 8):
+            self._merge()
+        return fresh
+
+    def _in_sorted(self, keys):
+        if not len(self._sorted) or not len(keys):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.minimum(np.searchsorted(self._sorted, keys), len(self._sorted) - 1)
+        return self._sorted[positions] == keys
+
+    def _merge(self):
+        recent = np.sort(np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent)))
+        self._sorted = np.insert(self._sorted, np.searchsorted(self._sorted, recent), recent)  # 최근분은 배열에 없던 키만 있음
+        self._recent = set()
+
+
+# ==============================================================================
+#  특허 패밀리 (같은 발명의 KR/US/EP/CN 출원 등을 하나로 묶는 키)
+# ==============================================================================
+def simple_family_id(patent_json):
+    """simple family 구성원 lens_id 중 가장 작은 값. 같은 패밀리의 문서는 모두 같은 값을 가지며, 구성원 정보가 없으면 None."""
+    members = patent_json.get('families', {}).get('simple_family', {}).get('members') or []
+    member_ids = [member['lens_id'] for member in members if member.get('lens_id')]
+    return min(member_ids) if member_ids else None
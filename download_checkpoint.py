@@ -0,0 +1,109 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+
+from dedup import SeenIds
+
+DEFAULT_CHECKPOINT_DIR = os.environ.get("LENS_CHECKPOINT_DIR", os.path.join(os.path.expanduser("~"), ".lenspatent", "checkpoints"))
+
+
+# ==============================================================================
+#  이어받기용 다운로드 체크포인트
+# ==============================================================================
+class DownloadCheckpoint:
+    """검색 조건 하나의 다운로드 진행 상태를 디스크에 남겨, 실패/중단 후 같은 지점부터 이어받게 합니다.
+
+    records.csv : 지금까지 기록(flush)된 레코드
+    state.json  : 샤드 계획, 완료된 샤드, CSV에 확정된 바이트 위치
+    """
+
+    def __init__(self, search_params, root=DEFAULT_CHECKPOINT_DIR):
+        canonical = json.dumps(search_params, sort_keys=True, ensure_ascii=False)
+        self.key = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        self.dir = os.path.join(root, self.key)
+        self.records_path = os.path.join(self.dir, "records.csv")
+        self.state_path = os.path.join(self.dir, "state.json")
+        self.state = None
+
+    def load(self):
+        """저장된 체크포인트가 있으면 불러오고 True를 돌려줍니다."""
+        if not os.path.exists(self.state_path):
+            return False
+        with open(self.state_path, encoding='utf-8') as f:
+            self.state = json.load(f)
+        return True
+
+    def start(self, search_params, shards, total_hits):
+        """새 다운로드를 시작합니다. shards: [(샤드 search_params, 건수), ...], total_hits: 나누지 않은 검색의 건수"""
+        os.makedirs(self.dir, exist_ok=True)
+        if os.path.exists(self.records_path):
+            os.remove(self.records_path)
+        self.state = {
+            "search_params": search_params,
+            "shard_field": shards[0][0]["shard_field"] if shards else None,
+            "shards": [[shard_params["shard_range"], hits] for shard_params, hits in shards],
+            "total_hits": total_hits,
+            "completed": [],
+            "num_records": 0,
+            "csv_bytes": 0,
+        }
+        self.save()
+
+    def shards(self, search_params):
+        """체크포인트의 샤드 계획을 [(샤드 search_params, 건수), ...]로 되돌립니다."""
+        return [(dict(search_params, shard_field=self.state["shard_field"],
+                      shard_range=tuple(shard_range) if isinstance(shard_range, list) else shard_range), hits)
+                for shard_range, hits in self.state["shards"]]
+
+    def open_records(self):
+        """레코드 CSV를 추가 모드로 엽니다. 마지막 체크포인트 이후 반쯤 쓰인 내용은 잘라냅니다."""
+        os.makedirs(self.dir, exist_ok=True)
+        records_file = open(self.records_path, 'a+', newline='', encoding='utf-8-sig')
+        records_file.truncate(self.state["csv_bytes"])
+        records_file.seek(self.state["csv_bytes"])
+        return records_file
+
+    def seen_ids(self):
+        """이미 기록된 lens_id 집합(SeenIds) (샤드를 다시 받을 때 중복 제거용)."""
+        if not self.state["csv_bytes"]:
+            return SeenIds()
+        with open(self.records_path, 'rb') as f:
+            head = f.read(self.state["csv_bytes"]).decode('utf-8-sig')
+        return SeenIds(row['lens_id'] for row in csv.DictReader(io.StringIO(head, newline='')))
+
+    def header(self):
+        """이미 기록된 CSV의 헤더(컬럼 목록). 이전 버전에서 시작한 다운로드를 이어받을 때 같은 컬럼으로 계속 쓰기 위함."""
+        with open(self.records_path, encoding='utf-8-sig', newline='') as f:
+            return next(csv.reader(f))
+
+    def record_page(self, records_file, num_records):
+        """페이지 하나를 쓴 직후 호출: 파일을 디스크에 확정하고 확정된 위치와 건수를 저장합니다."""
+        records_file.flush()
+        os.fsync(records_file.fileno())
+        self.state["csv_bytes"] = records_file.tell()
+        self.state["num_records"] = num_records
+        self.save()
+
+    def complete_shard(self, shard_index):
+        self.state["completed"].append(shard_index)
+        self.save()
+
+    def save(self):
+        """state.json을 임시 파일에 쓴 뒤 교체해, 중간에 죽어도 파일이 깨지지 않게 합니다."""
+        self.state["updated_at"] = time.time()
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def discard(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def finish(self, output_path):
+        """완료된 레코드 CSV를 output_path로 옮기고 체크포인트를 지웁니다."""
+        os.replace(self.records_path, output_path)
+        shutil.rmtree(self.dir, ignore_errors=True)
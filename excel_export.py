@@ -0,0 +1,78 @@
+import tempfile
+
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from instrumentation import span
+
+# 엑셀 한계: 시트당 1,048,576행(헤더 포함), 셀당 32,767자
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_CELL_CHARS = 32767
+TRUNCATED_SUFFIX = "…[잘림]"
+BATCH_ROWS = 5000
+
+
+def _clean_cell(value):
+    """엑셀에 넣을 수 없는 제어 문자를 지우고, 셀 한도를 넘는 문자열은 잘라냅니다. (잘렸는지 함께 반환)"""
+    if not isinstance(value, str):
+        return value, False
+    value = ILLEGAL_CHARACTERS_RE.sub('', value)
+    if len(value) > EXCEL_MAX_CELL_CHARS:
+        return value[:EXCEL_MAX_CELL_CHARS - len(TRUNCATED_SUFFIX)] + TRUNCATED_SUFFIX, True
+    return value, False
+
+
+# ==============================================================================
+#  Parquet -> 엑셀 스트리밍 변환 (write_only 워크북: 행을 쓰는 즉시 임시 파일로 내보내 메모리가 일정)
+# ==============================================================================
+def write_excel(parquet_path, output, sheet_rows=EXCEL_MAX_ROWS - 1, batch_rows=BATCH_ROWS, dedup_key='lens_id'):
+    """Parquet 파일을 batch_rows 단위로 읽어 엑셀(.xlsx)로 씁니다. output은 경로 또는 바이너리 파일 객체입니다.
+
+    시트 하나가 sheet_rows(헤더 제외)를 넘으면 Sheet2, Sheet3 ... 으로 이어 쓰고,
+    dedup_key 컬럼 값이 이미 나온 행은 건너뜁니다. 반환값: {"rows", "sheets", "truncated_cells"}
+    """
+    parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+    header = parquet_file.schema_arrow.names
+    key_index = header.index(dedup_key) if dedup_key in header else None
+    seen = set()
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_count, rows_in_sheet = None, 0, sheet_rows
+    num_rows = truncated_cells = 0
+
+    for batch in parquet_file.iter_batches(batch_size=batch_rows):
+        columns = [column.to_pylist() for column in batch.columns]
+        for row in zip(*columns):
+            if key_index is not None and row[key_index] is not None:
+                if row[key_index] in seen:
+                    continue
+                seen.add(row[key_index])
+            if rows_in_sheet >= sheet_rows:
+                sheet_count += 1
+                sheet = workbook.create_sheet(f"Sheet{sheet_count}")
+                sheet.append(header)
+                rows_in_sheet = 0
+            cells = []
+            for value in row:
+                value, truncated = _clean_cell(value)
+                truncated_cells += truncated
+                cells.append(value)
+            sheet.append(cells)
+            rows_in_sheet += 1
+            num_rows += 1
+
+    if sheet is None: # 결과가 없어도 헤더만 있는 시트 하나는 남김
+        sheet_count = 1
+        workbook.create_sheet("Sheet1").append(header)
+    workbook.save(output)
+    return {"rows": num_rows, "sheets": sheet_count, "truncated_cells": truncated_cells}
+
+
+def excel_file(parquet_path, **kwargs):
+    """write_excel 결과를 임시 파일에 써서 처음 위치로 되감은 파일 객체로 돌려줍니다. (닫으면 자동 삭제)"""
+    output = tempfile.TemporaryFile(suffix=".xlsx")
+    with span("excel_export") as s:
+        s.records = write_excel(parquet_path, output, **kwargs)["rows"]
+    output.seek(0)
+    return output
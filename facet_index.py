@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from dashboard_metrics import cached_per_dataset
+
+# '; '로 합쳐진 다값 컬럼 -> 패싯 이름
+MULTI_VALUED_FIELDS = {
+    'applicants': 'applicant',
+    'inventors': 'inventor',
+    'ipc_classifications': 'ipc',
+    'cpc_classifications': 'cpc',
+}
+# 분류 코드(예: H01M10/0525)의 상위 단계: 섹션(H), 클래스(H01), 서브클래스(H01M), 메인그룹(H01M10)
+CLASSIFICATION_LEVELS = {
+    'section': lambda symbols: symbols.str[:1],
+    'class': lambda symbols: symbols.str[:3],
+    'subclass': lambda symbols: symbols.str[:4],
+    'group': lambda symbols: symbols.str.split('/').str[0],
+}
+FACET_LABELS = {
+    'applicant': "출원인", 'inventor': "발명자",
+    **{f"{scheme}_{level}": f"{scheme.upper()} {label}" for scheme in ('ipc', 'cpc')
+       for level, label in (('section', "섹션"), ('class', "클래스"), ('subclass', "서브클래스"), ('group', "메인그룹"))},
+    'ipc': "IPC 전체 코드", 'cpc': "CPC 전체 코드",
+}
+
+class Facet:
+    """패싯 하나: 값별 행 번호 목록을 CSR 형태(값 순서로 정렬된 rows + offsets)로 둡니다.
+
+    values[i]를 가진 행 번호는 rows[offsets[i]:offsets[i + 1]] (오름차순, 행마다 한 번)이고,
+    codes는 rows와 같은 길이의 값 번호라 선택된 행만 골라 np.bincount로 바로 셀 수 있습니다.
+    """
+
+    def __init__(self, values, rows, codes):
+        self.values = values
+        self.rows = rows
+        self.codes = codes
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(self.codes, minlength=len(values))))).astype(np.int64)
+        self._positions = pd.Index(values)
+
+    def rows_for(self, value):
+        i = self._positions.get_indexer([value])[0]
+        return self.rows[self.offsets[i]:self.offsets[i + 1]] if i >= 0 else self.rows[:0]
+
+    def counts(self, mask=None):
+        """값별 행 수 (mask가 있으면 그 행들만)"""
+        codes = self.codes if mask is None else self.codes[mask[self.rows]]
+        return np.bincount(codes, minlength=len(self.values))
+
+
+def explode_values(column):
+    """'; '로 합쳐진 컬럼 -> (행 번호, 값 번호, 값 배열). 문자열 분리는 고유한 셀 값마다 한 번만 합니다."""
+    cells = column.astype('category')
+    if not len(cells.cat.categories): # 값이 하나도 없는 컬럼 (예: 그 필드를 받지 않는 프로필)
+        return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, dtype=object)
+    # 인덱스가 범주 번호인 토큰 Series
+    tokens = pd.Series(cells.cat.categories, dtype=object).str.split(';').explode().str.strip()
+    tokens = tokens[tokens.notna() & (tokens != '')]
+    token_codes, values = pd.factorize(tokens, sort=True)
+    # 셀 값(범주)마다 토큰 번호 목록: token_codes[starts[c]:starts[c] + lengths[c]]
+    lengths = np.bincount(tokens.index.to_numpy(dtype=np.int64), minlength=len(cells.cat.categories))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    row_codes = cells.cat.codes.to_numpy()
+    present = np.flatnonzero(row_codes >= 0)
+    row_lengths = lengths[row_codes[present]]
+    rows = np.repeat(present, row_lengths)
+    within = np.arange(len(rows)) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+    codes = token_codes[np.repeat(starts[row_codes[present]], row_lengths) + within]
+    return rows.astype(np.int32), codes.astype(np.int32), np.asarray(values, dtype=object)
+
+
+def _dedup_facet(rows, codes, values, num_rows):
+    """(값, 행) 순으로 정렬하고 같은 행에 같은 값이 여러 번 나오면 한 번만 남겨 Facet을 만듭니다."""
+    pairs = np.sort(codes.astype(np.int64) * max(num_rows, 1) + rows)
+    pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))] if len(pairs) else pairs
+    return Facet(values, (pairs % max(num_rows, 1)).astype(np.int32), (pairs // max(num_rows, 1)).astype(np.int32))
+
+
+# ==============================================================================
+#  다값 필드 역색인 (데이터셋을 불러올 때 한 번 만들고, 교차 필터는 배열 연산만 함)
+# ==============================================================================
+class FacetIndex:
+    """출원인/발명자/IPC/CPC(와 분류 상위 단계) 값 -> 행 번호 역색인.
+
+    select()는 {패싯: [값, ...]} 선택을 패싯 안에서는 OR, 패싯끼리는 AND로 합친 행 마스크를 만들고,
+    counts()는 그 마스크 안에서 다른 패싯의 값별 건수를 셉니다. (예: 출원인 하나를 고르고 그 출원인의 CPC 구성 보기)
+    """
+
+    def __init__(self, df):
+        self.num_rows = len(df)
+        self.facets = {}
+        for column, name in MULTI_VALUED_FIELDS.items():
+            if column not in df.columns:
+                continue
+            rows, codes, values = explode_values(df[column])
+            self.facets[name] = _dedup_facet(rows, codes, values, self.num_rows)
+            if name in ('ipc', 'cpc'):
+                symbols = pd.Series(values, dtype=object)
+                for level, prefix in CLASSIFICATION_LEVELS.items():
+                    level_codes, level_values = pd.factorize(prefix(symbols), sort=True)
+                    self.facets[f"{name}_{level}"] = _dedup_facet(rows, level_codes[codes], np.asarray(level_values, dtype=object),
+                                                                  self.num_rows)
+
+    def select(self, selection):
+        """선택 조건을 만족하는 행의 bool 마스크. 선택이 비어 있으면 모든 행입니다."""
+        mask = np.ones(self.num_rows, dtype=bool)
+        for name, values in selection.items():
+            if not values:
+                continue
+            facet_mask = np.zeros(self.num_rows, dtype=bool)
+            for value in values:
+                facet_mask[self.facets[name].rows_for(value)] = True
+            mask &= facet_mask
+        return mask
+
+    def counts(self, name, mask=None, top=None):
+        """패싯 값별 행 수를 많은 순으로 (0건 제외). top을 주면 상위 top개만."""
+        facet = self.facets[name]
+        counts = facet.counts(mask)
+        order = np.argsort(-counts, kind='stable')
+        order = order[counts[order] > 0][:top]
+        return pd.Series(counts[order], index=pd.Index(facet.values[order], dtype=object, name=name), name='count')
+
+
+def get_facet_index(df):
+    """데이터셋별로 캐시된 FacetIndex를 돌려줍니다. (같은 데이터셋이면 다시 만들지 않음)"""
+    return cached_per_dataset('facets', df, FacetIndex)
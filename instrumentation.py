@@ -0,0 +1,320 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows에는 resource 모듈이 없음
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 resource만 사용 (둘 다 없으면 최대 메모리는 0으로 보고)
+    psutil = None
+
+METRICS_LOG_PATH = os.environ.get("LENS_METRICS_LOG")     # 지정하면 이벤트를 JSON Lines로 남김
+METRICS_PORT = os.environ.get("LENS_METRICS_PORT")        # 지정하면 http://<host>:<port>/metrics 로 Prometheus 텍스트 제공
+MAX_LATENCY_SAMPLES = 10000   # 추적 하나가 보관하는 요청 지연 표본 수 (백분위 계산용)
+
+
+def peak_rss_mb():
+    """이 프로세스의 최대 메모리(RSS, MB). 잴 수 없는 환경이면 0.
+
+    ru_maxrss는 리눅스에서 KB, macOS에서 바이트 단위입니다. resource가 없는 Windows에서는 psutil의 peak_wset을 씁니다.
+    """
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    return 0.0
+
+
+# ==============================================================================
+#  추적(Trace): 검색/다운로드 한 번에서 일어난 요청·재시도·대기·단계별 시간을 모음
+# ==============================================================================
+class Trace:
+    """계측 이벤트를 하나의 작업 단위로 모읍니다. 여러 스레드가 함께 기록합니다.
+
+    tracing(trace) 안에서 실행되는 코드(bind로 넘긴 작업 스레드 포함)의 이벤트가 이 추적에 쌓이고,
+    finish()는 화면/상태 파일에 그대로 넣을 수 있는 요약 dict를 돌려줍니다.
+    """
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._start_rss = peak_rss_mb()
+        self._lock = threading.Lock()
+        self.stages = {}          # 단계 -> {"calls", "seconds", "records"}
+        self.requests = {"count": 0, "errors": 0, "seconds": 0.0, "bytes": 0, "wire_bytes": 0}
+        self.latencies = []
+        self.retries = {}         # 사유(상태 코드/예외 이름) -> 횟수
+        self.backoff_seconds = 0.0
+        self.rate_limited_seconds = 0.0
+        self.result = None
+
+    def add(self, event):
+        with self._lock:
+            kind = event["type"]
+            if kind == "span":
+                stage = self.stages.setdefault(event["stage"], {"calls": 0, "seconds": 0.0, "records": 0})
+                stage["calls"] += 1
+                stage["seconds"] += event["seconds"]
+                stage["records"] += event["records"]
+            elif kind == "request":
+                self.requests["count"] += 1
+                self.requests["errors"] += event["status"] >= 400
+                self.requests["seconds"] += event["seconds"]
+                self.requests["bytes"] += event["bytes"]
+                self.requests["wire_bytes"] += event["wire_bytes"]
+                if len(self.latencies) < MAX_LATENCY_SAMPLES:
+                    self.latencies.append(event["seconds"])
+            elif kind == "retry":
+                self.retries[event["reason"]] = self.retries.get(event["reason"], 0) + 1
+                if not event["paused"]:
+                    self.backoff_seconds += event["delay"]
+            elif kind == "wait":
+                self.rate_limited_seconds += event["seconds"]
+
+    def finish(self, **result):
+        """추적을 끝내고 요약을 돌려줍니다. result(예: records=처리 건수)는 요약에 함께 남깁니다."""
+        self.result = result
+        summary = self.summary()
+        emit(dict(summary, type="trace"))
+        return summary
+
+    def summary(self):
+        elapsed = time.perf_counter() - self._start
+        with self._lock:
+            latencies = sorted(self.latencies)
+            requests = dict(self.requests)
+            stages = {name: dict(stage, records_per_sec=stage["records"] / stage["seconds"] if stage["seconds"] else None)
+                      for name, stage in self.stages.items()}
+            retries = dict(self.retries)
+        if latencies:
+            requests.update(p50_ms=latencies[len(latencies) // 2] * 1000,
+                            p95_ms=latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+                            max_ms=latencies[-1] * 1000)
+        return {"name": self.name, **self.attrs, **(self.result or {}), "started_at": self.started_at, "elapsed": elapsed,
+                "peak_rss_mb": peak_rss_mb(), "peak_rss_growth_mb": peak_rss_mb() - self._start_rss,
+                "requests": requests, "retries": retries, "backoff_seconds": self.backoff_seconds,
+                "rate_limited_seconds": self.rate_limited_seconds, "stages": stages}
+
+
+_local = threading.local()
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def tracing(trace):
+    """이 스레드에서 일어나는 이벤트를 trace에 모읍니다."""
+    previous, _local.trace = current_trace(), trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def bind(func):
+    """지금 스레드의 추적을 다른 스레드(ThreadPoolExecutor 작업 등)에서도 이어 쓰도록 func를 감쌉니다."""
+    trace = current_trace()
+    if trace is None:
+        return func
+
+    def run(*args, **kwargs):
+        with tracing(trace):
+            return func(*args, **kwargs)
+    return run
+
+
+# ==============================================================================
+#  이벤트 기록 (현재 추적 + 등록된 sink 모두에 전달)
+# ==============================================================================
+_sinks = []
+
+
+def add_sink(sink):
+    """emit(event) 메서드를 가진 sink를 등록합니다. (예: JsonlFileSink, PrometheusSink)"""
+    _sinks.append(sink)
+    return sink
+
+
+def emit(event):
+    trace = current_trace()
+    if trace is not None and event["type"] != "trace":
+        trace.add(event)
+    for sink in _sinks:
+        try:
+            sink.emit(event)
+        except Exception as e:  # 계측 실패가 검색/다운로드를 멈추지 않도록
+            print(f"Warning: 계측 sink 오류 ({type(sink).__name__}): {e}")
+
+
+def record_request(label, status, seconds, nbytes, wire_bytes):
+    """API 호출 한 번 (재시도 끝의 최종 응답 기준)"""
+    emit({"type": "request", "label": label, "status": status, "seconds": seconds, "bytes": nbytes, "wire_bytes": wire_bytes})
+
+
+def record_retry(reason, delay, paused=False):
+    """429/5xx/네트워크 오류로 재시도하기 전 대기 (reason: 상태 코드 또는 예외 이름)
+
+    paused=True(429)면 직접 잠들지 않고 RateLimiter를 멈추므로, 실제로 기다린 시간은 record_wait로 따로 잡힙니다.
+    """
+    emit({"type": "retry", "reason": str(reason), "delay": delay, "paused": paused})
+
+
+def record_wait(seconds):
+    """속도 제한(토큰 버킷/429 일시 정지)으로 요청 전에 기다린 시간"""
+    emit({"type": "wait", "seconds": seconds})
+
+
+class Span:
+    """span()이 돌려주는 측정 구간. records는 구간 안에서 채워도 됩니다."""
+
+    def __init__(self, stage, records=0):
+        self.stage = stage
+        self.records = records
+
+
+def record_span(stage, seconds, records=0):
+    """단계 하나의 실행 시간과 처리 건수 (with 블록으로 감싸기 어려운 구간용, 보통은 span())"""
+    emit({"type": "span", "stage": stage, "seconds": seconds, "records": records})
+
+
+@contextmanager
+def span(stage, records=0):
+    """with 블록의 시간을 stage 단계로 기록합니다. 처리 건수는 records 인자나 블록 안에서 s.records로 남깁니다."""
+    s = Span(stage, records)
+    start = time.perf_counter()
+    try:
+        yield s
+    finally:
+        record_span(stage, time.perf_counter() - start, s.records)
+
+
+# ==============================================================================
+#  sink: JSON Lines 로그 파일 / Prometheus 텍스트 엔드포인트
+# ==============================================================================
+class JsonlFileSink:
+    """이벤트마다 한 줄씩 JSON으로 덧붙입니다. (여러 스레드가 함께 씀)"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def emit(self, event):
+        line = json.dumps(dict(event, ts=time.time()), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class PrometheusSink:
+    """이벤트를 누적 카운터로 모아 Prometheus 텍스트 형식으로 내보냅니다. serve(port)로 /metrics를 엽니다."""
+
+    HELP = {
+        "lens_requests_total": "Lens API 호출 수",
+        "lens_request_seconds_total": "Lens API 호출 시간 합계",
+        "lens_response_bytes_total": "Lens API 응답 크기 합계 (압축 해제 후)",
+        "lens_response_wire_bytes_total": "Lens API 응답 전송 크기 합계",
+        "lens_retries_total": "재시도 수",
+        "lens_retry_backoff_seconds_total": "재시도 전 대기 시간 합계",
+        "lens_rate_limited_seconds_total": "속도 제한으로 기다린 시간 합계",
+        "lens_stage_calls_total": "단계 실행 수",
+        "lens_stage_seconds_total": "단계별 시간 합계",
+        "lens_stage_records_total": "단계별 처리 건수 합계",
+        "lens_traces_total": "끝난 검색/다운로드 수",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}   # (이름, ((라벨, 값), ...)) -> 값
+        self._server = None
+
+    def _inc(self, metric, value, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def emit(self, event):
+        with self._lock:
+            kind = event["type"]
+            if kind == "request":
+                label = event["label"]
+                self._inc("lens_requests_total", 1, label=label, status=event["status"])
+                self._inc("lens_request_seconds_total", event["seconds"], label=label)
+                self._inc("lens_response_bytes_total", event["bytes"], label=label)
+                self._inc("lens_response_wire_bytes_total", event["wire_bytes"], label=label)
+            elif kind == "retry":
+                self._inc("lens_retries_total", 1, reason=event["reason"])
+                if not event["paused"]:
+                    self._inc("lens_retry_backoff_seconds_total", event["delay"])
+            elif kind == "wait":
+                self._inc("lens_rate_limited_seconds_total", event["seconds"])
+            elif kind == "span":
+                self._inc("lens_stage_calls_total", 1, stage=event["stage"])
+                self._inc("lens_stage_seconds_total", event["seconds"], stage=event["stage"])
+                self._inc("lens_stage_records_total", event["records"], stage=event["stage"])
+            elif kind == "trace":
+                self._inc("lens_traces_total", 1, name=event["name"])
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+        lines, seen = [], set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {self.HELP.get(name, name)}", f"# TYPE {name} counter"]
+            label_text = ",".join(f'{key}="{value_}"' for key, value_ in labels)
+            value = round(value, 6) if isinstance(value, float) else value
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        lines += ["# HELP lens_process_peak_rss_bytes 프로세스 최대 메모리(RSS)", "# TYPE lens_process_peak_rss_bytes gauge",
+                  f"lens_process_peak_rss_bytes {peak_rss_mb() * 1024 * 1024:.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="0.0.0.0"):
+        """백그라운드 스레드에서 GET /metrics에 render() 결과를 돌려주는 HTTP 서버를 띄웁니다."""
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, int(port)), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="lens-metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+
+def configure_from_env():
+    """LENS_METRICS_LOG / LENS_METRICS_PORT 환경 변수대로 sink를 등록합니다. (프로세스마다 한 번 호출)"""
+    if METRICS_LOG_PATH:
+        add_sink(JsonlFileSink(METRICS_LOG_PATH))
+    if METRICS_PORT:
+        add_sink(PrometheusSink()).serve(METRICS_PORT)
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from dashboard_metrics import LiveAggregates
+from download_checkpoint import DownloadCheckpoint
+from instrumentation import Trace, tracing
+from patent_searcher import save_all_patents_sharded, save_all_patents_to_csv, shard_checkpoint_params
+from patent_store import DEFAULT_STORE_PATH, PatentStore
+from projections import DEFAULT_PROFILE
+
+DEFAULT_JOBS_DIR = os.environ.get("LENS_JOBS_DIR", os.path.join(os.path.expanduser("~"), ".lenspatent", "jobs"))
+JOB_WORKERS = 4          # 서버 전체에서 동시에 돌리는 다운로드 수
+PER_KEY_LIMIT = 2        # API 키 하나가 동시에 돌릴 수 있는 다운로드 수 (나머지는 대기열)
+STATUS_SAVE_INTERVAL = 1.0
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = 'queued', 'running', 'completed', 'failed', 'cancelled'
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+def _key_hash(api_key):
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+# ==============================================================================
+#  백그라운드 다운로드 작업 관리자 (Streamlit 스크립트 재실행과 무관하게 실행)
+# ==============================================================================
+class JobManager:
+    """다운로드를 작업 스레드에서 돌리고, 작업 상태를 jobs/<job_id>/status.json에 남깁니다.
+
+    화면은 progress_callback 대신 status()/list_jobs()를 주기적으로 읽어 진행 상황을 표시하며,
+    작업마다 instrumentation.Trace로 모은 요청/재시도/대기/단계별 시간 요약을 상태의 "perf"에 남깁니다.
+    결과 Parquet은 작업 폴더에 남아 다른 화면으로 갔다 와도(또는 새 세션에서도) 다시 열 수 있습니다.
+    API 키별 동시 실행은 per_key_limit개로 제한하고, 초과분은 제출 순서대로 대기합니다.
+    """
+
+    def __init__(self, root=DEFAULT_JOBS_DIR, max_workers=JOB_WORKERS, per_key_limit=PER_KEY_LIMIT,
+                 store_path=DEFAULT_STORE_PATH, raw_store=None, checkpoint_dir=None, saved_searches=None):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.per_key_limit = per_key_limit
+        self.store_path = store_path
+        self.raw_store = raw_store
+        self.checkpoint_dir = checkpoint_dir
+        self.saved_searches = saved_searches   # 저장된 검색 새로 고침 작업용 SavedSearchStore
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lens-job")
+        self._lock = threading.Lock()
+        self._jobs = {}          # job_id -> 상태 dict
+        self._api_keys = {}      # job_id -> API 키 (디스크에는 남기지 않음)
+        self._cancel_events = {}         # job_id -> 다운로드에 넘기는 stop_event (다운로드가 끝나면 스스로 세우기도 함)
+        self._cancel_requested = set()   # cancel()/shutdown()으로 중단을 요청한 job_id (취소와 실패는 이것으로 구분)
+        self._live = {}          # job_id -> 실행 중 실시간 집계 (LiveAggregates)
+        self._pending = {}       # 키 해시 -> 대기 중인 job_id deque
+        self._running = {}       # 키 해시 -> 실행 중인 작업 수
+        self._load()
+
+    def _load(self):
+        """이전 프로세스가 남긴 작업 상태를 읽습니다. 끝나지 않은 채 남은 작업은 중단(failed)으로 표시합니다."""
+        for job_id in os.listdir(self.root):
+            path = os.path.join(self.root, job_id, "status.json")
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                job = json.load(f)
+            if job["state"] not in FINISHED_STATES:
+                job.update(state=FAILED, finished_at=time.time(),
+                           error="서버가 재시작되어 작업이 중단되었습니다. 다시 실행하면 분할 다운로드는 이어받습니다.")
+                self._save(job)
+            self._jobs[job_id] = job
+
+    # --- 제출/조회/취소 ---
+    def submit(self, api_key, search_params, sharded=False, include_raw=False, label=None, profile=DEFAULT_PROFILE,
+               saved_search_id=None):
+        """다운로드 작업을 대기열에 넣고 job_id를 돌려줍니다. profile은 요청할 필드 범위(projections.PROFILES)입니다.
+
+        saved_search_id를 주면 검색 조건 대신 저장된 검색을 새로 고칩니다. (결과 파일은 이번에 새로 받은 레코드만 담음)
+        같은 체크포인트(검색 조건/필드 범위)를 쓰는 분할 다운로드가 이미 대기/실행 중이면 새로 만들지 않고 그 job_id를 돌려주며,
+        그 작업이 다른 API 키의 것이면 ValueError를 던집니다. (두 작업이 같은 체크포인트 파일에 함께 쓰지 않도록)
+        """
+        checkpoint_key = None
+        if sharded and not saved_search_id:
+            checkpoint_key = DownloadCheckpoint(shard_checkpoint_params(search_params, profile, include_raw)).key
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "job_id": job_id, "key_hash": _key_hash(api_key), "label": label or search_params.get('search_term', ''),
+            "search_params": search_params, "sharded": sharded, "include_raw": include_raw, "profile": profile,
+            "saved_search_id": saved_search_id, "checkpoint_key": checkpoint_key,
+            "state": QUEUED, "processed": 0, "total": 0, "elapsed": 0.0,
+            "created_at": time.time(), "started_at": None, "finished_at": None,
+            "result_path": None, "total_hits": 0, "store_stats": None, "error": None, "perf": None,
+        }
+        with self._lock:
+            active = next((other for other in self._jobs.values() if checkpoint_key and other["state"] not in FINISHED_STATES
+                           and other.get("checkpoint_key") == checkpoint_key), None)
+            if active is not None:
+                if active["key_hash"] != job["key_hash"]:
+                    raise ValueError("같은 검색 조건의 분할 다운로드가 다른 API 키로 진행 중입니다. 끝난 뒤 다시 시도하세요.")
+                return active["job_id"]
+            os.makedirs(os.path.join(self.root, job_id), exist_ok=True)
+            self._jobs[job_id] = job
+            self._api_keys[job_id] = api_key
+            self._cancel_events[job_id] = threading.Event()
+            self._pending.setdefault(job["key_hash"], deque()).append(job_id)
+            self._save(job)
+            self._dispatch(job["key_hash"])
+        return job_id
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, api_key):
+        """해당 API 키로 제출된 작업 상태 목록 (최근 것부터)."""
+        key_hash = _key_hash(api_key)
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values() if job["key_hash"] == key_hash]
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+    def live_metrics(self, job_id):
+        """실행 중인 작업의 지금까지 받은 레코드 기준 대시보드 지표. 실행 중이 아니면 None."""
+        live = self._live.get(job_id)
+        return live.to_metrics() if live else None
+
+    def cancel(self, job_id):
+        """대기 중이면 바로 취소하고, 실행 중이면 중단을 요청합니다."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] in FINISHED_STATES:
+                return
+            if job["state"] == QUEUED:
+                self._pending[job["key_hash"]].remove(job_id)
+                job.update(state=CANCELLED, finished_at=time.time())
+                self._save(job)
+            else:
+                self._cancel_requested.add(job_id)
+                self._cancel_events[job_id].set()
+
+    def delete(self, job_id):
+        """끝난 작업의 상태와 결과 파일을 지웁니다."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] not in FINISHED_STATES:
+                return
+            del self._jobs[job_id]
+        shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+
+    # --- 실행 ---
+    def _dispatch(self, key_hash):
+        """(lock 보유 상태에서) 키별 제한 안에서 대기 중인 작업을 실행합니다."""
+        pending = self._pending.get(key_hash)
+        while pending and self._running.get(key_hash, 0) < self.per_key_limit:
+            job_id = pending.popleft()
+            self._running[key_hash] = self._running.get(key_hash, 0) + 1
+            self._executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["state"] != QUEUED: # 시작 전에 shutdown()으로 취소됨
+                self._running[job["key_hash"]] -= 1
+                return
+            job.update(state=RUNNING, started_at=time.time())
+            self._save(job)
+        api_key, stop_event = self._api_keys[job_id], self._cancel_events[job_id]
+        live = self._live[job_id] = LiveAggregates()
+        last_saved = 0.0
+
+        def update_progress(processed, total, elapsed):
+            nonlocal last_saved
+            with self._lock:
+                job.update(processed=processed, total=total, elapsed=elapsed)
+                if time.time() - last_saved >= STATUS_SAVE_INTERVAL:
+                    self._save(job)
+                    last_saved = time.time()
+
+        store = None
+        trace = Trace("download", job_id=job_id, profile=job.get("profile", DEFAULT_PROFILE), sharded=job["sharded"])
+        try:
+            with tracing(trace):
+                if job.get("saved_search_id"):
+                    temp_path, total_hits, error = self.saved_searches.refresh(
+                        api_key, job["saved_search_id"], progress_callback=update_progress, raw_store=self.raw_store,
+                        checkpoint_dir=self.checkpoint_dir, stop_event=stop_event, on_records=live.update)
+                elif job["sharded"]:
+                    temp_path, total_hits, error = save_all_patents_sharded(
+                        api_key, job["search_params"], progress_callback=update_progress, checkpoint_dir=self.checkpoint_dir,
+                        output_format='parquet', raw_store=self.raw_store, include_raw=job["include_raw"], stop_event=stop_event,
+                        on_records=live.update, profile=job.get("profile", DEFAULT_PROFILE))
+                else:
+                    store = PatentStore(self.store_path) # 작업마다 연결을 따로 열어 적중 통계가 섞이지 않게 함
+                    temp_path, total_hits, error = save_all_patents_to_csv(
+                        api_key, job["search_params"], progress_callback=update_progress, store=store,
+                        output_format='parquet', raw_store=self.raw_store, include_raw=job["include_raw"], stop_event=stop_event,
+                        on_records=live.update, profile=job.get("profile", DEFAULT_PROFILE))
+        except Exception as e:
+            temp_path, total_hits, error = None, 0, f"Error: {e}"
+        finally:
+            if store is not None:
+                store.close()
+
+        result_path = None
+        if temp_path:
+            result_path = os.path.join(self.root, job_id, "patents.parquet")
+            shutil.move(temp_path, result_path)
+        with self._lock:
+            if job_id in self._cancel_requested and not result_path: # 취소 요청 전에 이미 끝났으면 완료로 둠
+                state, error = CANCELLED, None
+            else:
+                state = FAILED if error else COMPLETED
+            job.update(state=state, error=error, result_path=result_path, total_hits=total_hits,
+                       store_stats=store.last_stats if store else None, finished_at=time.time(),
+                       perf=trace.finish(records=job["processed"], state=state))
+            self._save(job)
+            del self._api_keys[job_id], self._cancel_events[job_id], self._live[job_id]
+            self._cancel_requested.discard(job_id)
+            self._running[job["key_hash"]] -= 1
+            self._dispatch(job["key_hash"])
+
+    def _save(self, job):
+        """status.json을 임시 파일에 쓴 뒤 교체합니다."""
+        path = os.path.join(self.root, job["job_id"], "status.json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def shutdown(self):
+        """실행 중인 작업에 중단을 요청하고, 아직 시작하지 않은 작업(대기열/실행 대기)은 취소로 기록합니다."""
+        with self._lock:
+            self._cancel_requested.update(self._cancel_events)
+            for event in self._cancel_events.values():
+                event.set()
+            for job in self._jobs.values():
+                if job["state"] == QUEUED: # cancel_futures로 버려지는 작업도 status.json에 대기 중으로 남지 않도록
+                    job.update(state=CANCELLED, finished_at=time.time())
+                    self._save(job)
+            self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
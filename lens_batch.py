@@ -0,0 +1,303 @@
+"""Streamlit 없이 여러 검색을 한 번에 내려받는 배치 실행기 (야간 갱신 등).
+
+검색 명세 파일은 한 줄에 JSON 객체 하나입니다. ('#'으로 시작하는 줄과 빈 줄은 건너뜀)
+  {"name": "battery", "search_term": "solid-state electrolyte", "search_fields": ["title", "abstract"], "start_year": "2020"}
+  {"name": "ai-chips", "query": "title:(neural AND accelerator)", "profile": "export-lite", "format": "xlsx"}
+  {"name": "nightly-1", "saved_search_id": "3f9c2a1b7d0e"}
+일반 검색 필드는 화면과 같고(search_term, search_fields, applicant, ipc_cpc, date_type, start_year, end_year, status_filter),
+query는 고급 검색식입니다. sharded는 true/false/"auto"(기본: 5만 건 초과면 날짜 구간 분할), saved_search_id는 저장된 검색 새로 고침.
+
+실행: LENS_API_KEY=... python lens_batch.py queries.jsonl --out results --format parquet --jobs 4
+결과: results/<name>.<parquet|csv|xlsx>, results/summary.json (검색별 건수/시간/실패/계측 요약). 실패가 있으면 종료 코드 1.
+같은 API 키의 모든 검색은 키별 RateLimiter 하나를 나눠 쓰므로 --jobs를 늘려도 분당 한도를 넘지 않습니다.
+--parse-workers N을 주면 응답 디코딩/파싱을 N개 프로세스가 나눠 맡습니다. (모든 검색이 한 풀을 같이 씀)
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from download_checkpoint import DEFAULT_CHECKPOINT_DIR
+import parallel_parse
+from instrumentation import Trace, configure_from_env, tracing
+from patent_searcher import NO_RESULTS, get_total_hits, save_all_patents_sharded, save_all_patents_to_csv
+from projections import DEFAULT_PROFILE, PROFILES
+
+FORMATS = ('parquet', 'csv', 'xlsx')
+DEFAULT_JOBS = 4
+DOWNLOAD_LIMIT = 50000      # save_all_patents_to_csv가 받는 최대 건수 (넘으면 날짜 구간 분할)
+PROGRESS_INTERVAL = 10.0    # 검색별 진행 상황 출력 간격(초)
+SIMPLE_FIELDS = ('search_term', 'search_fields', 'applicant', 'ipc_cpc', 'date_type', 'start_year', 'end_year', 'status_filter')
+DEFAULT_SEARCH_FIELDS = ['title', 'abstract']
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+
+# ==============================================================================
+#  검색 명세 읽기
+# ==============================================================================
+def spec_to_params(spec):
+    """명세 -> build_query용 search_params (main.py의 get_search_params와 같은 형식)"""
+    if spec.get("query"):
+        return {'query_type': 'advanced', 'search_term': spec["query"]}
+    params = {'query_type': 'simple', **{key: spec[key] for key in SIMPLE_FIELDS if spec.get(key) is not None}}
+    params.setdefault('search_fields', DEFAULT_SEARCH_FIELDS)
+    for key in ('start_year', 'end_year'): # 명세에는 숫자로 적어도 됨
+        if key in params:
+            params[key] = str(params[key])
+    return params
+
+
+def read_specs(path):
+    """명세 파일 -> ([명세, ...], [(줄 번호, 에러 메시지), ...]). 이름이 없거나 겹치면 파일에 쓸 수 있는 고유한 이름을 붙입니다."""
+    specs, errors, names = [], [], set()
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                spec = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append((line_number, f"JSON 형식 오류: {e}"))
+                continue
+            error = validate_spec(spec)
+            if error:
+                errors.append((line_number, error))
+                continue
+            name = re.sub(r'[^\w.-]+', '_', str(spec.get("name") or f"query-{line_number}")).strip('._') or f"query-{line_number}"
+            unique, n = name, 2
+            while unique in names:
+                unique, n = f"{name}-{n}", n + 1
+            names.add(unique)
+            specs.append(dict(spec, name=unique))
+    return specs, errors
+
+
+def validate_spec(spec):
+    if not isinstance(spec, dict):
+        return "명세는 JSON 객체여야 합니다."
+    if not (spec.get("saved_search_id") or spec.get("query") or spec.get("search_term")):
+        return "query, search_term, saved_search_id 중 하나는 있어야 합니다."
+    if spec.get("profile", DEFAULT_PROFILE) not in PROFILES:
+        return f"알 수 없는 profile: {spec['profile']} (사용 가능: {', '.join(PROFILES)})"
+    if spec.get("format") is not None and spec["format"] not in FORMATS:
+        return f"알 수 없는 format: {spec['format']} (사용 가능: {', '.join(FORMATS)})"
+    if spec.get("sharded", "auto") not in (True, False, "auto"):
+        return "sharded는 true, false, \"auto\" 중 하나입니다."
+    return None
+
+
+# ==============================================================================
+#  결과 파일 쓰기 (항상 Parquet으로 받은 뒤 요청한 형식으로 변환)
+# ==============================================================================
+def export_parquet(parquet_path, dest, output_format, keep_source=False):
+    """Parquet을 dest에 output_format으로 씁니다. keep_source=False면 원본 Parquet은 옮기거나 지웁니다."""
+    tmp = dest + ".tmp"
+    if output_format == 'parquet':
+        (shutil.copyfile if keep_source else shutil.move)(parquet_path, tmp)
+    elif output_format == 'csv':
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+        with open(tmp, 'wb') as f:
+            f.write('\ufeff'.encode('utf-8')) # 엑셀에서 바로 열리도록 화면의 CSV와 같은 utf-8-sig
+            with pa_csv.CSVWriter(f, parquet_file.schema_arrow) as writer:
+                for batch in parquet_file.iter_batches():
+                    writer.write_batch(batch)
+    else:
+        from excel_export import write_excel # openpyxl은 엑셀로 내보낼 때만 import
+        write_excel(parquet_path, tmp)
+    os.replace(tmp, dest)
+    if output_format != 'parquet' and not keep_source:
+        os.remove(parquet_path)
+
+
+# ==============================================================================
+#  검색 하나 실행
+# ==============================================================================
+def run_spec(api_key, spec, out_dir, output_format, stop_event, interrupted=None, saved_searches=None, use_store=False):
+    """검색 하나를 내려받아 파일로 씁니다. 반환값: 요약 dict (state: completed / empty / failed / cancelled)
+
+    stop_event는 이 검색 전용이어야 합니다. (다운로드가 끝날 때 파이프라인이 세우므로 검색끼리 나눠 쓰면 서로를 멈춤)
+    interrupted가 세워진 상태에서 실패한 검색은 취소(cancelled)로 봅니다.
+    """
+    name = spec["name"]
+    output_format = spec.get("format") or output_format
+    profile = spec.get("profile", DEFAULT_PROFILE)
+    result = {"name": name, "state": None, "total_hits": 0, "records": 0, "sharded": False, "path": None, "bytes": 0,
+              "seconds": 0.0, "error": None, "perf": None}
+    trace = Trace("batch", query=name, profile=profile)
+    processed = 0
+    last_log = time.monotonic()
+
+    def progress(num_processed, total, elapsed):
+        nonlocal processed, last_log
+        processed = num_processed
+        if time.monotonic() - last_log >= PROGRESS_INTERVAL:
+            last_log = time.monotonic()
+            log(f"[{name}] {num_processed:,} / {total:,}건 ({elapsed:.0f}초)")
+
+    start = time.perf_counter()
+    log(f"[{name}] 시작")
+    try:
+        with tracing(trace):
+            keep_source = False
+            if spec.get("saved_search_id"):
+                if saved_searches is None:
+                    from saved_searches import SavedSearchStore
+                    saved_searches = SavedSearchStore()
+                delta_path, total_hits, error = saved_searches.refresh(api_key, spec["saved_search_id"], progress_callback=progress,
+                                                                       checkpoint_dir=DEFAULT_CHECKPOINT_DIR, stop_event=stop_event)
+                if delta_path: # 이번에 받은 증분은 저장된 검색에 이미 복사됨
+                    os.remove(delta_path)
+                # 새로 고친 뒤의 전체 데이터셋을 내보냄 (저장된 검색의 파일은 그대로 둠)
+                parquet_path, keep_source = (None, False) if error else (saved_searches.dataset_path(spec["saved_search_id"]), True)
+                result["fetched"] = total_hits   # 이번 새로 고침에서 받은 건수 (records는 누적 데이터셋 건수)
+            else:
+                search_params = spec_to_params(spec)
+                total_hits, error = get_total_hits(api_key, search_params)
+                result["total_hits"] = total_hits or 0
+                parquet_path = None
+                if not error and total_hits:
+                    sharded = spec.get("sharded", "auto")
+                    sharded = result["sharded"] = total_hits > DOWNLOAD_LIMIT if sharded == "auto" else sharded
+                    if sharded:
+                        parquet_path, _, error = save_all_patents_sharded(
+                            api_key, search_params, progress_callback=progress, checkpoint_dir=DEFAULT_CHECKPOINT_DIR,
+                            output_format='parquet', stop_event=stop_event, profile=profile)
+                    else:
+                        store = None
+                        if use_store:
+                            from patent_store import PatentStore
+                            store = PatentStore()
+                        try:
+                            parquet_path, _, error = save_all_patents_to_csv(
+                                api_key, search_params, progress_callback=progress, store=store, output_format='parquet',
+                                stop_event=stop_event, profile=profile)
+                        finally:
+                            if store is not None:
+                                store.close()
+
+            if error and error != NO_RESULTS:
+                result.update(state='cancelled' if interrupted is not None and interrupted.is_set() else 'failed', error=error)
+            elif not parquet_path:
+                result.update(state='empty')
+            else:
+                import pyarrow.parquet as pq
+                result["records"] = pq.read_metadata(parquet_path).num_rows
+                dest = os.path.join(out_dir, f"{name}.{output_format}")
+                export_parquet(parquet_path, dest, output_format, keep_source=keep_source)
+                result.update(state='completed', path=dest, bytes=os.path.getsize(dest))
+                if result["sharded"] and result["records"] < result["total_hits"]:
+                    result["missing"] = result["total_hits"] - result["records"]   # 분할 구간에서 빠진 건수
+    except Exception as e:
+        result.update(state='failed', error=f"Error: {e}")
+
+    result["seconds"] = time.perf_counter() - start
+    result["perf"] = trace.finish(records=result["records"] or processed, state=result["state"])
+    if result["state"] == 'failed':
+        log(f"[{name}] 실패: {result['error']}")
+    elif "fetched" in result:
+        log(f"[{name}] {result['state']}: 데이터셋 {result['records']:,}건, 이번에 받은 {result['fetched']:,}건 ({result['seconds']:.1f}초)")
+    else:
+        log(f"[{name}] {result['state']}: {result['records']:,}건 / 총 {result['total_hits']:,}건 ({result['seconds']:.1f}초)")
+        if result.get("missing"):
+            log(f"[{name}] 경고: 분할 다운로드에서 {result['missing']:,}건이 빠졌습니다.")
+    return result
+
+
+# ==============================================================================
+#  실행기
+# ==============================================================================
+def run_batch(api_key, specs, out_dir, output_format='parquet', jobs=DEFAULT_JOBS, use_store=False):
+    """명세들을 jobs개씩 동시에 실행하고 명세 순서대로 요약 목록을 돌려줍니다. Ctrl+C면 실행 중인 다운로드를 멈춥니다."""
+    os.makedirs(out_dir, exist_ok=True)
+    interrupted = threading.Event()
+    stop_events = [threading.Event() for _ in specs]
+    saved_searches = None
+    if any(spec.get("saved_search_id") for spec in specs):
+        from saved_searches import SavedSearchStore
+        saved_searches = SavedSearchStore()
+    executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="lens-batch")
+    futures = [executor.submit(run_spec, api_key, spec, out_dir, output_format, stop_event, interrupted, saved_searches, use_store)
+               for spec, stop_event in zip(specs, stop_events)]
+    try:
+        results = [future.result() for future in futures]
+    except KeyboardInterrupt:
+        log("중단 요청: 실행 중인 다운로드를 멈춥니다. (분할 다운로드는 다음 실행에서 이어받음)")
+        interrupted.set()
+        for stop_event in stop_events:
+            stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        results = [future.result() if future.done() and not future.cancelled() else
+                   {"name": spec["name"], "state": 'cancelled', "error": "실행 전에 중단되었습니다."}
+                   for spec, future in zip(specs, futures)]
+    executor.shutdown(wait=True)
+    return results
+
+
+def write_summary(path, results, invalid, started_at, seconds):
+    summary = {
+        "started_at": started_at, "seconds": seconds,
+        "counts": {state: sum(result["state"] == state for result in results) for state in ('completed', 'empty', 'failed', 'cancelled')},
+        "records": sum(result.get("records", 0) for result in results),
+        "invalid_lines": [{"line": line, "error": error} for line, error in invalid],
+        "queries": results,
+    }
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('specs', nargs='?', help="검색 명세 파일 (JSON Lines)")
+    parser.add_argument('--out', default="lens_results", help="결과 폴더 (기본: lens_results)")
+    parser.add_argument('--format', choices=FORMATS, default='parquet', help="명세에 format이 없을 때의 결과 형식")
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="동시에 실행할 검색 수")
+    parser.add_argument('--api-key', default=os.environ.get("LENS_API_KEY"), help="Lens API 키 (기본: LENS_API_KEY 환경 변수)")
+    parser.add_argument('--all-saved', action='store_true', help="이 API 키로 저장한 검색을 모두 새로 고침")
+    parser.add_argument('--store', action='store_true', help="로컬 특허 저장소를 거쳐 이미 받은 특허는 다시 받지 않음 (분할 다운로드 제외)")
+    parser.add_argument('--parse-workers', type=int, default=parallel_parse.PARSE_WORKERS,
+                        help="응답 디코딩/파싱을 맡길 프로세스 수 (기본: LENS_PARSE_WORKERS 환경 변수, 0이면 다운로드 스레드에서 파싱)")
+    args = parser.parse_args(argv)
+    if not args.api_key:
+        parser.error("--api-key 또는 LENS_API_KEY 환경 변수가 필요합니다.")
+    if not args.specs and not args.all_saved:
+        parser.error("검색 명세 파일이나 --all-saved 중 하나는 필요합니다.")
+
+    configure_from_env()
+    parallel_parse.configure(args.parse_workers)
+    specs, invalid = read_specs(args.specs) if args.specs else ([], [])
+    for line_number, error in invalid:
+        log(f"{args.specs}:{line_number} 건너뜀 - {error}")
+    if args.all_saved:
+        from saved_searches import SavedSearchStore
+        specs += [{"name": f"saved-{search['search_id']}", "saved_search_id": search["search_id"]}
+                  for search in SavedSearchStore().list_searches(args.api_key)]
+
+    started_at, start = time.time(), time.perf_counter()
+    results = run_batch(args.api_key, specs, args.out, args.format, args.jobs, args.store)
+    summary = write_summary(os.path.join(args.out, "summary.json"), results, invalid, started_at, time.perf_counter() - start)
+
+    counts = summary["counts"]
+    log(f"끝: {len(results)}개 검색 ({counts['completed']} 완료, {counts['empty']} 결과 없음, {counts['failed']} 실패, "
+        f"{counts['cancelled']} 취소, 명세 오류 {len(invalid)}줄) · {summary['records']:,}건 · {summary['seconds']:.1f}초 "
+        f"· 요약 {os.path.join(args.out, 'summary.json')}")
+    return 1 if counts['failed'] or counts['cancelled'] or invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import record_request
+from rate_limiter import DEFAULT_MAX_RETRIES, call_with_retry, get_rate_limiter
+
+API_URL = os.environ.get("LENS_API_URL", "https://api.lens.org/patent/search")
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+POOL_SIZE = 16   # 샤드 병렬 다운로드 스레드 수보다 넉넉하게
+
+
+# ==============================================================================
+#  Lens API 클라이언트 (커넥션 풀을 재사용하는 requests.Session)
+# ==============================================================================
+class LensClient:
+    """API 키 하나에 대한 HTTP 세션을 유지합니다.
+
+    keep-alive 커넥션 풀, gzip/deflate 응답 압축, connect/read 타임아웃을 한 곳에서 설정하고,
+    속도 조절과 429/5xx 재시도는 API 키별 공유 RateLimiter에 맡깁니다.
+    """
+
+    def __init__(self, api_key, base_url=API_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 pool_size=POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES, rate_limiter=None):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter or get_rate_limiter(api_key)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        # 어댑터는 재시도하지 않음: 연결 오류/타임아웃도 call_with_retry 한 곳에서 재시도해 백오프와 계측(record_retry)이 한 번만 일어나게 함
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def search(self, payload, rate_limiter=None, label="other", raw=False):
+        """검색 API를 호출해 JSON을 돌려줍니다. 204(scroll 끝)는 None, 재시도 후에도 실패하면 HTTPError 등을 던집니다.
+
+        raw=True면 디코딩하지 않은 응답 본문(bytes)을 돌려줍니다. (병렬 파싱 워커가 디코딩)
+
+        응답 크기와 지연 시간은 label(예: projection 프로필 이름)별로 transfer_stats에 누적되고,
+        최종 응답 코드와 함께 instrumentation 이벤트(request)로도 남깁니다.
+        """
+        body = json.dumps(payload)
+        start = time.perf_counter()
+        response = call_with_retry(
+            lambda: self.session.post(self.base_url, data=body, timeout=self.timeout),
+            rate_limiter or self.rate_limiter, max_retries=self.max_retries,
+            retry_exceptions=(requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        seconds = time.perf_counter() - start
+        if response.status_code == 204:
+            record_request(label, 204, seconds, 0, 0)
+            return None
+        record_request(label, response.status_code, seconds, *_response_sizes(response))
+        response.raise_for_status()
+        transfer_stats.record(label, response, seconds)
+        return response.content if raw else response.json()
+
+    def close(self):
+        self.session.close()
+
+
+# ==============================================================================
+#  응답 전송량 계측 (label별 페이지 수, 압축 전/후 바이트, 지연 시간)
+# ==============================================================================
+class TransferStats:
+    """LensClient.search 응답을 label별로 누적합니다. 여러 스레드/클라이언트가 함께 씁니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, label, response, seconds):
+        decoded, wire = _response_sizes(response)
+        with self._lock:
+            totals = self._totals.setdefault(label, {"pages": 0, "bytes": 0, "wire_bytes": 0, "seconds": 0.0})
+            totals["pages"] += 1
+            totals["bytes"] += decoded
+            totals["wire_bytes"] += wire
+            totals["seconds"] += seconds
+
+    def summary(self):
+        """{label: {pages, bytes, wire_bytes, seconds, bytes_per_page, wire_bytes_per_page, ms_per_page}}"""
+        with self._lock:
+            return {label: dict(totals,
+                                bytes_per_page=totals["bytes"] / totals["pages"],
+                                wire_bytes_per_page=totals["wire_bytes"] / totals["pages"],
+                                ms_per_page=totals["seconds"] * 1000 / totals["pages"])
+                    for label, totals in self._totals.items()}
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+def _response_sizes(response):
+    """(압축 해제 후 크기, 전송 크기). gzip 응답이면 Content-Length가 압축된 전송 크기입니다."""
+    decoded = len(response.content)
+    wire = response.headers.get('Content-Length')
+    return decoded, int(wire) if wire and wire.isdigit() else decoded
+
+
+transfer_stats = TransferStats()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """API 키마다 하나의 LensClient를 돌려줍니다. (모든 호출/스레드가 커넥션 풀과 속도 한도를 공유)"""
+    key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = LensClient(api_key)
+        return _clients[key]
@@ -1,17 +1,69 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timedelta
-import io
+import functools
 import os
 import time
-from patent_searcher import get_total_hits, save_all_patents_to_csv
+from patent_searcher import fetch_raw_document, get_total_hits, shard_checkpoint_params
+from query_cache import QueryCache
+from download_checkpoint import DEFAULT_CHECKPOINT_DIR, DownloadCheckpoint
+from raw_store import RawDocumentStore
+from excel_export import excel_file
+from job_manager import COMPLETED, QUEUED, RUNNING, JobManager
+from dashboard_metrics import FAMILY_RULES, get_dashboard_metrics, get_family_view, set_dataset_owner
+from dashboard import render_citation_panel, render_dashboard_metrics, render_facet_explorer, render_performance_panel
+from facet_index import get_facet_index
+from citation_graph import get_citation_graph
+from quick_analytics import fetch_quick_metrics
+from projections import DEFAULT_PROFILE, PROFILE_LABELS, RAW_ARCHIVE_PROFILE
+from lens_client import transfer_stats
+from instrumentation import Trace, configure_from_env, tracing
+from saved_searches import SavedSearchStore
+from dataset_registry import DatasetRegistry
 import plotly.express as px
 
+JOB_STATE_LABELS = {'queued': "⏳ 대기 중", 'running': "🔄 다운로드 중", 'completed': "✅ 완료", 'failed': "❌ 실패", 'cancelled': "⏹️ 취소됨"}
+
 # --- 1. 페이지 설정 ---
 st.set_page_config(page_title="특허 검색 시스템", layout="wide")
 st.title("🔬 특허 검색 및 분석 시스템")
 st.caption("Lens.org API를 이용한 특허 정보 검색 및 시각화")
 
+# 원본 JSON 보관소 (표에는 파생 필드만 두고, 특허를 열어볼 때만 원본을 읽음)
+@st.cache_resource
+def get_raw_store():
+    return RawDocumentStore()
+
+# 저장된 검색 (검색 조건 + 워터마크, 새로 고침하면 새로 공개된 특허만 받아 덧붙임)
+@st.cache_resource
+def get_saved_searches():
+    return SavedSearchStore()
+
+# 대시보드 데이터셋 (서버 전체가 공유, 세션은 dataset_id만 보관하고 메모리 예산을 넘으면 오래 안 쓴 것부터 내림)
+# 지표/패밀리 보기/패싯/인용 그래프도 데이터셋 항목에 캐시해 같은 예산으로 관리
+@st.cache_resource
+def get_datasets():
+    registry = DatasetRegistry()
+    set_dataset_owner(registry)
+    return registry
+
+# 다운로드 작업 관리자 (서버 전체가 공유, API 키별 동시 실행 제한 + 대기열)
+# 로컬 특허 저장소를 거쳐 겹치는 검색은 새로 받은 특허만 다운로드합니다.
+@st.cache_resource
+def get_job_manager():
+    return JobManager(raw_store=get_raw_store(), checkpoint_dir=DEFAULT_CHECKPOINT_DIR, saved_searches=get_saved_searches())
+
+# 총 건수 조회 결과 캐시 (LENS_QUERY_CACHE 경로를 지정하면 디스크 계층을 여러 프로세스가 공유)
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(disk_path=os.environ.get("LENS_QUERY_CACHE"))
+
+# 계측 sink (LENS_METRICS_LOG: JSON Lines 로그, LENS_METRICS_PORT: Prometheus /metrics) - 프로세스마다 한 번만 등록
+@st.cache_resource
+def setup_instrumentation():
+    configure_from_env()
+
+setup_instrumentation()
+
 # --- 2. 세션 상태 초기화 ---
 if 'api_key' not in st.session_state:
     st.session_state.api_key = ''
@@ -24,8 +76,11 @@ if 'params' not in st.session_state:
 if 'search_result' not in st.session_state:
     st.session_state.search_result = None
 # 대시보드용 데이터프레임을 저장할 공간을 만듭니다.
-if 'df_for_dashboard' not in st.session_state:
-    st.session_state.df_for_dashboard = None
+if 'dataset_id' not in st.session_state:
+    st.session_state.dataset_id = None
+# 빠른 분석(서버 집계) 결과: 전체 다운로드 전에도 대시보드를 그릴 수 있습니다.
+if 'quick_metrics' not in st.session_state:
+    st.session_state.quick_metrics = None
 
 # --- 3. 사이드바 (API 키 입력) ---
 with st.sidebar:
@@ -34,6 +89,15 @@ with st.sidebar:
         "Lens.org API 키", type="password", value=st.session_state.api_key
     )
     st.markdown("---")
+    if st.button("🧹 검색 결과 캐시 비우기", use_container_width=True):
+        get_query_cache().invalidate()
+        st.toast("검색 결과 캐시를 비웠습니다.")
+    # 프로필별 응답 크기 (필드를 줄인 프로필이 실제로 얼마나 덜 받는지 확인용)
+    with st.expander("📶 전송량 (프로필별)"):
+        stats = transfer_stats.summary()
+        if not stats: st.caption("아직 받은 응답이 없습니다.")
+        for label, stat in stats.items():
+            st.caption(f"**{label}** · {stat['pages']:,}페이지 · 페이지당 {stat['bytes_per_page'] / 1024:,.1f} KB · {stat['ms_per_page']:,.0f} ms")
 
 if not st.session_state.api_key:
     st.info("👈 사이드바에 Lens.org API 키를 입력하고 Enter를 누르세요.")
@@ -115,15 +179,17 @@ with main_tab_search:
                 st.session_state.search_result = None
             else:
                 start_time = time.time()
-                with st.spinner("총 검색 건수를 확인 중입니다..."):
-                    total_hits, error = get_total_hits(st.session_state.api_key, search_params)
+                trace = Trace("search")
+                with st.spinner("총 검색 건수를 확인 중입니다..."), tracing(trace):
+                    total_hits, error = get_total_hits(st.session_state.api_key, search_params, cache=get_query_cache())
                 end_time = time.time()
                 if error:
                     st.error(f"오류: {error}")
                     st.session_state.search_result = None
                 else:
                     search_time = end_time - start_time
-                    st.session_state.search_result = {"total_hits": total_hits, "search_params": search_params, "search_time": search_time}
+                    st.session_state.search_result = {"total_hits": total_hits, "search_params": search_params, "search_time": search_time,
+                                                      "perf": trace.finish(total_hits=total_hits)}
 
     with col_reset:
         if st.button("🔄 조건 초기화", use_container_width=True):
@@ -133,9 +199,70 @@ with main_tab_search:
                 'search_term_advanced': ''
             }
             st.session_state.search_result = None
-            st.session_state.df_for_dashboard = None
+            st.session_state.dataset_id = None
+            st.session_state.quick_metrics = None
             st.rerun()
 
+    # --- 다운로드 작업 목록 (2초마다 이 부분만 다시 그려 진행 상황을 표시) ---
+    def format_time(s): return str(timedelta(seconds=int(s)))
+
+    def open_in_dashboard(path, search_params, fetched_at, profile, variant, label):
+        try:
+            # 공유 저장소에 등록하고 세션에는 id만 둠 (같은 데이터셋을 연 세션들은 DataFrame 한 벌을 같이 씀)
+            dataset_id = get_datasets().register(path, search_params, fetched_at, profile=profile, variant=variant, label=label)
+            get_datasets().get(dataset_id) # 스키마가 정해진 Parquet을 메모리 맵으로 읽음 (dtype 재추론 없음)
+            st.session_state.dataset_id = dataset_id
+            st.rerun(scope="app")
+        except Exception as e:
+            st.error(f"파일 변환 중 오류 발생: {e}")
+
+    @st.fragment(run_every=2)
+    def show_jobs():
+        jobs = get_job_manager().list_jobs(st.session_state.api_key)
+        if not jobs:
+            return
+        st.subheader("📥 다운로드 작업")
+        for job in jobs:
+            job_id = job["job_id"]
+            with st.container(border=True):
+                st.markdown(f"**{job['label']}** · `{job_id}` · {JOB_STATE_LABELS[job['state']]}")
+                if job["state"] == QUEUED:
+                    if st.button("취소", key=f"cancel_{job_id}"): get_job_manager().cancel(job_id)
+                elif job["state"] == RUNNING:
+                    progress_value = min(job["processed"] / job["total"] if job["total"] > 0 else 0, 1.0)
+                    st.progress(progress_value, text=f"총 {job['total']:,}건 중 {job['processed']:,}건 수집 완료... (⏰ {format_time(job['elapsed'])})")
+                    if st.button("취소", key=f"cancel_{job_id}"): get_job_manager().cancel(job_id)
+                elif job["state"] == COMPLETED:
+                    if job["sharded"] and job["processed"] < (job["total_hits"] or 0):
+                        st.warning(f"검색 결과 {job['total_hits']:,}건 중 {job['processed']:,}건만 받았습니다. "
+                                   f"(분할 구간에서 {job['total_hits'] - job['processed']:,}건 누락)")
+                    render_performance_panel(job.get("perf"))
+                    stats = job["store_stats"]
+                    if stats:
+                        st.caption(f"💾 로컬 저장소 적중률 {stats['hit_rate']:.0%} ({stats['hits']:,}/{stats['total']:,}건), "
+                                   f"재다운로드 절약 {stats['bytes_saved'] / 1024 / 1024:,.1f} MB")
+                    if not job["result_path"]: # 저장된 검색 새로 고침에서 새로 공개된 특허가 없던 경우
+                        st.caption("새로 공개된 특허가 없습니다.")
+                        if st.button("🗑️ 삭제", key=f"delete_{job_id}"): get_job_manager().delete(job_id)
+                        continue
+                    col_open, col_excel, col_delete = st.columns([2, 2, 1])
+                    with col_open:
+                        if st.button("📊 대시보드로 불러오기", key=f"open_{job_id}", use_container_width=True):
+                            open_in_dashboard(job["result_path"], job["search_params"], job["finished_at"], job.get("profile"),
+                                              'delta' if job.get("saved_search_id") else 'full', job["label"])
+                    with col_excel:
+                        # 엑셀은 버튼을 눌렀을 때만 Parquet에서 스트리밍으로 생성 (시트 자동 분할, 화면은 다시 그리지 않음)
+                        st.download_button(label="✅ 엑셀 파일 다운로드", data=functools.partial(excel_file, job["result_path"]),
+                                           file_name=f"patent_results_{job_id}.xlsx",
+                                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                           on_click="ignore", key=f"excel_{job_id}", use_container_width=True)
+                    with col_delete:
+                        if st.button("🗑️ 삭제", key=f"delete_{job_id}", use_container_width=True): get_job_manager().delete(job_id)
+                else:
+                    if job["error"]: st.error(f"다운로드 중 오류 발생: {job['error']}")
+                    render_performance_panel(job.get("perf"))
+                    if st.button("🗑️ 삭제", key=f"delete_{job_id}"): get_job_manager().delete(job_id)
+
     # --- 기존 결과 표시 및 다운로드 ---
     if 'search_result' in st.session_state and st.session_state.search_result:
         total_hits = st.session_state.search_result["total_hits"]
@@ -143,53 +270,82 @@ with main_tab_search:
         search_time = st.session_state.search_result["search_time"]
 
         st.info(f"검색에 소요된 시간: {search_time:.2f}초")
+        render_performance_panel(st.session_state.search_result.get("perf"))
 
         if total_hits > 0:
             st.success(f"총 {total_hits:,} 건의 특허가 검색되었습니다.")
+            if st.button("⚡ 빠른 분석 (다운로드 없이 서버 집계로 대시보드 생성)", use_container_width=True):
+                with st.spinner("Lens 서버에서 집계 중입니다..."):
+                    quick_metrics, error = fetch_quick_metrics(st.session_state.api_key, search_params, cache=get_query_cache())
+                if error: st.error(f"오류: {error}")
+                else:
+                    st.session_state.quick_metrics = quick_metrics
+                    st.info("💡 상단의 '📊 분석 대시보드' 탭에서 결과를 확인하세요. 레코드가 필요하면 아래에서 전체 다운로드를 시작하세요.")
             limit = 50000
-            download_count = min(total_hits, limit)
-            if total_hits > limit: st.warning(f"검색 결과가 많아, 다운로드는 최대 {limit:,}건으로 제한됩니다.")
-
-            if st.button(f"엑셀 다운로드 및 대시보드 생성 ({download_count:,} 건)", use_container_width=True):
-                placeholder = st.empty(); placeholder.info("전체 데이터 수집을 시작합니다...")
-                progress_bar = st.progress(0, text="데이터 수집 준비 중...")
-                time_placeholder = st.empty()
-
-                def format_time(s): return str(timedelta(seconds=int(s)))
-                def update_progress(processed, total_to_download, elapsed):
-                    progress_value = min(processed / total_to_download if total_to_download > 0 else 0, 1.0)
-                    progress_text = f"총 {total_to_download:,}건 중 {processed:,}건 수집 완료..."
-                    progress_bar.progress(progress_value, text=progress_text)
-                    time_placeholder.metric(label="⏰ 경과 시간", value=format_time(elapsed))
-
-                temp_csv_path, _, error = save_all_patents_to_csv(st.session_state.api_key, search_params, progress_callback=update_progress)
-
-                placeholder.empty(); time_placeholder.empty()
-                if error: st.error(f"다운로드 중 오류 발생: {error}")
-                elif temp_csv_path:
-                    progress_bar.success("데이터 수집 완료! 파일 생성 및 대시보드 데이터 준비 중...")
-
-                    with st.spinner("파일 변환 및 대시보드 데이터 로딩 중..."):
-                        try:
-                            df_all = pd.read_csv(temp_csv_path)
-                            df_all.drop_duplicates(subset=['lens_id'], keep='first', inplace=True)
-                        except Exception as e:
-                            st.error(f"파일 변환 중 오류 발생: {e}")
-                            df_all = pd.DataFrame()
-
-                        # ★★★ 핵심: 수집된 데이터를 대시보드 탭을 위해 세션 상태에 저장 ★★★
-                        st.session_state.df_for_dashboard = df_all.copy()
-
-                        output = io.BytesIO()
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer: df_all.to_excel(writer, index=False, sheet_name='Sheet1')
-                        excel_data = output.getvalue()
-
-                    st.download_button(label="✅ 엑셀 파일 다운로드", data=excel_data, file_name="patent_results.xlsx", mime="application/vnd.ms-excel", use_container_width=True)
-                    st.info("💡 데이터 준비 완료! 상단의 '📊 분석 대시보드' 탭에서 시각화 자료를 확인하세요.")
-                    os.remove(temp_csv_path)
+            use_sharded = st.checkbox("⚡ 날짜 구간 분할 병렬 다운로드 (건수 제한 없음)", value=total_hits > limit,
+                                      help="검색 결과를 날짜 구간별로 나눠 여러 scroll 세션으로 동시에 내려받습니다.")
+            download_count = total_hits if use_sharded else min(total_hits, limit)
+            include_raw = st.checkbox("엑셀에 원본 JSON(raw_json) 컬럼 포함", value=False,
+                                      help="원본 JSON은 셀이 매우 커서 기본적으로 제외됩니다. 대시보드의 '특허 원본 JSON 보기'에서 특허별로 열어볼 수 있습니다. (보관되지 않은 특허는 열 때 받아옴)")
+            profiles = list(PROFILE_LABELS)
+            profile = st.selectbox("받을 필드 범위", profiles, index=profiles.index(DEFAULT_PROFILE), format_func=PROFILE_LABELS.get,
+                                   disabled=include_raw,
+                                   help="필요한 필드만 요청하면 페이지당 전송량이 줄어듭니다. 받지 않은 필드의 컬럼은 비어 있습니다.")
+            if include_raw: profile = RAW_ARCHIVE_PROFILE # 원본 JSON은 문서 전체가 필요
+            if use_sharded and DownloadCheckpoint(shard_checkpoint_params(search_params, profile, include_raw)).load():
+                st.info("🔁 이전에 중단된 다운로드가 있습니다. 다운로드를 누르면 중단된 지점부터 이어받습니다.")
+            if total_hits > limit and not use_sharded: st.warning(f"검색 결과가 많아, 다운로드는 최대 {limit:,}건으로 제한됩니다.")
+
+            if st.button(f"다운로드 작업 시작 ({download_count:,} 건)", use_container_width=True):
+                # 다운로드는 작업 관리자의 백그라운드 스레드에서 실행 (화면을 조작하거나 다른 탭으로 가도 계속 진행)
+                try:
+                    get_job_manager().submit(st.session_state.api_key, search_params, sharded=use_sharded, include_raw=include_raw,
+                                             label=search_params.get('search_term') or "고급 검색식", profile=profile)
+                    st.toast("다운로드 작업을 시작했습니다. 아래 작업 목록에서 진행 상황을 확인하세요.")
+                except ValueError as e:
+                    st.error(str(e))
+            if st.button("📌 이 검색 저장 (새로 고침하면 새로 공개된 특허만 받음)", use_container_width=True):
+                try:
+                    get_saved_searches().create(st.session_state.api_key, search_params,
+                                                label=search_params.get('search_term') or "고급 검색식", profile=profile)
+                    st.toast("검색을 저장했습니다. 아래 '저장된 검색'에서 새로 고침하세요.")
+                except ValueError as e:
+                    st.error(f"오류: {e}")
         else:
             st.info("검색 결과가 없습니다.")
 
+    show_jobs()
+
+    # --- 저장된 검색 (첫 새로 고침은 전체, 이후에는 워터마크 이후 공개분만 받음) ---
+    saved = get_saved_searches().list_searches(st.session_state.api_key)
+    if saved:
+        st.subheader("📌 저장된 검색")
+    for search in saved:
+        search_id = search["search_id"]
+        with st.container(border=True):
+            st.markdown(f"**{search['label']}** · `{search_id}` · {PROFILE_LABELS[search['profile']]}")
+            if search["watermark"]:
+                delta = search["last_delta"]
+                st.caption(f"누적 {search['num_records']:,}건 · 최근 공개일 {search['watermark']} · "
+                           f"마지막 새로 고침 {datetime.fromtimestamp(search['refreshed_at']):%Y-%m-%d %H:%M} "
+                           f"(신규 {delta['new']:,}건, 갱신 {delta['updated']:,}건)")
+            else:
+                st.caption("아직 동기화하지 않았습니다. 첫 새로 고침은 전체 결과를 받습니다.")
+            col_refresh, col_open, col_delete = st.columns([2, 2, 1])
+            with col_refresh:
+                if st.button("🔄 새로 고침", key=f"refresh_{search_id}", use_container_width=True):
+                    get_job_manager().submit(st.session_state.api_key, search["search_params"], label=f"🔁 {search['label']}",
+                                             profile=search["profile"], saved_search_id=search_id)
+                    st.toast("새로 고침 작업을 시작했습니다. 위 작업 목록에서 진행 상황을 확인하세요.")
+            with col_open:
+                if search["parts"] and st.button("📊 전체 데이터셋 불러오기", key=f"open_saved_{search_id}", use_container_width=True):
+                    open_in_dashboard(get_saved_searches().dataset_path(search_id), search["search_params"], search["refreshed_at"],
+                                      search["profile"], 'saved', search["label"])
+            with col_delete:
+                if st.button("🗑️ 삭제", key=f"delete_saved_{search_id}", use_container_width=True):
+                    get_saved_searches().delete(search_id)
+                    st.rerun()
+
 
 # ==========================================================================================
 #  두 번째 탭: 새로 추가된 분석 대시보드 기능
@@ -197,61 +353,72 @@ with main_tab_search:
 with main_tab_dashboard:
     st.header("📊 분석 대시보드")
 
-    if st.session_state.df_for_dashboard is not None:
-        df = st.session_state.df_for_dashboard
-
-        st.success(f"**총 {len(df):,}건**의 특허 데이터를 기반으로 분석합니다.")
-        st.markdown("---")
-
-        # --- 1. 핵심 요약 ---
-        st.subheader("🔢 한눈에 보는 핵심 요약")
-        col1, col2, col3 = st.columns(3)
-        unique_applicants = df['applicants'].str.split(';').str[0].str.strip().nunique()
-        avg_citations = df['cited_by_patent_count'].mean()
-
-        with col1:
-            st.metric(label="총 특허 수", value=f"{len(df):,} 건")
-        with col2:
-            st.metric(label="핵심 출원인 수", value=f"{unique_applicants:,} 곳")
-        with col3:
-            st.metric(label="평균 피인용 수", value=f"{avg_citations:.1f} 회")
+    # --- 다운로드 중인 작업의 실시간 집계 (페이지가 들어올 때마다 누적된 값을 2초마다 다시 그림) ---
+    @st.fragment(run_every=2)
+    def show_live_dashboard():
+        running = [job for job in get_job_manager().list_jobs(st.session_state.api_key) if job["state"] == RUNNING]
+        if not running:
+            return
+        labels = {job["job_id"]: f"{job['label']} · {job['job_id']}" for job in running}
+        job_id = running[0]["job_id"] if len(running) == 1 else st.selectbox("실시간 집계할 작업", list(labels), format_func=labels.get)
+        job = next(job for job in running if job["job_id"] == job_id)
+        metrics = get_job_manager().live_metrics(job_id)
+        if metrics and metrics["total"]:
+            with st.expander(f"🔄 다운로드 중 실시간 집계: {job['label']} ({job['processed']:,} / {job['total']:,}건)",
+                             expanded=st.session_state.dataset_id is None):
+                render_dashboard_metrics(metrics)
+
+    show_live_dashboard()
+
+    # 세션에는 dataset_id만 있으므로 재실행마다 공유 저장소에서 꺼냄 (메모리에서 내려갔으면 디스크 사본을 다시 읽음)
+    df_dashboard = get_datasets().get(st.session_state.dataset_id) if st.session_state.dataset_id else None
+    if st.session_state.dataset_id and df_dashboard is None:
+        st.warning("불러온 데이터셋이 정리되었습니다. 작업 목록에서 다시 불러오세요.")
+        st.session_state.dataset_id = None
+
+    if df_dashboard is not None:
+        datasets = get_datasets().stats()
+        st.caption(f"📂 {get_datasets().label(st.session_state.dataset_id)} · {len(df_dashboard):,}건 · "
+                   f"공유 데이터셋 메모리 {datasets['resident_mb']:,.0f} / {datasets['budget_mb']:,.0f} MB ({datasets['resident']}개)")
+
+        # 집계 단위: 문서마다 세거나, 같은 발명의 여러 나라 출원(simple family)을 대표 문서 한 건으로 묶어 셈 (다시 받지 않음)
+        col_unit, col_rule = st.columns([1, 2])
+        with col_unit:
+            count_by = st.radio("집계 단위", options=['document', 'family'], horizontal=True,
+                                format_func=lambda x: {'document': '문서', 'family': '패밀리'}[x])
+        if count_by == 'family':
+            with col_rule:
+                family_rule = st.selectbox("패밀리 대표 문서", options=list(FAMILY_RULES), format_func=FAMILY_RULES.get)
+            df_view = get_family_view(df_dashboard, family_rule)
+            st.caption(f"문서 {len(df_dashboard):,}건 → 패밀리 {len(df_view):,}개")
+        else:
+            df_view = df_dashboard
+        # 지표는 데이터셋마다 한 번만 계산해 캐시 (위젯 조작으로 재실행될 때는 캐시된 값만 그림)
+        render_dashboard_metrics(get_dashboard_metrics(df_view))
 
+        # 다값 필드 역색인도 데이터셋마다 한 번만 만들어 캐시 (교차 필터는 배열 연산만 함)
         st.markdown("---")
+        render_facet_explorer(get_facet_index(df_view))
 
-        # --- 2. 주요 그래프 ---
-        col_graph1, col_graph2 = st.columns(2)
-
-        with col_graph1:
-            # 1. 연도별 출원 동향
-            st.subheader("📈 연도별 출원 동향")
-            df['application_year'] = pd.to_numeric(df['application_year'], errors='coerce')
-            yearly_counts = df['application_year'].value_counts().sort_index()
-            st.bar_chart(yearly_counts)
-
-            # 2. 핵심 출원인
-            st.subheader("🏢 핵심 출원인 (Top 10)")
-            main_applicant = df['applicants'].str.split(';').str[0].str.strip()
-            applicant_counts = main_applicant.value_counts().nlargest(10)
-            st.bar_chart(applicant_counts)
-
-        with col_graph2:
-            # 3. 출원인 국적 분포
-            st.subheader("🌍 출원인 국적 분포 (Top 15)")
-            nationality_counts = df['applicant_nationality'].value_counts().nlargest(15)
-            st.bar_chart(nationality_counts)
-
-            # 4. 주요 기술 분야 분포
-            st.subheader("🔬 주요 기술 분야 분포 (Top 15)")
-            ipc_counts = df['main_ipc_field'].value_counts().nlargest(15)
-            st.bar_chart(ipc_counts)
-            st.caption("IPC(국제특허분류) 코드 4단위 기준")
+        # 인용 그래프 (cited_lens_ids 컬럼에서 데이터셋 안 인용 관계만 뽑아 캐시)
         st.markdown("---")
-
-        # --- 3. 상세 데이터 ---
-        st.subheader("⭐ 가장 많이 인용된 특허 Top 10")
-        top_cited_patents = df.sort_values(by='cited_by_patent_count', ascending=False).head(10)
-        st.dataframe(top_cited_patents[['title', 'applicants', 'application_date', 'cited_by_patent_count']])
+        render_citation_panel(df_view, get_citation_graph(df_view))
+
+        # --- 4. 특허 원본 보기 (선택한 특허만 원본 보관소에서 읽음) ---
+        with st.expander("🔎 특허 원본 JSON 보기"):
+            lens_id = st.text_input("lens_id", placeholder="예: 000-000-000-000-000")
+            if lens_id:
+                raw_doc = get_raw_store().get(lens_id.strip())
+                if raw_doc is None: # 원본 보관 프로필로 받지 않은 특허는 이 문서 하나만 받아 보관
+                    with st.spinner("원본 보관소에 없어 Lens에서 원본을 받는 중입니다..."):
+                        raw_doc, error = fetch_raw_document(st.session_state.api_key, lens_id.strip(), get_raw_store())
+                    if error: st.error(f"오류: {error}")
+                if raw_doc is None: st.warning("해당 lens_id의 특허를 찾을 수 없습니다.")
+                else: st.json(raw_doc, expanded=False)
 
     else:
-        # 데이터가 없을 경우 안내 메시지
-        st.info("👈 먼저 '🔍 특허 검색 및 다운로드' 탭에서 데이터를 다운로드하고 대시보드를 생성해주세요.")
\ No newline at end of file
+        if st.session_state.quick_metrics is not None:
+            render_dashboard_metrics(st.session_state.quick_metrics)
+        else:
+            # 데이터가 없을 경우 안내 메시지
+            st.info("👈 먼저 '🔍 특허 검색 및 다운로드' 탭에서 데이터를 다운로드하고 대시보드를 생성해주세요.")
\ No newline at end of file
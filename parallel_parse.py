@@ -0,0 +1,100 @@
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+from batch_parser import parse_patents_batch
+from raw_store import encode_documents
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 라이브러리 json으로 디코딩/직렬화
+    orjson = None
+
+PARSE_WORKERS = int(os.environ.get("LENS_PARSE_WORKERS", "0"))   # 0이면 파싱을 다운로드 프로세스 안에서 함
+IN_FLIGHT_PER_WORKER = 2      # 워커마다 미리 넘겨 둘 페이지 수 (순서대로 돌려받음)
+SMALL_PAGE_BYTES = 4096       # 이보다 작은 응답(빈 페이지 등)은 전체를 디코딩해 확인
+# 응답 끝(Lens) 또는 앞부분에 있는 scroll_id. 문자열 안의 따옴표는 \" 로 이스케이프되므로 앞에 \ 가 없는 키만 찾음
+_SCROLL_ID = re.compile(rb'(?<!\\)"scroll_id"\s*:\s*"([^"\\]+)"')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def loads(data):
+    """JSON bytes/str -> 객체. orjson이 있으면 orjson (64비트를 넘는 정수 등 orjson이 못 읽는 입력은 json으로)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def dumps(obj):
+    """객체 -> JSON 문자열 (ensure_ascii=False). orjson이 있으면 공백 없는 형식으로 씁니다."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def configure(workers):
+    """병렬 파싱 워커 수를 바꿉니다. (배치 CLI의 --parse-workers 등, 이후 시작하는 다운로드부터 적용)"""
+    global PARSE_WORKERS
+    PARSE_WORKERS = max(0, int(workers))
+
+
+def get_parse_pool(workers):
+    """워커 수별로 프로세스 전체가 공유하는 ProcessPoolExecutor. 워커가 죽어 깨진 풀은 새로 만듭니다.
+
+    Streamlit/작업 스레드에서 fork하지 않도록 spawn으로 시작하며, 워커는 batch_parser/raw_store만 import합니다.
+    multiprocessing.Process 안에서 쓰면 그 프로세스는 끝날 때 워커를 join하므로, 그 전에(작업 큐의 종료 처리보다도 먼저) 풀을 닫도록 등록합니다.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None or getattr(pool, '_broken', False):
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            Finalize(pool, pool.shutdown, kwargs={"cancel_futures": True}, exitpriority=20)
+        return pool
+
+
+def page_envelope(body, full=False):
+    """응답 bytes에서 (총 건수, scroll_id, 문서 수)를 읽습니다. 총 건수는 full=True(첫 페이지)일 때만 채우고,
+    디코딩하지 않은 큰 응답의 문서 수는 None(문서가 있으나 세지 않음)입니다.
+
+    큰 응답은 문서 부분을 디코딩하지 않고 scroll_id만 찾아 다음 요청을 바로 보낼 수 있게 합니다.
+    (디코딩과 파싱은 워커가 함) 작은 응답, full=True, scroll_id를 찾지 못한 경우에는 전체를 디코딩합니다.
+    """
+    if not full and len(body) >= SMALL_PAGE_BYTES:
+        match = _SCROLL_ID.search(body, max(0, len(body) - SMALL_PAGE_BYTES)) or _SCROLL_ID.search(body[:SMALL_PAGE_BYTES])
+        if match:
+            return None, match.group(1).decode('utf-8'), None
+    data = loads(body)
+    return data.get('total', 0), data.get('scroll_id'), len(data.get('data') or [])
+
+
+def parse_page_bytes(body, include_raw=False, profile=None, archive_raw=False):
+    """(워커 프로세스에서 실행) 응답 bytes를 디코딩해 파싱하고 컬럼 단위로 돌려줍니다.
+
+    반환값: (컬럼 이름 목록, 컬럼별 값 목록, 원본 보관용 압축 행 또는 None, 워커에서 걸린 초)
+    레코드 dict 대신 컬럼 목록으로 보내 키 이름을 행마다 직렬화하지 않습니다. raw_json과 원본 보관 압축도 워커에서 합니다.
+    """
+    start = time.perf_counter()
+    patents = loads(body).get('data', [])
+    rows = parse_patents_batch(patents, profile=profile)
+    if include_raw:
+        for row, patent in zip(rows, patents):
+            row['raw_json'] = dumps(patent)
+    names = list(rows[0]) if rows else []
+    columns = [[row[name] for row in rows] for name in names]
+    raw_rows = encode_documents(patents, dumps) if archive_raw else None
+    return names, columns, raw_rows, time.perf_counter() - start
+
+
+def rows_from_columns(names, columns):
+    """parse_page_bytes의 컬럼 목록 -> 레코드 dict 목록 (parse_patents_batch 결과와 같은 형태)"""
+    return [dict(zip(names, values)) for values in zip(*columns)]
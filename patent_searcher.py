@@ -1,110 +1,41 @@
 import requests
 import json
-from datetime import datetime
 import os
 import csv
 import time
 import tempfile
+import functools
+import itertools
+import queue
+import threading
+from datetime import date, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from lens_client import get_client
+from download_checkpoint import DownloadCheckpoint
+from record_sinks import PATENT_SCHEMA, PATENT_SCHEMA_WITH_RAW, CsvSink, ParquetSink, csv_to_parquet
+from query_cache import make_cache_key
+from batch_parser import parse_patents_batch
+from dedup import SeenIds
+from projections import DEFAULT_PROFILE, RAW_ARCHIVE_PROFILE, covers_all_columns, get_profile
+from instrumentation import bind, record_span, span
+import parallel_parse
+from parallel_parse import IN_FLIGHT_PER_WORKER, get_parse_pool, page_envelope, parse_page_bytes, rows_from_columns
+
 
 # ==============================================================================
 #  1. 최종 데이터 파싱 함수 (parse_patent)
 # ==============================================================================
-def parse_patent(patent_json):
-    """(No More Hiding - Final) 모든 분석 지표와 그 근거 데이터를 함께 저장합니다."""
-
-    # --- 원본 객체 선언 ---
-    biblio = patent_json.get('biblio', {})
-    legal = patent_json.get('legal_status', {})
-    parties = biblio.get('parties', {})
-    application_ref = biblio.get('application_reference', {})
-    families = patent_json.get('families', {})
-
-    # --- 원본 데이터 추출 ---
-    applicants_list = parties.get('applicants', [])
-    inventors_list = parties.get('inventors', [])
-    ipc_list = biblio.get('classifications_ipcr', {}).get('classifications', [])
-    cpc_list = biblio.get('classifications_cpc', {}).get('classifications', [])
-    priority_claims = biblio.get('priority_claims', {}).get('claims', [])
-    references_cited = biblio.get('references_cited', {})
-    cited_by = biblio.get('cited_by', {})
-
-    application_date_str = application_ref.get('date')
-    publication_date_str = patent_json.get('date_published')
-    grant_date_str = legal.get('grant_date')
-    abstract_list = patent_json.get('abstract', [])
-    abstract_text = abstract_list[0].get('text') if abstract_list else None
-
-    original_applicant_residence = applicants_list[0].get('residence') if applicants_list else None
-    original_priority_country = priority_claims[0].get('jurisdiction') if priority_claims else None
-
-    # --- 가공된 분석 지표 생성 ---
-    final_applicant_nationality = original_applicant_residence or original_priority_country or 'N/A'
-    application_year = application_date_str[:4] if application_date_str else 'N/A'
-    main_ipc_field = ipc_list[0].get('symbol')[:4] if ipc_list else 'N/A'
-    num_applicants = len(applicants_list)
-    is_co_owned = num_applicants > 1
-
-    time_to_grant_days = None
-    if grant_date_str and application_date_str:
-        try:
-            time_to_grant_days = (datetime.strptime(grant_date_str, "%Y-%m-%d") - datetime.strptime(application_date_str, "%Y-%m-%d")).days
-        except: pass
+def parse_patent(patent_json, include_raw=False, profile=None):
+    """(No More Hiding - Final) 모든 분석 지표와 그 근거 데이터를 함께 저장합니다.
+
+    특허 하나를 parse_patents_batch로 파싱합니다. (필드 추출은 batch_parser 한 곳에만 있음)
+    원본 JSON은 기본적으로 행에 넣지 않고 RawDocumentStore에 따로 보관합니다. include_raw=True면 'raw_json' 컬럼을 붙입니다.
+    profile(projection 프로필 이름)을 주면 그 프로필이 요청하지 않은 필드에서 나오는 컬럼은 None으로 둡니다.
+    """
+    return parse_patents_batch([patent_json], include_raw, profile)[0]
+
 
-    cited_by_patent_count = cited_by.get('patent_count', 0)
-    citations_per_year = 0.0
-    if cited_by_patent_count > 0 and publication_date_str:
-        try:
-            citations_per_year = cited_by_patent_count / (datetime.now().year - int(publication_date_str[:4]) + 1)
-        except: pass
-
-    citation_patent_count = references_cited.get('patent_count', 0)
-    citation_npl_count = references_cited.get('npl_count', 0)
-    total_citations = citation_patent_count + citation_npl_count
-    science_linkage_ratio = (citation_npl_count / total_citations) if total_citations > 0 else 0.0
-
-    # --- 최종 반환 딕셔너리 (모든 정보 포함 및 순서 재정렬) ---
-    return {
-        # === 1. 핵심 내용 ===
-        'title': biblio.get('invention_title', [{}])[0].get('text'),
-        'abstract': abstract_text,
-        'applicants': '; '.join([p.get('extracted_name', {}).get('value', '') for p in applicants_list]),
-        'inventors': '; '.join([p.get('extracted_name', {}).get('value', '') for p in inventors_list]),
-
-        # === 2. 주요 날짜 및 연도 ===
-        'application_date': application_date_str,
-        'publication_date': publication_date_str,
-        'grant_date': grant_date_str,
-        'application_year': application_year,
-
-        # === 3. 식별 번호 및 국가/분류 ===
-        'publication_number': patent_json.get('doc_number'),
-        'application_number': application_ref.get('doc_number'),
-        'jurisdiction': patent_json.get('jurisdiction'),
-        'applicant_nationality': final_applicant_nationality,
-        'SOURCE_applicant_residence': original_applicant_residence,
-        'SOURCE_priority_country': original_priority_country,
-        'main_ipc_field': main_ipc_field,
-        'ipc_classifications': '; '.join([c.get('symbol') for c in ipc_list]),
-        'cpc_classifications': '; '.join([c.get('symbol') for c in cpc_list]),
-        'lens_id': patent_json.get('lens_id'),
-
-        # === 4. 상태 및 품질 지표 ===
-        'is_granted': legal.get('granted'),
-        'patent_status': legal.get('patent_status'),
-        'cited_by_patent_count': cited_by_patent_count,
-        'citation_patent_count': citation_patent_count,
-        'citation_npl_count': citation_npl_count,
-        'total_citations': total_citations,
-        'citations_per_year': round(citations_per_year, 2),
-        'science_linkage_ratio': round(science_linkage_ratio, 2),
-        'time_to_grant_days': time_to_grant_days,
-        'num_applicants': num_applicants,
-        'is_co_owned': is_co_owned,
-        'simple_family_size': families.get('simple_family', {}).get('size'),
-
-        # === 5. 원본 데이터 ===
-        'raw_json': json.dumps(patent_json, ensure_ascii=False)
-    }
 # ==============================================================================
 #  2. 최종 검색 엔진 함수 (build_query)
 # ==============================================================================
@@ -113,7 +44,7 @@ def build_query(search_params):
     search_term = search_params.get("search_term", "").strip()
 
     if query_type == 'advanced' and search_term:
-        return {"query_string": {"query": search_term}}
+        return _apply_ranges({"query_string": {"query": search_term}}, search_params)
 
     must_clauses = []
 
@@ -138,32 +69,80 @@ def build_query(search_params):
     if search_params.get("status_filter") == "granted":
         must_clauses.append({"term": {"legal_status.granted": True}})
 
-    return {"bool": {"must": must_clauses}} if must_clauses else {"match_all": {}}
+    query = {"bool": {"must": must_clauses}} if must_clauses else {"match_all": {}}
+    return _apply_ranges(query, search_params)
+
+
+def _date_field(search_params):
+    """검색 조건의 날짜 기준(출원일/등록일)에 해당하는 API 필드명을 돌려줍니다."""
+    return "legal_status.grant_date" if search_params.get("date_type") == 'grant' else "application_reference.date"
+
+
+def _add_must(query, clause):
+    if "bool" in query and set(query["bool"]) == {"must"}:
+        return {"bool": {"must": query["bool"]["must"] + [clause]}}
+    return {"bool": {"must": [query, clause]}}
+
+
+def _apply_ranges(query, search_params):
+    return _apply_published_since(_apply_shard_range(query, search_params), search_params)
+
+
+def _apply_shard_range(query, search_params):
+    """search_params['shard_range'] = (시작일, 종료일) 가 있으면 shard_field 날짜 구간으로 검색식을 좁힙니다.
+
+    시작일/종료일이 None이면 그쪽으로 열린 구간이고, shard_range가 MISSING_DATE면 그 날짜가 없는 문서만 고릅니다.
+    """
+    shard_range = search_params.get("shard_range")
+    if not shard_range:
+        return query
+
+    field = search_params.get("shard_field") or _date_field(search_params)
+    if shard_range == MISSING_DATE:
+        return _add_must(query, {"bool": {"must_not": [{"exists": {"field": field}}]}})
+    bounds = {op: value for op, value in zip(("gte", "lte"), shard_range) if value}
+    return _add_must(query, {"range": {field: bounds}} if bounds else {"exists": {"field": field}})
+
+
+def _apply_published_since(query, search_params):
+    """search_params['published_since'] = 'YYYY-MM-DD' 가 있으면 그날 이후 공개된 특허로 좁힙니다. (저장된 검색의 증분 동기화용)"""
+    published_since = search_params.get("published_since")
+    if not published_since:
+        return query
+    return _add_must(query, {"range": {"date_published": {"gte": published_since}}})
 
 
 # ==============================================================================
 #  3. API 호출 함수 (기존 함수는 첫 페이지만 가져오는 용도로 유지)
 # ==============================================================================
-def search_first_page(api_key, search_params, size):
-    """(수정 완료) 검색 조건과 사용자가 지정한 'size'를 받아 첫 페이지만 가져옵니다."""
+def search_first_page(api_key, search_params, size, cache=None, profile=DEFAULT_PROFILE):
+    """(수정 완료) 검색 조건과 사용자가 지정한 'size'를 받아 첫 페이지만 가져옵니다.
+
+    cache(QueryCache)를 넘기면 같은 검색식/size/include 결과를 TTL 동안 재사용합니다.
+    profile은 요청할 필드 묶음(projections.PROFILES)입니다.
+    """
 
     query = build_query(search_params)
-    API_URL = "https://api.lens.org/patent/search"
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
 
     # ★★★ 제 멋대로 넣었던 기본값을 삭제하고, 인자로 받은 size를 사용합니다 ★★★
     payload = {
         "query": query,
         "size": size,
-        "include": ["lens_id", "jurisdiction", "doc_number", "date_published", "biblio", "legal_status", "families", "abstract"]
+        "include": get_profile(profile)["include"]
     }
 
+    cache_key = make_cache_key(query, size, payload["include"])
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        return cached["data"], cached["total"], None
+
     try:
-        response = requests.post(API_URL, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        results_json = response.json()
+        results_json = get_client(api_key).search(payload, label=profile) or {}
         total_results = results_json.get('total', 0)
-        parsed_data = [parse_patent(p) for p in results_json.get('data', [])]
+        with span("parse", len(results_json.get('data', []))):
+            parsed_data = parse_patents_batch(results_json.get('data', []), profile=profile)
+        if cache is not None:
+            cache.set(cache_key, {"data": parsed_data, "total": total_results})
         return parsed_data, total_results, None
 
     except requests.exceptions.HTTPError as e:
@@ -180,12 +159,13 @@ def search_first_page(api_key, search_params, size):
 # ==============================================================================
 #  새로운 함수: 총 건수만 확인하는 기능
 # ==============================================================================
-def get_total_hits(api_key, search_params):
-    """(size=0) 검색 조건에 해당하는 총 결과 건수만 빠르게 확인합니다."""
+def get_total_hits(api_key, search_params, cache=None, rate_limiter=None):
+    """(size=0) 검색 조건에 해당하는 총 결과 건수만 빠르게 확인합니다.
+
+    cache(QueryCache)를 넘기면 같은 검색식의 건수를 TTL 동안 재사용합니다.
+    """
 
     query = build_query(search_params)
-    API_URL = "https://api.lens.org/patent/search"
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
 
     # ★★★ size를 0으로 설정하여, 데이터 본문 없이 total 값만 요청 ★★★
     payload = {
@@ -193,11 +173,15 @@ def get_total_hits(api_key, search_params):
         "size": 0
     }
 
-    try:
-        response = requests.post(API_URL, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
+    cache_key = make_cache_key(query, 0)
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        return cached, None
 
-        total_hits = response.json().get('total', 0)
+    try:
+        total_hits = (get_client(api_key).search(payload, rate_limiter, label="count") or {}).get('total', 0)
+        if cache is not None:
+            cache.set(cache_key, total_hits)
         return total_hits, None # 성공: (총 건수, 에러 없음)
 
     except requests.exceptions.HTTPError as e:
@@ -213,103 +197,610 @@ def get_total_hits(api_key, search_params):
 
 
 # ==============================================================================
-#  4. ★★★ 전체 결과를 임시 CSV 파일에 저장하는 단 하나의 메인 함수 ★★★
+#  스트리밍 파이프라인: 다음 페이지 요청과 이전 페이지 파싱/쓰기를 겹쳐 실행
 # ==============================================================================
+PAGE_SIZE = 100
+PREFETCH_PAGES = 2    # 소비 측이 처리하는 동안 미리 받아둘 최대 페이지 수 (백프레셔)
+
+
+NO_RESULTS = "검색 결과가 없습니다."    # 저장 함수가 결과 0건일 때 돌려주는 에러 메시지
+
+
+class DownloadCancelled(Exception):
+    """stop_event로 다운로드가 취소되었을 때 발생합니다."""
+
+
+def _put_until_stopped(page_queue, item, stop_event):
+    """큐가 가득 차면 기다리되, 취소되면 포기합니다. (생산 스레드가 영원히 막히지 않도록)"""
+    while not stop_event.is_set():
+        try:
+            page_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _scroll_pages(api_key, search_params, page_queue, stop_event, limit=None, rate_limiter=None, profile=DEFAULT_PROFILE,
+                  producer_index=0, raw=False):
+    """scroll로 받은 페이지를 ('page', producer_index, 총 건수, 특허 목록)으로 page_queue에 넣습니다. (작업 스레드에서 실행)
+
+    raw=True면 특허 목록 대신 응답 본문(bytes)을 넣고, 여기서는 scroll_id만 읽습니다. (병렬 파싱 워커가 디코딩)
+    """
+    payload = {"query": build_query(search_params), "size": PAGE_SIZE, "scroll": "1m", "include": get_profile(profile)["include"]}
+    total_hits, fetched = None, 0
+    try:
+        while not stop_event.is_set():
+            data = get_client(api_key).search(payload, rate_limiter, label=profile, raw=raw)
+            if data is None: break # 정상 종료 (204)
+            if raw:
+                total, scroll_id, num_patents = page_envelope(data, full=total_hits is None)
+                num_patents = PAGE_SIZE if num_patents is None else num_patents # 세지 않은 페이지는 가득 찬 것으로 봄 (limit용)
+                patents = data if num_patents else []
+            else:
+                total, scroll_id, patents = data.get('total', 0), data.get('scroll_id'), data.get('data', [])
+                num_patents = len(patents)
+            if total_hits is None:
+                total_hits = total
+            if patents:
+                fetched += num_patents
+                if not _put_until_stopped(page_queue, ('page', producer_index, total_hits, patents), stop_event):
+                    return
+            if not patents or not scroll_id or (limit and fetched >= limit):
+                break
+            payload = {"scroll_id": scroll_id, "scroll": "1m"}
+        _put_until_stopped(page_queue, ('done', producer_index, total_hits, None), stop_event)
+    except Exception as e:
+        _put_until_stopped(page_queue, ('error', producer_index, total_hits, e), stop_event)
+
+
+def _drain_pages(page_queue, num_producers, stop_event, executor, parse_page, seen_ids=None, on_page=None, on_done=None,
+                 raw_store=None, parse_workers=0):
+    """생산 스레드들이 넣은 페이지를 꺼내 parse_page(페이지 단위 파서)로 파싱해 (레코드 목록, 총 건수)로 돌려줍니다.
+
+    seen_ids(SeenIds)를 주면 이미 나온 lens_id는 원본 보관/파싱 전에 걸러냅니다. (같은 페이지 안의 중복 포함)
+    제너레이터가 닫히면 생산 스레드도 멈춥니다. raw_store(RawDocumentStore)를 주면 원본 JSON은 파싱 전에 그곳에 압축 저장합니다.
+    on_page(producer_index)는 호출 측이 그 페이지를 다 처리한 뒤에, on_done(producer_index)는
+    해당 생산자의 모든 페이지를 처리한 뒤에 불립니다. (체크포인트 기록용)
+    소비 측이 다음 페이지를 기다린 시간은 'wait_for_page' 단계로 기록합니다. (길면 병목은 API 쪽)
+
+    parse_workers > 0이면 페이지는 응답 bytes이고, parse_page(parallel_parse.parse_page_bytes 형태)를 공유 프로세스 풀에서
+    돌립니다. 워커마다 IN_FLIGHT_PER_WORKER 페이지까지 미리 넘기고 결과는 받은 순서대로 처리하며,
+    중복 제거는 워커가 돌려준 lens_id로 합니다. 워커 시간은 'parse', 결과를 기다린 시간은 'parse_wait' 단계입니다.
+    """
+    in_flight = deque()   # 병렬 파싱: 받은 순서대로 (생산자 번호, 총 건수, future 또는 생산자 끝 표시 None)
+    parse_pool = get_parse_pool(parse_workers) if parse_workers else None
+    max_in_flight = parse_workers * IN_FLIGHT_PER_WORKER
+
+    def finish_parsed():
+        """맨 앞의 병렬 파싱 결과 하나를 처리합니다. 돌려줄 (레코드 목록, 총 건수)가 있으면 돌려줌."""
+        index, total_hits, future = in_flight.popleft()
+        if future is None:
+            if on_done:
+                on_done(index)
+            return None
+        with span("parse_wait"):
+            names, columns, raw_rows, seconds = future.result()
+        records = rows_from_columns(names, columns)
+        record_span("parse", seconds, len(records))
+        if seen_ids is not None:
+            fresh = seen_ids.add_new([record['lens_id'] for record in records])
+            records = list(itertools.compress(records, fresh))
+            raw_rows = list(itertools.compress(raw_rows, fresh)) if raw_rows is not None else None
+        if raw_store is not None and raw_rows:
+            with span("raw_archive", len(raw_rows)):
+                raw_store.put_encoded(raw_rows)
+        return records, total_hits, index
+
+    try:
+        remaining = num_producers
+        waiting_since = time.perf_counter()
+        while remaining or in_flight:
+            # 맨 앞 결과가 준비됐거나, 더 넘길 페이지가 없거나(생산 끝/큐 비어 있음), 미리 넘긴 페이지가 가득 차면 결과를 처리
+            if in_flight and (not remaining or len(in_flight) >= max_in_flight or in_flight[0][2] is None
+                              or in_flight[0][2].done() or page_queue.empty()):
+                finished = finish_parsed()
+                if finished:
+                    records, total_hits, index = finished
+                    if records:
+                        yield records, total_hits
+                    if on_page:
+                        on_page(index)
+                waiting_since = time.perf_counter()
+                continue
+            try:
+                kind, index, total_hits, item = page_queue.get(timeout=0.1)
+            except queue.Empty:
+                if stop_event.is_set():
+                    raise DownloadCancelled("다운로드가 취소되었습니다.")
+                continue
+            if kind == 'error':
+                raise item
+            if kind == 'done':
+                remaining -= 1
+                if parse_pool is not None and in_flight:
+                    in_flight.append((index, None, None))  # 앞선 페이지를 다 처리한 뒤에 on_done
+                elif on_done:
+                    on_done(index)
+                continue
+            record_span("wait_for_page", time.perf_counter() - waiting_since, 0 if parse_pool is not None else len(item))
+
+            if parse_pool is not None:
+                in_flight.append((index, total_hits, parse_pool.submit(parse_page, item)))
+                waiting_since = time.perf_counter()
+                continue
+            if seen_ids is not None:
+                item = list(itertools.compress(item, seen_ids.add_new([p.get('lens_id') for p in item])))
+            if item:
+                if raw_store is not None:
+                    with span("raw_archive", len(item)):
+                        raw_store.put_many(item)
+                if parse_page:
+                    with span("parse", len(item)):
+                        item = parse_page(item)
+                yield item, total_hits
+            if on_page:
+                on_page(index)
+            waiting_since = time.perf_counter()
+    finally:
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for _, _, future in in_flight:
+            if future is not None:
+                future.cancel()
+
+
+def iter_patent_pages(api_key, search_params, limit=None, parse_page=parse_patents_batch, prefetch=PREFETCH_PAGES,
+                      stop_event=None, profile=DEFAULT_PROFILE, raw_store=None, parse_workers=0):
+    """검색 결과를 페이지마다 (레코드 목록, 총 건수)로 돌려주는 제너레이터입니다.
+
+    백그라운드 스레드가 다음 페이지를 미리(최대 prefetch 페이지) 요청하는 동안 호출 측은 이전 페이지를 처리합니다.
+    parse_page는 페이지(원본 특허 목록)를 받아 레코드 목록을 돌려주며, None이면 API 원본을 그대로 돌려줍니다.
+    profile은 요청할 필드 묶음(projections.PROFILES)이며, 페이지당 응답 크기는 lens_client.transfer_stats에 프로필별로 쌓입니다. 반복을 멈추면(close) 다운로드도 멈추고,
+    밖에서 stop_event를 세우면 DownloadCancelled가 발생합니다. CSV 저장, 대시보드 등 모든 소비자가 공유하는 진입점입니다.
+    scroll 도중 다시 나온 lens_id(페이지 경계에서 밀린 문서 등)는 원본 보관/파싱 전에 걸러냅니다.
+    parse_workers > 0이면 응답을 디코딩하지 않고 프로세스 풀에서 parse_page(응답 bytes를 받는 함수, _page_parser 참고)로 파싱합니다.
+    """
+    stop_event = stop_event or threading.Event()
+    page_queue = queue.Queue(maxsize=prefetch)
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(bind(_scroll_pages), api_key, search_params, page_queue, stop_event, limit, None, profile,
+                    raw=bool(parse_workers))
+    yield from _drain_pages(page_queue, 1, stop_event, executor, parse_page, seen_ids=SeenIds(), raw_store=raw_store,
+                            parse_workers=parse_workers)
+
+
+def iter_patents(api_key, search_params, **kwargs):
+    """iter_patent_pages의 결과를 레코드 하나씩 돌려줍니다."""
+    pages = iter_patent_pages(api_key, search_params, **kwargs)
+    try:
+        for records, _ in pages:
+            yield from records
+    finally:
+        pages.close()
+
+
 # ==============================================================================
-#  전체 결과를 임시 CSV 파일에 저장하는 함수 (Rate Limit 준수)
+#  4. ★★★ 전체 결과를 임시 CSV 파일에 저장하는 단 하나의 메인 함수 ★★★
 # ==============================================================================
-def save_all_patents_to_csv(api_key, search_params, progress_callback=None):
-    """(최종 수정) 안정성과 효율성을 개선한 전체 결과 저장 함수입니다."""
+def _page_parser(include_raw, profile, raw_store, parse_workers):
+    """저장 함수가 쓰는 페이지 파서. parse_workers > 0이면 워커에서 응답 bytes를 디코딩/파싱/원본 압축까지 하는 파서입니다."""
+    if parse_workers:
+        return functools.partial(parse_page_bytes, include_raw=include_raw, profile=profile, archive_raw=raw_store is not None)
+    return functools.partial(parse_patents_batch, include_raw=include_raw, profile=profile)
 
-    query = build_query(search_params)
-    API_URL = "https://api.lens.org/patent/search"
-    headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
 
-    temp_file = tempfile.NamedTemporaryFile(mode='w+', delete=False, newline='', encoding='utf-8-sig')
-    temp_filename = temp_file.name
+def _open_output(output_format, include_raw=False):
+    """임시 출력 파일을 만들고 (경로, sink)를 돌려줍니다. output_format: 'csv' 또는 'parquet'"""
+    if output_format == 'parquet':
+        fd, path = tempfile.mkstemp(suffix='.parquet')
+        os.close(fd)
+        return path, ParquetSink(path, PATENT_SCHEMA_WITH_RAW if include_raw else PATENT_SCHEMA)
+    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, newline='', encoding='utf-8-sig', suffix='.csv')
+    return temp_file.name, CsvSink(temp_file)
 
-    # 첫 번째 요청 페이로드
-    payload = {
-        "query": query, "size": 100, "scroll": "1m",
-        "include": ["lens_id", "jurisdiction", "doc_number", "date_published", "biblio", "legal_status", "families", "abstract"]
-    }
+
+# ==============================================================================
+#  전체 결과를 임시 CSV 파일에 저장하는 함수 (Rate Limit 준수)
+# ==============================================================================
+def save_all_patents_to_csv(api_key, search_params, progress_callback=None, store=None, output_format='csv',
+                            raw_store=None, include_raw=False, stop_event=None, on_records=None, profile=DEFAULT_PROFILE,
+                            parse_workers=None):
+    """(최종 수정) 안정성과 효율성을 개선한 전체 결과 저장 함수입니다.
+
+    store(PatentStore)를 넘기면 lens_id 목록만 먼저 확인한 뒤, 저장소에 없거나 오래된 특허만 내려받습니다.
+    output_format='parquet'이면 CSV 대신 명시적 스키마의 Parquet 파일로 row group 단위로 흘려 씁니다.
+    원본 JSON은 raw_store(RawDocumentStore)에 따로 저장하며, include_raw=True일 때만 결과 파일에 'raw_json' 컬럼을 넣습니다.
+    stop_event(threading.Event)를 세우면 다운로드를 멈추고 임시 파일을 지운 뒤 에러 메시지로 끝납니다.
+    on_records(records)는 파싱된 레코드 묶음마다 불립니다. (실시간 집계용, 예: LiveAggregates.update)
+    profile(projection 프로필)에 없는 필드의 컬럼은 비어 있으며, raw_store에는 원본 전체를 받는 프로필('raw archive')일 때만 저장합니다.
+    include_raw=True면 원본 전체가 필요하므로 항상 'raw archive' 프로필로 받습니다.
+    parse_workers는 디코딩/파싱을 맡길 프로세스 수입니다. (None이면 parallel_parse.PARSE_WORKERS, 0이면 이 프로세스에서 파싱)
+    """
+    if include_raw:
+        profile = RAW_ARCHIVE_PROFILE
+    if not get_profile(profile)["archive_raw"]:
+        raw_store = None
+    if parse_workers is None:
+        parse_workers = parallel_parse.PARSE_WORKERS
+    if store is not None and covers_all_columns(profile): # 저장소에는 모든 컬럼이 채워진 행만 둠 (부분 프로필은 저장소를 거치지 않음)
+        return _save_via_store(api_key, search_params, store, progress_callback, output_format, raw_store, include_raw,
+                               stop_event, on_records, profile)
+
+    temp_filename, sink = _open_output(output_format, include_raw)
 
     start_time = time.time()
-    csv_writer = None
     num_processed = 0
     limit = 50000
 
+    # 다음 페이지는 백그라운드에서 미리 받아오고, 여기서는 파싱된 페이지를 파일에 쓰기만 합니다.
+    # (속도 조절 및 429/5xx 재시도는 API 키별 LensClient가 처리)
+    pages = iter_patent_pages(api_key, search_params, limit=limit, raw_store=raw_store, stop_event=stop_event, profile=profile,
+                              parse_page=_page_parser(include_raw, profile, raw_store, parse_workers), parse_workers=parse_workers)
     try:
-        # 1. 첫 번째 요청
-        response = requests.post(API_URL, headers=headers, data=json.dumps(payload), timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        for records, total_hits in pages:
+            with span("write", len(records)):
+                sink.writerows(records)
+            num_processed += len(records)
+            if on_records:
+                with span("live_aggregates", len(records)):
+                    on_records(records)
+
+            # 진행 상황 업데이트
+            if progress_callback:
+                elapsed_time = time.time() - start_time
+                total_to_download = min(total_hits, limit)
+                progress_callback(num_processed, total_to_download, elapsed_time)
+
+        with span("write"):
+            sink.close()
+        if not num_processed:
+            os.remove(temp_filename)
+            return None, 0, NO_RESULTS
+        return temp_filename, total_hits, None
+
+    except Exception as e:
+        try:
+            sink.close()
+        except Exception:
+            pass
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        return None, 0, f"Error: {e}"
 
-        total_hits = data.get('total', 0)
-        scroll_id = data.get('scroll_id')
+    finally:
+        pages.close()
+
+
+# ==============================================================================
+#  로컬 저장소(PatentStore)를 거치는 저장 경로
+# ==============================================================================
+ID_PAGE_SIZE = 1000      # lens_id만 받는 scroll은 응답이 가벼워 한 번에 더 많이 받습니다.
+FETCH_BATCH_SIZE = 100   # 누락된 특허를 lens_id terms 검색으로 가져올 때의 묶음 크기
+
+
+def _attach_raw_json(rows, raw_store):
+    """저장소에서 읽은 행에 raw_store의 원본 JSON을 'raw_json' 컬럼으로 붙입니다. (내보내기 옵션)"""
+    raw_docs = raw_store.get_many_json(row['lens_id'] for row in rows) if raw_store is not None else {}
+    for row in rows:
+        row['raw_json'] = raw_docs.get(row['lens_id'])
+    return rows
+
+
+def fetch_raw_document(api_key, lens_id, raw_store):
+    """특허 하나의 원본 전체를 받아 raw_store에 보관하고 돌려줍니다. 반환값: (원본 dict 또는 None, 에러)
+
+    대시보드에서 원본 보관소에 없는 특허를 열 때 씁니다. (원본 보관 프로필이 아닌 다운로드는 원본을 보관하지 않음)
+    """
+    payload = {"query": {"terms": {"lens_id": [lens_id]}}, "size": 1, "include": get_profile(RAW_ARCHIVE_PROFILE)["include"]}
+    try:
+        patents = (get_client(api_key).search(payload, label=RAW_ARCHIVE_PROFILE) or {}).get('data', [])
+    except Exception as e:
+        return None, f"Error: {e}"
+    if not patents:
+        return None, None
+    raw_store.put_many(patents)
+    return patents[0], None
+
+
+def resolve_lens_ids(api_key, search_params, limit=50000):
+    """검색 조건에 해당하는 lens_id 목록만 scroll로 가져옵니다. 반환값: (lens_id 목록, 총 건수)"""
+    payload = {"query": build_query(search_params), "size": ID_PAGE_SIZE, "scroll": "1m", "include": ["lens_id"]}
+    lens_ids, total_hits = [], None
+    while len(lens_ids) < limit:
+        data = get_client(api_key).search(payload, label="lens_id")
+        if data is None: break
+        if total_hits is None:
+            total_hits = data.get('total', 0)
         patents = data.get('data', [])
+        lens_ids += [p['lens_id'] for p in patents]
+        if not patents or not data.get('scroll_id'):
+            break
+        payload = {"scroll_id": data['scroll_id'], "scroll": "1m"}
+    return lens_ids[:limit], total_hits or 0
 
-        if not patents:
-            temp_file.close(); os.remove(temp_filename)
-            return None, 0, "검색 결과가 없습니다."
 
-        # --- while 루프로 모든 로직 통합 ---
-        while True:
-            # 2. 데이터 처리 및 CSV 쓰기
-            if patents:
-                # 첫 번째 데이터 묶음일 때만 헤더를 씀
-                if csv_writer is None:
-                    first_patent_parsed = parse_patent(patents[0])
-                    csv_writer = csv.DictWriter(temp_file, fieldnames=first_patent_parsed.keys())
-                    csv_writer.writeheader()
-                    csv_writer.writerow(first_patent_parsed)
-                    # 이미 쓴 첫 번째 데이터를 제외하고 나머지 처리
-                    for p in patents[1:]:
-                        csv_writer.writerow(parse_patent(p))
-                else: # 두 번째 묶음부터는 데이터만 씀
-                    for p in patents:
-                        csv_writer.writerow(parse_patent(p))
+def _save_via_store(api_key, search_params, store, progress_callback=None, output_format='csv', raw_store=None,
+                    include_raw=False, stop_event=None, on_records=None, profile=DEFAULT_PROFILE):
+    """lens_id 확인 → 누락/만료분만 다운로드 → 저장소에서 파일 작성. 적중 통계는 store.last_stats에 남습니다.
 
-                num_processed += len(patents)
+    include_raw=True면 raw_store에 보관된 원본 JSON을 결과 파일의 'raw_json' 컬럼으로 붙입니다.
+    """
+    start_time = time.time()
+    temp_filename = None
 
-            # 3. 진행 상황 업데이트
+    try:
+        with span("resolve_ids") as s:
+            lens_ids, total_hits = resolve_lens_ids(api_key, search_params)
+            s.records = len(lens_ids)
+        lens_ids = list(dict.fromkeys(lens_ids)) # 순서를 유지한 중복 제거
+        if not lens_ids:
+            return None, 0, NO_RESULTS
+
+        missing = store.missing_ids(lens_ids)
+        if raw_store is not None: # 원본 보관 프로필이면 원본이 보관소에 없는 특허도 다시 받음 (raw_json이 비지 않도록)
+            missing_set = set(missing).union(raw_store.missing_ids(lens_ids))
+            missing = [lens_id for lens_id in lens_ids if lens_id in missing_set]
+        num_cached = len(lens_ids) - len(missing)
+        if on_records and num_cached:
+            missing_set = set(missing)
+            on_records(list(store.iter_rows([lens_id for lens_id in lens_ids if lens_id not in missing_set])))
+        for i in range(0, len(missing), FETCH_BATCH_SIZE):
+            if stop_event is not None and stop_event.is_set():
+                raise DownloadCancelled("다운로드가 취소되었습니다.")
+            batch = missing[i:i + FETCH_BATCH_SIZE]
+            payload = {"query": {"terms": {"lens_id": batch}}, "size": len(batch), "include": get_profile(profile)["include"]}
+            patents = (get_client(api_key).search(payload, label=profile) or {}).get('data', [])
+            with span("store_put", len(patents)):
+                raw_texts = [parallel_parse.dumps(p) for p in patents] # 원본 직렬화는 한 번만 (크기 기록과 원본 보관에 함께 씀)
+                rows = store.put(patents, parse_patents_batch, raw_texts=raw_texts)
+            if on_records:
+                with span("live_aggregates", len(rows)):
+                    on_records(rows)
+            if raw_store is not None:
+                with span("raw_archive", len(patents)):
+                    raw_store.put_many(patents, texts=raw_texts)
             if progress_callback:
-                elapsed_time = time.time() - start_time
-                total_to_download = min(total_hits, limit)
-                progress_callback(num_processed, total_to_download, elapsed_time)
+                progress_callback(num_cached + i + len(batch), len(lens_ids), time.time() - start_time)
+
+        temp_filename, sink = _open_output(output_format, include_raw)
+        with span("write", len(lens_ids)):  # 저장소에서 읽기 + 파일 쓰기
+            rows = []
+            for row in store.iter_rows(lens_ids):
+                rows.append(row)
+                if len(rows) >= FETCH_BATCH_SIZE:
+                    sink.writerows(_attach_raw_json(rows, raw_store) if include_raw else rows)
+                    rows = []
+            if rows:
+                sink.writerows(_attach_raw_json(rows, raw_store) if include_raw else rows)
+            sink.close()
+
+        if progress_callback:
+            progress_callback(len(lens_ids), len(lens_ids), time.time() - start_time)
+        return temp_filename, total_hits, None
 
-            # 4. 종료 조건 확인
-            if not patents or not scroll_id or num_processed >= limit:
-                break
+    except Exception as e:
+        if temp_filename and os.path.exists(temp_filename):
+            os.remove(temp_filename)
+        return None, 0, f"Error: {e}"
 
-            # 5. 다음 페이지 요청 (속도 조절 및 재시도 포함)
-            time.sleep(1)
-            scroll_payload = {"scroll_id": scroll_id, "scroll": "1m"}
 
-            try:
-                response = requests.post(API_URL, headers=headers, data=json.dumps(scroll_payload), timeout=30)
-                if response.status_code == 204: break # 정상 종료
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:
-                    print("Warning: 429 Rate Limit. 10초간 대기 후 재시도...")
-                    time.sleep(10)
-                    # 다음 루프에서 같은 scroll_id로 다시 시도하게 됨
-                    # patents는 비어있지 않으므로 루프는 계속됨
+# ==============================================================================
+#  5. 날짜 구간 분할(샤드) 병렬 다운로드
+# ==============================================================================
+SHARD_MAX_RECORDS = 10000     # 샤드 하나가 담을 최대 건수 (이보다 많으면 날짜 구간을 반으로 나눔)
+SHARD_WORKERS = 4             # 동시에 돌릴 scroll 세션 수
+SHARD_DEFAULT_START = date(1900, 1, 1)
+SHARD_DEFAULT_FIELD = "date_published"   # 연도 조건이 없을 때 나눌 날짜 (모든 문서에 있음)
+MISSING_DATE = "missing"                 # shard_range가 이 값이면 나누는 날짜가 없는 문서의 샤드
+
+
+def _year_bounds(search_params):
+    """build_query가 실제로 거는 연도 조건 (시작 연도, 종료 연도). 조건이 없거나 고급 검색식이면 None."""
+    if search_params.get("query_type", "simple") == 'advanced' and search_params.get("search_term", "").strip():
+        return None, None
+    start_year, end_year = search_params.get("start_year"), search_params.get("end_year")
+    return (int(start_year) if start_year and start_year.isdigit() else None,
+            int(end_year) if end_year and end_year.isdigit() else None)
+
+
+def _shard_field(search_params):
+    """샤드를 나눌 날짜 필드. 연도 조건이 있으면 그 날짜(출원일/등록일, 없는 문서는 이미 검색에서 빠짐), 없으면 공개일."""
+    return _date_field(search_params) if any(_year_bounds(search_params)) else SHARD_DEFAULT_FIELD
+
+
+def _initial_shard_range(search_params):
+    """검색 조건의 연도 범위(없으면 1900년~오늘)를 첫 샤드 구간으로 사용합니다."""
+    start_year, end_year = _year_bounds(search_params)
+    start = date(start_year, 1, 1) if start_year else SHARD_DEFAULT_START
+    end = date(end_year, 12, 31) if end_year else date.today()
+    return start, end
+
+
+def plan_date_shards(api_key, search_params, max_per_shard=SHARD_MAX_RECORDS, rate_limiter=None, max_workers=SHARD_WORKERS):
+    """get_total_hits로 건수를 확인하며, 각 구간이 max_per_shard 이하가 될 때까지 날짜 구간을 이분할합니다.
+
+    연도 조건이 없는 쪽은 첫 구간 밖(1900년 이전, 오늘 이후)을 열린 구간 샤드로 더하고, 나누는 날짜가 없는 문서는
+    MISSING_DATE 샤드로 받아 검색 결과 전체를 빠짐없이 나눕니다. (열린 구간과 MISSING_DATE 샤드는 더 나누지 않음)
+    반환값: ([(샤드 search_params, 건수), ...], 에러 메시지)
+    """
+    field = _shard_field(search_params)
+    start, end = _initial_shard_range(search_params)
+    start_year, end_year = _year_bounds(search_params)
+    pending = [(start, end), MISSING_DATE]
+    if not start_year:
+        pending.append((None, start - timedelta(days=1)))
+    if not end_year:
+        pending.append((end + timedelta(days=1), None))
+
+    def count(date_range):
+        shard_range = date_range if date_range == MISSING_DATE else tuple(d.isoformat() if d else None for d in date_range)
+        shard_params = dict(search_params, shard_field=field, shard_range=shard_range)
+        hits, error = get_total_hits(api_key, shard_params, rate_limiter=rate_limiter)
+        return shard_params, date_range, hits, error
+
+    shards, open_shards = [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending:
+            next_pending = []
+            for shard_params, date_range, hits, error in executor.map(bind(count), pending):
+                if error:
+                    return None, error
+                if not hits:
+                    continue
+                if date_range == MISSING_DATE or None in date_range:
+                    open_shards.append((shard_params, hits))
                     continue
-                else:
-                    raise e # 다른 HTTP 에러는 바깥의 except로 던짐
+                start, end = date_range
+                if hits <= max_per_shard or start >= end:
+                    shards.append((shard_params, hits))
+                    continue
+                mid = start + timedelta(days=(end - start).days // 2)
+                next_pending += [(start, mid), (mid + timedelta(days=1), end)]
+            pending = next_pending
+
+    shards.sort(key=lambda shard: shard[0]["shard_range"])
+    return shards + open_shards, None
+
+
+def shard_checkpoint_params(search_params, profile=DEFAULT_PROFILE, include_raw=False):
+    """분할 다운로드의 체크포인트를 구분하는 값. 이 값이 같은 다운로드는 같은 체크포인트 폴더(레코드 CSV)를 씁니다.
+
+    프로필/샤드 기준 날짜마다 컬럼 구성과 샤드 계획이 달라 체크포인트를 따로 둡니다.
+    """
+    profile = RAW_ARCHIVE_PROFILE if include_raw else profile
+    return dict(search_params, profile=profile, shard_field=_shard_field(search_params))
+
+
+def iter_sharded_patent_pages(api_key, shard_params_list, parse_page=parse_patents_batch, max_workers=SHARD_WORKERS,
+                              rate_limiter=None, stop_event=None, profile=DEFAULT_PROFILE,
+                              seen_ids=None, on_page=None, on_shard_done=None, raw_store=None, parse_workers=0):
+    """샤드마다 scroll 세션을 하나씩 동시에 돌려, 도착하는 순서대로 (레코드 목록, 샤드 건수)를 돌려줍니다.
+
+    구간 경계에서 겹치는 특허는 lens_id로 걸러내며, 취소/종료 규칙은 iter_patent_pages와 같습니다.
+    seen_ids에 든 lens_id(이어받기 전에 이미 기록한 레코드)도 걸러내며, on_page/on_shard_done은 _drain_pages와 같이 불립니다.
+    parse_workers는 iter_patent_pages와 같습니다. (모든 샤드가 하나의 프로세스 풀을 같이 씀)
+    """
+    stop_event = stop_event or threading.Event()
+    page_queue = queue.Queue(maxsize=max_workers * PREFETCH_PAGES)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    for i, shard_params in enumerate(shard_params_list):
+        executor.submit(bind(_scroll_pages), api_key, shard_params, page_queue, stop_event, None, rate_limiter, profile,
+                        i, raw=bool(parse_workers))
+    yield from _drain_pages(page_queue, len(shard_params_list), stop_event, executor, parse_page,
+                            seen_ids=SeenIds() if seen_ids is None else seen_ids, on_page=on_page, on_done=on_shard_done,
+                            raw_store=raw_store, parse_workers=parse_workers)
+
+
+def save_all_patents_sharded(api_key, search_params, progress_callback=None, max_per_shard=SHARD_MAX_RECORDS,
+                             max_workers=SHARD_WORKERS, rate_limiter=None, checkpoint_dir=None, output_format='csv',
+                             raw_store=None, include_raw=False, stop_event=None, on_records=None, profile=DEFAULT_PROFILE,
+                             parse_workers=None):
+    """날짜 구간 샤드별 scroll 세션을 동시에 돌려 전체 결과를 임시 CSV 파일에 저장합니다. (건수 제한 없음)
+
+    모든 샤드가 하나의 rate_limiter(생략 시 API 키별 공유 limiter)를 쓰며, 구간 경계에서 겹치는 특허는 lens_id로 중복 제거합니다.
+    checkpoint_dir를 주면 페이지마다 기록한 레코드와 완료된 샤드를 남겨 두고, 같은 검색을 다시 실행하면 완료된 샤드는 건너뛰고
+    나머지 샤드는 구간을 처음부터 다시 검색하며 이미 기록한 lens_id를 걸러냅니다. (scroll 커서는 아직 쓰지 않은 페이지까지
+    앞서 나가 있을 수 있어 저장하지 않음)
+    이어쓰기를 위해 다운로드 중에는 CSV로 기록하고, output_format='parquet'이면 완료 후 Parquet으로 변환합니다.
+    raw_store/include_raw/stop_event/on_records/profile/parse_workers는 save_all_patents_to_csv와 같습니다. (취소해도 체크포인트는 남음)
+    반환값은 save_all_patents_to_csv와 같습니다: (임시 파일 경로, 총 건수, 에러 메시지)
+    총 건수는 나누지 않은 검색의 건수이므로, 받은 건수가 이보다 적으면 그만큼 샤드에서 빠진 것입니다.
+    """
+    if include_raw:
+        profile = RAW_ARCHIVE_PROFILE
+    if not get_profile(profile)["archive_raw"]:
+        raw_store = None
+    if parse_workers is None:
+        parse_workers = parallel_parse.PARSE_WORKERS
+    checkpoint = DownloadCheckpoint(shard_checkpoint_params(search_params, profile), checkpoint_dir) if checkpoint_dir else None
+    if checkpoint and checkpoint.load():
+        shards, total_hits = checkpoint.shards(search_params), checkpoint.state["total_hits"]
+    else:
+        # 샤드 건수의 합은 나누지 않은 검색의 건수와 맞아야 함 (모자라면 빠진 만큼 받은 건수가 총 건수보다 적게 보고됨)
+        total_hits, error = get_total_hits(api_key, search_params, rate_limiter=rate_limiter)
+        if error:
+            return None, 0, error
+        shards, error = plan_date_shards(api_key, search_params, max_per_shard, rate_limiter, max_workers)
+        if error:
+            return None, 0, error
+        if not shards:
+            return None, 0, NO_RESULTS
+        total_hits = max(total_hits, sum(hits for _, hits in shards))
+        if checkpoint:
+            checkpoint.start(search_params, shards, total_hits)
+
+    if checkpoint:
+        records_file = checkpoint.open_records()
+        remaining = [i for i in range(len(shards)) if i not in checkpoint.state["completed"]]
+        seen_ids = checkpoint.seen_ids()
+        num_processed = checkpoint.state["num_records"]
+        header_written = checkpoint.state["csv_bytes"] > 0
+    else:
+        records_file = tempfile.NamedTemporaryFile(mode='w+', delete=False, newline='', encoding='utf-8-sig')
+        remaining, seen_ids, num_processed, header_written = list(range(len(shards))), SeenIds(), 0, False
+
+    def on_page(j):
+        if checkpoint:
+            checkpoint.record_page(records_file, num_processed)
+
+    def on_shard_done(j):
+        if checkpoint:
+            checkpoint.complete_shard(remaining[j])
+
+    start_time = time.time()
+    csv_writer = None
 
-            data = response.json()
-            scroll_id = data.get('scroll_id')
-            patents = data.get('data', [])
+    # Streamlit 위젯 갱신(progress_callback)은 반드시 호출한 스레드에서 하도록, 쓰기는 여기서만 처리
+    pages = iter_sharded_patent_pages(api_key, [shards[i][0] for i in remaining], max_workers=max_workers,
+                                      rate_limiter=rate_limiter, seen_ids=seen_ids,
+                                      on_page=on_page, on_shard_done=on_shard_done, raw_store=raw_store, stop_event=stop_event,
+                                      profile=profile, parse_workers=parse_workers,
+                                      parse_page=_page_parser(include_raw, profile, raw_store, parse_workers))
+    try:
+        for records, _ in pages:
+            if csv_writer is None:
+                # 이어받을 때는 기존 헤더를 따름 (이전 버전 체크포인트에 없던 컬럼은 버리고, Parquet 변환 때 null로 채움)
+                fieldnames = checkpoint.header() if header_written else records[0].keys()
+                csv_writer = csv.DictWriter(records_file, fieldnames=fieldnames, extrasaction='ignore')
+                if not header_written:
+                    csv_writer.writeheader()
+            with span("write", len(records)):
+                csv_writer.writerows(records)
+            num_processed += len(records)
+            if on_records:
+                with span("live_aggregates", len(records)):
+                    on_records(records)
 
-        temp_file.close()
-        return temp_filename, total_hits, None
+            if progress_callback:
+                progress_callback(num_processed, total_hits, time.time() - start_time)
+
+        records_file.close()
+        if not num_processed:
+            checkpoint.discard() if checkpoint else os.remove(records_file.name)
+            return None, 0, NO_RESULTS
+        csv_path = records_file.name
+        if checkpoint:
+            fd, csv_path = tempfile.mkstemp(suffix='.csv')
+            os.close(fd)
+            checkpoint.finish(csv_path)
+        if output_format == 'parquet':
+            fd, parquet_path = tempfile.mkstemp(suffix='.parquet')
+            os.close(fd)
+            with span("convert", num_processed):
+                csv_to_parquet(csv_path, parquet_path)
+            os.remove(csv_path)
+            return parquet_path, total_hits, None
+        return csv_path, total_hits, None
 
     except Exception as e:
-        if 'temp_file' in locals() and not temp_file.closed:
-            temp_file.close()
-        if 'temp_filename' in locals() and os.path.exists(temp_filename):
-            os.remove(temp_filename)
-        return None, 0, f"Error: {e}"
\ No newline at end of file
+        if not records_file.closed:
+            records_file.close()
+        if checkpoint:
+            return None, 0, f"Error: {e} (같은 조건으로 다시 다운로드하면 {num_processed:,}건 이후부터 이어받습니다.)"
+        if os.path.exists(records_file.name):
+            os.remove(records_file.name)
+        return None, 0, f"Error: {e}"
+
+    finally:
+        pages.close()
@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE_PATH = os.environ.get("LENS_PATENT_STORE", os.path.join(os.path.expanduser("~"), ".lenspatent", "patents.sqlite3"))
+DEFAULT_MAX_AGE_DAYS = 7
+# 저장하는 parse_patent 행의 형식 버전. 컬럼이 바뀌면 올려서, 이전 버전 행은 누락으로 보고 다시 받게 합니다.
+# (1: 버전 컬럼 이전, 2: simple_family_id/cited_lens_ids 추가)
+ROW_SCHEMA_VERSION = 2
+
+
+# ==============================================================================
+#  lens_id 기준 로컬 특허 저장소 (SQLite)
+# ==============================================================================
+class PatentStore:
+    """parse_patent 결과와 수집 시각을 lens_id 단위로 디스크에 보관해, 겹치는 검색에서 재다운로드를 피합니다."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS patents (
+                lens_id    TEXT PRIMARY KEY,
+                row_json   TEXT NOT NULL,
+                raw_bytes  INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                schema_version INTEGER NOT NULL DEFAULT 1
+            )""")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(patents)")}
+        if "schema_version" not in columns: # 버전 컬럼 이전에 만든 저장소
+            self._conn.execute("ALTER TABLE patents ADD COLUMN schema_version INTEGER NOT NULL DEFAULT 1")
+        self._conn.commit()
+        self.last_stats = None
+
+    def missing_ids(self, lens_ids):
+        """저장소에 없거나 max_age_days보다 오래되었거나 이전 형식(ROW_SCHEMA_VERSION)인 lens_id 목록을 (입력 순서대로) 돌려주고 적중 통계를 기록합니다."""
+        fresh_after = time.time() - self.max_age_seconds
+        fresh = {}
+        for chunk in _chunks(lens_ids, 500):
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT lens_id, raw_bytes FROM patents WHERE fetched_at >= ? AND schema_version = ? AND lens_id IN ({placeholders})",
+                    [fresh_after, ROW_SCHEMA_VERSION, *chunk]).fetchall()
+            fresh.update(rows)
+
+        missing = [lens_id for lens_id in lens_ids if lens_id not in fresh]
+        total = len(lens_ids)
+        self.last_stats = {
+            "total": total,
+            "hits": total - len(missing),
+            "misses": len(missing),
+            "hit_rate": (total - len(missing)) / total if total else 0.0,
+            "bytes_saved": sum(fresh.values()),
+        }
+        return missing
+
+    def put(self, patent_jsons, parse_page, raw_texts=None):
+        """API 원본 특허 목록을 parse_page(페이지 단위 파서)로 파싱해 저장(덮어쓰기)하고, 파싱된 행 목록을 돌려줍니다.
+
+        raw_texts(문서마다 이미 직렬화한 원본 JSON 문자열)를 주면 원본 크기(raw_bytes)를 재려고 다시 직렬화하지 않습니다.
+        """
+        now = time.time()
+        records = []
+        rows = parse_page(patent_jsons)
+        if raw_texts is None:
+            raw_texts = [json.dumps(p, ensure_ascii=False) for p in patent_jsons]
+        for p, row, raw_text in zip(patent_jsons, rows, raw_texts):
+            raw_bytes = len(raw_text.encode('utf-8'))
+            records.append((p.get('lens_id'), json.dumps(row, ensure_ascii=False), raw_bytes, now, ROW_SCHEMA_VERSION))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO patents (lens_id, row_json, raw_bytes, fetched_at, schema_version) VALUES (?, ?, ?, ?, ?)", records)
+            self._conn.commit()
+        return rows
+
+    def iter_rows(self, lens_ids):
+        """lens_id 순서대로 저장된 파싱 결과(dict)를 돌려줍니다. 저장소에 없는 id는 건너뜁니다."""
+        for chunk in _chunks(lens_ids, 500):
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = dict(self._conn.execute(
+                    f"SELECT lens_id, row_json FROM patents WHERE lens_id IN ({placeholders})", chunk).fetchall())
+            for lens_id in chunk:
+                if lens_id in rows:
+                    row = json.loads(rows[lens_id])
+                    row.pop('raw_json', None) # 원본 JSON은 RawDocumentStore에서 따로 관리 (이전 버전 행 호환)
+                    for column in ('simple_family_id', 'cited_lens_ids'): # 이전 형식 행 (missing_ids가 누락으로 보므로 보통 다시 받아 채워짐)
+                        row.setdefault(column, None)
+                    yield row
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -0,0 +1,86 @@
+# ==============================================================================
+#  필드 투영(projection) 프로필: 용도별로 API에 요청할 최소 include 경로
+# ==============================================================================
+# null_columns: 그 프로필로는 채울 수 없는 parse_patent 컬럼. 파싱 결과에서 None으로 둡니다.
+# (요청하지 않은 필드가 0이나 'N/A'로 채워져 실제 값처럼 보이지 않도록)
+# archive_raw=True인 프로필로 받은 원본만 RawDocumentStore에 보관합니다. (부분 문서가 전체 문서를 덮어쓰지 않도록)
+FULL_INCLUDE = [
+    "lens_id", "jurisdiction", "doc_number", "date_published", "abstract",
+    "biblio.invention_title", "biblio.parties.applicants", "biblio.parties.inventors",
+    "biblio.application_reference", "biblio.priority_claims",
+    "biblio.classifications_ipcr", "biblio.classifications_cpc",
+    "biblio.cited_by.patent_count", "biblio.references_cited.patent_count", "biblio.references_cited.npl_count",
+    "biblio.references_cited.citations.patcit.lens_id",
+    "legal_status.granted", "legal_status.grant_date", "legal_status.patent_status",
+    "families.simple_family.size", "families.simple_family.members.lens_id",
+]
+
+PROFILES = {
+    "dashboard": {
+        "include": ["lens_id", "biblio.invention_title", "biblio.parties.applicants", "biblio.application_reference",
+                    "biblio.priority_claims", "biblio.classifications_ipcr", "biblio.cited_by.patent_count",
+                    "families.simple_family.members.lens_id"],
+        "null_columns": ('abstract', 'inventors', 'publication_date', 'grant_date', 'publication_number', 'jurisdiction',
+                         'cpc_classifications', 'is_granted', 'patent_status', 'citation_patent_count', 'citation_npl_count',
+                         'total_citations', 'cited_lens_ids', 'citations_per_year', 'science_linkage_ratio', 'time_to_grant_days',
+                         'simple_family_size'),
+        "archive_raw": False,
+    },
+    "export-lite": {
+        "include": [path for path in FULL_INCLUDE if path not in ("abstract", "biblio.parties.inventors")],
+        "null_columns": ('abstract', 'inventors'),
+        "archive_raw": False,
+    },
+    "full": {
+        "include": FULL_INCLUDE,
+        "null_columns": (),
+        "archive_raw": False,
+    },
+    "raw archive": {
+        "include": ["lens_id", "jurisdiction", "doc_number", "date_published", "biblio", "legal_status", "families", "abstract"],
+        "null_columns": (),
+        "archive_raw": True,
+    },
+}
+DEFAULT_PROFILE = "full"
+RAW_ARCHIVE_PROFILE = "raw archive"
+
+PROFILE_LABELS = {
+    "dashboard": "대시보드용 (최소 필드)",
+    "export-lite": "가벼운 내보내기 (초록/발명자 제외)",
+    "full": "전체 분석 필드",
+    "raw archive": "원본 보관 (전체 문서, 원본 보관소에 저장)",
+}
+
+
+def get_profile(name):
+    """프로필 이름 -> 설정 dict. 모르는 이름이면 ValueError."""
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"알 수 없는 projection 프로필: {name} (사용 가능: {', '.join(PROFILES)})") from None
+
+
+def covers_all_columns(name):
+    """프로필이 parse_patent의 모든 컬럼을 채우는지 (로컬 특허 저장소에 넣어도 되는지)."""
+    return not get_profile(name)["null_columns"]
+
+
+def project_document(doc, include):
+    """문서에서 include 경로('a.b.c')만 남긴 사본을 만듭니다. (목업 서버/전송량 추정용, 배열은 원소마다 적용)"""
+    tree = {}
+    for path in include:
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return _project(doc, tree)
+
+
+def _project(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], subtree) for key, subtree in tree.items() if key in value}
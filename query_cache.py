@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ENTRIES = 256
+
+
+def make_cache_key(query, size=None, include=None):
+    """build_query 결과와 size/include를 정렬된 JSON으로 만든 뒤 해시해 캐시 키로 씁니다."""
+    canonical = json.dumps({"query": query, "size": size, "include": include},
+                           sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+# ==============================================================================
+#  검색 결과 캐시 (메모리 LRU + 선택적 디스크 계층, TTL 만료)
+# ==============================================================================
+class QueryCache:
+    """get_total_hits / search_first_page 응답을 TTL 동안 보관합니다.
+
+    메모리 계층은 max_entries 개까지만 두고 가장 오래 안 쓴 항목부터 버립니다(LRU).
+    disk_path를 주면 SQLite 파일을 두 번째 계층으로 사용해 여러 세션/프로세스가 결과를 공유합니다.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, disk_path=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # key -> (만료 시각, 값)
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path:
+            if os.path.dirname(disk_path):
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, timeout=10)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("CREATE TABLE IF NOT EXISTS query_cache (key TEXT PRIMARY KEY, value_json TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._disk.commit()
+
+    def get(self, key):
+        """캐시된 값을 돌려줍니다. 없거나 만료되었으면 None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+
+            if self._disk is None:
+                return None
+            row = self._disk.execute("SELECT value_json, expires_at FROM query_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            return value
+
+    def set(self, key, value):
+        """값을 저장합니다. value는 JSON으로 직렬화할 수 있어야 합니다(디스크 계층 공유용)."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._disk is not None:
+                self._disk.execute("INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?)",
+                                   (key, json.dumps(value, ensure_ascii=False), expires_at))
+                self._disk.commit()
+
+    def invalidate(self, key=None):
+        """key 하나, 또는 key를 생략하면 캐시 전체(디스크 포함)를 비웁니다."""
+        with self._lock:
+            if key is None:
+                self._memory.clear()
+                if self._disk is not None:
+                    self._disk.execute("DELETE FROM query_cache")
+            else:
+                self._memory.pop(key, None)
+                if self._disk is not None:
+                    self._disk.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+            if self._disk is not None:
+                self._disk.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
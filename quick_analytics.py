@@ -0,0 +1,106 @@
+import json
+
+import pandas as pd
+import requests
+
+from batch_parser import parse_patents_batch
+from dashboard_metrics import TOP_APPLICANTS, TOP_CATEGORIES, TOP_CITED, TOP_CITED_COLUMNS
+from lens_client import get_client
+from patent_searcher import build_query
+from query_cache import make_cache_key
+
+IPC_SYMBOL_BUCKETS = 500    # IPC 4단위 분포를 만들기 위해 받아오는 전체 기호 버킷 수
+
+# 대시보드 지표에 대응하는 Lens 집계 요청 (출원인/국적/IPC는 특허의 모든 출원인/분류 기준이라 근사치)
+QUICK_AGGREGATIONS = {
+    "unique_applicants": {"cardinality": {"field": "applicant.name.exact"}},
+    "avg_citations": {"avg": {"field": "cited_by.patent_count"}},
+    "yearly_counts": {"date_histogram": {"field": "application_reference.date", "interval": "year", "min_doc_count": 1}},
+    "top_applicants": {"terms": {"field": "applicant.name.exact", "size": TOP_APPLICANTS}},
+    "nationality_counts": {"terms": {"field": "applicant.residence", "size": TOP_CATEGORIES}},
+    "ipc_symbols": {"terms": {"field": "class_ipcr.symbol", "size": IPC_SYMBOL_BUCKETS}},
+}
+# 피인용 Top 10에 필요한 필드만 받음
+QUICK_TOP_CITED_INCLUDE = ["lens_id", "biblio.invention_title", "biblio.parties.applicants",
+                           "biblio.application_reference", "biblio.cited_by.patent_count"]
+
+
+def build_quick_payload(search_params):
+    """레코드 전체 대신 집계와 피인용순 상위 TOP_CITED건만 요청하는 payload를 만듭니다."""
+    return {
+        "query": build_query(search_params),
+        "size": TOP_CITED,
+        "sort": [{"cited_by.patent_count": "desc"}],
+        "include": QUICK_TOP_CITED_INCLUDE,
+        "aggregations": QUICK_AGGREGATIONS,
+    }
+
+
+def _bucket_counts(aggregation, name, key=lambda bucket: bucket["key"]):
+    buckets = (aggregation or {}).get("buckets", [])
+    return pd.Series([bucket["doc_count"] for bucket in buckets], index=pd.Index([key(b) for b in buckets], dtype=object, name=name),
+                     dtype='int64', name='count')
+
+
+def _bucket_year(bucket):
+    if bucket.get("key_as_string"):
+        return int(bucket["key_as_string"][:4])
+    return pd.Timestamp(bucket["key"], unit='ms').year
+
+
+# ==============================================================================
+#  Lens 집계 응답 -> 대시보드 지표 (compute_dashboard_metrics와 같은 형태)
+# ==============================================================================
+def metrics_from_aggregations(response):
+    aggregations = response.get("aggregations", {})
+
+    yearly_counts = _bucket_counts(aggregations.get("yearly_counts"), 'application_year', _bucket_year)
+    yearly_counts.index = yearly_counts.index.astype('int64')
+
+    # IPC 기호(예: H01M10/0525)를 4단위(H01M)로 묶어 상위 TOP_CATEGORIES개
+    ipc_symbols = _bucket_counts(aggregations.get("ipc_symbols"), 'main_ipc_field')
+    ipc_counts = ipc_symbols.groupby(ipc_symbols.index.str[:4]).sum().nlargest(TOP_CATEGORIES)
+    ipc_counts.index = ipc_counts.index.astype(object).rename('main_ipc_field')
+
+    rows = parse_patents_batch(response.get("data", []))
+    avg_citations = (aggregations.get("avg_citations") or {}).get("value")
+    return {
+        "total": response.get("total", 0),
+        "unique_applicants": int((aggregations.get("unique_applicants") or {}).get("value") or 0),
+        "avg_citations": float('nan') if avg_citations is None else avg_citations,
+        "yearly_counts": yearly_counts.sort_index(),
+        "top_applicants": _bucket_counts(aggregations.get("top_applicants"), 'applicants'),
+        "nationality_counts": _bucket_counts(aggregations.get("nationality_counts"), 'applicant_nationality'),
+        "ipc_counts": ipc_counts,
+        "top_cited": pd.DataFrame(rows, columns=TOP_CITED_COLUMNS),
+        "approximate": True,
+    }
+
+
+def fetch_quick_metrics(api_key, search_params, cache=None):
+    """요청 한 번으로 대시보드 지표를 만듭니다. 반환값: (지표 dict, 에러 메시지)
+
+    cache(QueryCache)를 넘기면 같은 검색식의 집계 응답을 TTL 동안 재사용합니다.
+    """
+    payload = build_quick_payload(search_params)
+    cache_key = make_cache_key({"query": payload["query"], "sort": payload["sort"], "aggregations": payload["aggregations"]},
+                               payload["size"], payload["include"])
+    response = cache.get(cache_key) if cache is not None else None
+
+    try:
+        if response is None:
+            response = get_client(api_key).search(payload) or {}
+            if cache is not None:
+                cache.set(cache_key, response)
+        return metrics_from_aggregations(response), None
+
+    except requests.exceptions.HTTPError as e:
+        try:
+            error_details = e.response.json()
+            error_message = f"API 에러 ({e.response.status_code}): {error_details.get('message', e.response.text)}"
+        except json.JSONDecodeError:
+            error_message = f"API 에러 ({e.response.status_code}): {e.response.text}"
+        return None, error_message
+
+    except Exception as e:
+        return None, f"예상치 못한 에러 발생: {str(e)}"
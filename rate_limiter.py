@@ -0,0 +1,135 @@
+import hashlib
+import random
+import threading
+import time
+
+from instrumentation import record_retry, record_wait
+
+# Lens API가 응답마다 돌려주는 요청 한도 헤더
+REMAINING_PER_MINUTE_HEADER = "x-rate-limit-remaining-request-per-minute"
+RETRY_AFTER_HEADERS = ("x-rate-limit-retry-after-seconds", "retry-after")
+
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+DEFAULT_MAX_RETRIES = 5
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+# ==============================================================================
+#  API 키 단위 요청 속도 제한기 (헤더 기반 토큰 버킷, 여러 스레드/샤드가 함께 사용)
+# ==============================================================================
+class RateLimiter:
+    """하나의 API 키에 대한 요청 한도를 여러 스레드가 나눠 쓰도록 토큰 버킷으로 호출 속도를 조절합니다.
+
+    처음에는 requests_per_second로 시작하고, 응답의 남은 요청 수 헤더를 보면서
+    실제 분당 한도를 학습해 그 속도에 가깝게 보냅니다.
+    """
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, burst=1,
+                 backoff_base=1.0, backoff_cap=60.0):
+        self.rate = requests_per_second
+        self.capacity = burst
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limit_per_minute = None     # 헤더로 학습한 분당 한도
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """토큰 하나를 예약하고, 그 토큰이 채워지는 시각까지 대기합니다. (요청 직전에 호출)"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait_time = max(self._paused_until - now, -self._tokens / self.rate if self._tokens < 0 else 0.0)
+        if wait_time > 0:
+            record_wait(wait_time)
+            time.sleep(wait_time)
+
+    def pause(self, seconds):
+        """429 응답 등으로 쉬어야 할 때, 모든 스레드의 다음 요청 시각을 함께 미룹니다."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """응답 헤더의 남은 요청 수로 분당 한도를 학습하고, 남은 토큰을 서버 기준에 맞춥니다."""
+        remaining = _header_number(headers, (REMAINING_PER_MINUTE_HEADER,))
+        if remaining is None:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.limit_per_minute is None or remaining + 1 > self.limit_per_minute:
+                self.limit_per_minute = remaining + 1
+                self.rate = self.limit_per_minute / 60.0
+                self.capacity = max(1, self.limit_per_minute // 6) # 최대 10초 분량까지만 몰아서 보냄
+            self._tokens = min(self._tokens, remaining)
+
+    def retry_delay(self, response, attempt):
+        """재시도 전 대기 시간: retry-after 헤더가 있으면 그 값, 없으면 지수 백오프 + 지터."""
+        retry_after = _header_number(getattr(response, 'headers', None), RETRY_AFTER_HEADERS)
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+
+def call_with_retry(send, rate_limiter, max_retries=DEFAULT_MAX_RETRIES, retry_exceptions=()):
+    """rate_limiter 속도에 맞춰 send()를 호출하고, 429/5xx 및 retry_exceptions는 max_retries번까지 재시도합니다.
+
+    429는 같은 키를 쓰는 모든 스레드를 함께 멈추고, 5xx/네트워크 오류는 호출한 스레드만 기다립니다.
+    재시도를 다 써도 실패하면 마지막 응답을 그대로 돌려주거나(호출 측 raise_for_status) 예외를 다시 던집니다.
+    """
+    for attempt in range(max_retries + 1):
+        rate_limiter.wait()
+        try:
+            response = send()
+        except retry_exceptions as e:
+            if attempt == max_retries:
+                raise
+            delay = rate_limiter.retry_delay(None, attempt)
+            record_retry(type(e).__name__, delay)
+            time.sleep(delay)
+            continue
+
+        rate_limiter.update_from_headers(response.headers)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+            return response
+
+        delay = rate_limiter.retry_delay(response, attempt)
+        record_retry(response.status_code, delay, paused=response.status_code == 429)
+        if response.status_code == 429:
+            rate_limiter.pause(delay)
+        else:
+            time.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key):
+    """API 키마다 하나의 RateLimiter를 돌려줍니다. (같은 키를 쓰는 모든 호출/스레드가 한도를 공유)"""
+    key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter()
+        return _limiters[key]
+
+
+def _header_number(headers, names):
+    if not headers:
+        return None
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            continue
+    return None
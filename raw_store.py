@@ -0,0 +1,100 @@
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstandard가 없으면 표준 라이브러리 zlib으로 압축
+    zstandard = None
+
+DEFAULT_RAW_STORE_PATH = os.environ.get("LENS_RAW_STORE", os.path.join(os.path.expanduser("~"), ".lenspatent", "raw_docs.sqlite3"))
+
+
+def _compress(data):
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=3).compress(data)
+    return 'zlib', zlib.compress(data, 6)
+
+
+def _decompress(codec, blob):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def encode_documents(patent_jsons, dumps=None, texts=None):
+    """원본 특허 목록 -> 보관용 (lens_id, codec, 압축 blob) 목록. dumps(문서 -> str)를 주면 json.dumps 대신 씁니다.
+
+    texts(문서마다 이미 직렬화한 JSON 문자열)를 주면 다시 직렬화하지 않습니다.
+    """
+    if texts is None:
+        dumps = dumps or (lambda p: json.dumps(p, ensure_ascii=False))
+        texts = [dumps(p) for p in patent_jsons]
+    return [(p.get('lens_id'), *_compress(text.encode('utf-8'))) for p, text in zip(patent_jsons, texts)]
+
+
+# ==============================================================================
+#  원본 특허 JSON 보관소 (lens_id별 압축 blob, 필요할 때만 읽음)
+# ==============================================================================
+class RawDocumentStore:
+    """API 원본 JSON을 표 형태 결과와 분리해 lens_id 단위로 압축 저장합니다.
+
+    표(CSV/Parquet/엑셀/대시보드)에는 파생 필드만 남기고, 원본은 사용자가 특정 특허를 열어볼 때 get()으로 꺼냅니다.
+    """
+
+    def __init__(self, path=DEFAULT_RAW_STORE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS raw_docs (lens_id TEXT PRIMARY KEY, codec TEXT NOT NULL, doc BLOB NOT NULL)")
+        self._conn.commit()
+
+    def put_many(self, patent_jsons, texts=None):
+        """API 원본 특허 목록을 압축해 저장(덮어쓰기)합니다. texts는 encode_documents와 같습니다."""
+        self.put_encoded(encode_documents(patent_jsons, texts=texts))
+
+    def put_encoded(self, rows):
+        """encode_documents로 미리 압축한 (lens_id, codec, blob) 목록을 저장합니다. (병렬 파싱 워커가 압축한 경우)"""
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO raw_docs VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def missing_ids(self, lens_ids):
+        """보관소에 원본이 없는 lens_id 목록 (입력 순서 유지)"""
+        lens_ids = list(lens_ids)
+        found = set()
+        for i in range(0, len(lens_ids), 500):
+            chunk = lens_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT lens_id FROM raw_docs WHERE lens_id IN ({placeholders})", chunk))
+        return [lens_id for lens_id in lens_ids if lens_id not in found]
+
+    def get_json(self, lens_id):
+        """원본 JSON 문자열 하나를 돌려줍니다. 없으면 None."""
+        with self._lock:
+            row = self._conn.execute("SELECT codec, doc FROM raw_docs WHERE lens_id = ?", (lens_id,)).fetchone()
+        return _decompress(*row).decode('utf-8') if row else None
+
+    def get(self, lens_id):
+        """원본 특허 JSON(dict) 하나를 돌려줍니다. 없으면 None."""
+        text = self.get_json(lens_id)
+        return json.loads(text) if text is not None else None
+
+    def get_many_json(self, lens_ids):
+        """{lens_id: 원본 JSON 문자열} (없는 id는 빠짐)"""
+        result = {}
+        lens_ids = list(lens_ids)
+        for i in range(0, len(lens_ids), 500):
+            chunk = lens_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(f"SELECT lens_id, codec, doc FROM raw_docs WHERE lens_id IN ({placeholders})", chunk).fetchall()
+            result.update((lens_id, _decompress(codec, doc).decode('utf-8')) for lens_id, codec, doc in rows)
+        return result
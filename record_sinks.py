@@ -0,0 +1,170 @@
+import csv
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# ==============================================================================
+#  parse_patent 필드에 맞춘 명시적 스키마 (날짜는 date, 건수는 int, 국가/분류는 범주형)
+# ==============================================================================
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+PATENT_SCHEMA = pa.schema([
+    ('title', pa.string()),
+    ('abstract', pa.string()),
+    ('applicants', pa.string()),
+    ('inventors', pa.string()),
+    ('application_date', pa.date32()),
+    ('publication_date', pa.date32()),
+    ('grant_date', pa.date32()),
+    ('application_year', pa.int16()),
+    ('publication_number', pa.string()),
+    ('application_number', pa.string()),
+    ('jurisdiction', _CATEGORY),
+    ('applicant_nationality', _CATEGORY),
+    ('SOURCE_applicant_residence', _CATEGORY),
+    ('SOURCE_priority_country', _CATEGORY),
+    ('main_ipc_field', _CATEGORY),
+    ('ipc_classifications', pa.string()),
+    ('cpc_classifications', pa.string()),
+    ('lens_id', pa.string()),
+    ('is_granted', pa.bool_()),
+    ('patent_status', _CATEGORY),
+    ('cited_by_patent_count', pa.int32()),
+    ('citation_patent_count', pa.int32()),
+    ('citation_npl_count', pa.int32()),
+    ('total_citations', pa.int32()),
+    ('cited_lens_ids', pa.string()),       # 인용한 특허의 lens_id ('; '로 연결, 인용 그래프용)
+    ('citations_per_year', pa.float64()),
+    ('science_linkage_ratio', pa.float64()),
+    ('time_to_grant_days', pa.int32()),
+    ('num_applicants', pa.int16()),
+    ('is_co_owned', pa.bool_()),
+    ('simple_family_size', pa.int32()),
+    ('simple_family_id', pa.string()),     # 패밀리 구성원 lens_id 중 가장 작은 값 (패밀리 단위 집계용)
+])
+# 원본 JSON을 내보내기에 포함하는 경우(include_raw=True)의 스키마
+PATENT_SCHEMA_WITH_RAW = PATENT_SCHEMA.append(pa.field('raw_json', pa.string()))
+
+DATE_FIELDS = ('application_date', 'publication_date', 'grant_date')
+# CSV를 pd.read_csv로 읽을 때처럼 빈 문자열과 'N/A'는 결측으로 둡니다. ('NA'=나미비아 국가코드는 유지)
+NULL_VALUES = ('', 'N/A')
+ROW_GROUP_ROWS = 10000
+
+
+def _pandas_types():
+    """정수 컬럼은 결측이 있어도 float로 바뀌지 않도록 pandas nullable 정수로 읽습니다.
+    (pandas는 load_patents를 부를 때만 import: 배치 CLI는 pandas 없이 시작)
+    """
+    import pandas as pd
+    return {pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype()}
+
+
+def _to_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def _to_year(value):
+    if isinstance(value, int):
+        return value
+    return int(value) if isinstance(value, str) and value.isdigit() else None
+
+
+def records_to_table(records, schema=PATENT_SCHEMA):
+    """parse_patent 결과 목록을 컬럼 단위로 모아 스키마에 맞는 Arrow 테이블로 바꿉니다."""
+    columns = {}
+    for field in schema:
+        values = [r.get(field.name) for r in records]
+        if field.name in DATE_FIELDS:
+            values = [_to_date(v) for v in values]
+        elif field.name == 'application_year':
+            values = [_to_year(v) for v in values]
+        elif pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+            values = [None if v in NULL_VALUES else v for v in values]
+        columns[field.name] = pa.array(values, type=field.type)
+    return pa.table(columns, schema=schema)
+
+
+# ==============================================================================
+#  레코드 출력 대상: writerows(records) / close() 로 CSV와 Parquet을 같은 방식으로 씁니다.
+# ==============================================================================
+class CsvSink:
+    """첫 레코드의 키로 헤더를 쓰는 CSV 출력."""
+
+    def __init__(self, file):
+        self.file = file
+        self._writer = None
+
+    def writerows(self, records):
+        if self._writer is None:
+            self._writer = csv.DictWriter(self.file, fieldnames=records[0].keys())
+            self._writer.writeheader()
+        self._writer.writerows(records)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """레코드를 ROW_GROUP_ROWS 단위로 모아 Parquet row group으로 흘려 씁니다. (전체를 메모리에 들고 있지 않음)"""
+
+    def __init__(self, path, schema=PATENT_SCHEMA, row_group_rows=ROW_GROUP_ROWS, compression='zstd'):
+        self.path = path
+        self.schema = schema
+        self.row_group_rows = row_group_rows
+        self._writer = pq.ParquetWriter(path, schema, compression=compression)
+        self._buffer = []
+
+    def writerows(self, records):
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(records_to_table(self._buffer, self.schema))
+            self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def csv_to_parquet(csv_path, parquet_path):
+    """CSV를 블록 단위로 읽어 스키마대로 변환하며 Parquet으로 옮깁니다. (pandas 경유 없이 일정한 메모리)
+
+    CSV에 'raw_json' 컬럼이 있으면 PATENT_SCHEMA_WITH_RAW, 없으면 PATENT_SCHEMA를 씁니다.
+    """
+    string_schema = {f.name: (pa.string() if pa.types.is_dictionary(f.type) else f.type) for f in PATENT_SCHEMA_WITH_RAW}
+    reader = pa_csv.open_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(column_types=string_schema, null_values=list(NULL_VALUES),
+                                              strings_can_be_null=True),
+    )
+    schema = PATENT_SCHEMA_WITH_RAW if 'raw_json' in reader.schema.names else PATENT_SCHEMA
+    with pq.ParquetWriter(parquet_path, schema, compression='zstd') as writer:
+        for batch in reader:
+            writer.write_table(conform_to_schema(pa.Table.from_batches([batch]), schema))
+
+
+def conform_to_schema(table, schema=PATENT_SCHEMA):
+    """테이블을 스키마의 컬럼 순서/타입으로 맞춥니다. 이전 버전 파일(체크포인트, 저장된 검색 증분)에 없던 컬럼은 null로 채웁니다."""
+    for field in schema:
+        if field.name not in table.column_names:
+            table = table.append_column(field.name, pa.nulls(table.num_rows, pa.string()))
+    return table.select(schema.names).cast(schema)
+
+
+def load_patents(path, columns=None, read_dictionary=None):
+    """Parquet을 메모리 맵으로 열어 DataFrame으로 읽습니다. 범주형 컬럼은 pandas category가 됩니다.
+
+    columns로 읽을 컬럼을 고르고, read_dictionary에 준 문자열 컬럼은 사전 인코딩(category)으로 읽습니다.
+    """
+    table = pq.read_table(path, columns=columns, memory_map=True, read_dictionary=read_dictionary)
+    return table.to_pandas(types_mapper=_pandas_types().get, date_as_object=False, split_blocks=True, self_destruct=True)
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from dedup import SeenIds
+from patent_searcher import NO_RESULTS, save_all_patents_sharded
+from projections import DEFAULT_PROFILE, get_profile
+from record_sinks import PATENT_SCHEMA, conform_to_schema
+
+DEFAULT_SAVED_SEARCH_DIR = os.environ.get("LENS_SAVED_SEARCH_DIR", os.path.join(os.path.expanduser("~"), ".lenspatent", "saved_searches"))
+REFRESH_OVERLAP_DAYS = 7   # 워터마크보다 이만큼 앞에서부터 다시 훑음 (공개일보다 늦게 색인되는 특허를 놓치지 않도록)
+MAX_PARTS = 8              # 증분 파일이 이보다 많아지면 하나로 합침 (불러오기 비용이 새로 고침 횟수에 비례하지 않도록)
+
+
+def _key_hash(api_key):
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+# ==============================================================================
+#  저장된 검색과 증분 동기화 (새로 고침 비용은 새로 공개된 특허 수에 비례)
+# ==============================================================================
+class SavedSearchStore:
+    """검색 조건과 워터마크(지금까지 받은 가장 최근 공개일, 받은 lens_id 집합)를 saved_searches/<search_id>/에 남깁니다.
+
+    search.json  : 검색 조건, 프로필, 워터마크, 증분 파일 목록, 마지막 새로 고침 결과
+    seen_ids.txt : 받은 lens_id (한 줄에 하나, 새로 고침마다 새 id만 덧붙임)
+    parts/       : 첫 동기화와 새로 고침마다 받은 레코드 Parquet. 같은 lens_id는 나중 파일이 우선합니다.
+
+    첫 동기화는 전체를 날짜 구간 분할로 받고, 이후 refresh()는 검색식에 date_published 범위 조건을 더해
+    워터마크 이후(REFRESH_OVERLAP_DAYS만큼 겹쳐서) 공개된 특허만 같은 방식으로 받아 증분 파일 하나로 덧붙입니다.
+    """
+
+    def __init__(self, root=DEFAULT_SAVED_SEARCH_DIR):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self._lock = threading.Lock()
+        self._searches = {}
+        self._search_locks = {}   # search_id -> 증분 파일 목록을 바꾸는 동안 잡는 lock
+        self._refreshing = set()
+        for search_id in os.listdir(root):
+            path = os.path.join(root, search_id, "search.json")
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    self._searches[search_id] = json.load(f)
+
+    # --- 등록/조회/삭제 ---
+    def create(self, api_key, search_params, label, profile=DEFAULT_PROFILE):
+        """검색 조건을 저장하고 search_id를 돌려줍니다. 워터마크에 공개일이 필요해 공개일을 받지 않는 프로필은 쓸 수 없습니다."""
+        if 'publication_date' in get_profile(profile)["null_columns"]:
+            raise ValueError(f"'{profile}' 프로필은 공개일을 받지 않아 증분 동기화에 쓸 수 없습니다.")
+        search_id = uuid.uuid4().hex[:12]
+        search = {
+            "search_id": search_id, "key_hash": _key_hash(api_key), "label": label, "profile": profile,
+            "search_params": {k: v for k, v in search_params.items() if k not in ("shard_range", "published_since")},
+            "watermark": None, "num_records": 0, "parts": [], "next_part": 0,
+            "created_at": time.time(), "refreshed_at": None, "last_delta": None,
+        }
+        os.makedirs(os.path.join(self.root, search_id, "parts"), exist_ok=True)
+        with self._lock:
+            self._searches[search_id] = search
+            self._save(search)
+        return search_id
+
+    def get(self, search_id):
+        with self._lock:
+            search = self._searches.get(search_id)
+            return dict(search) if search else None
+
+    def list_searches(self, api_key):
+        """해당 API 키로 저장한 검색 목록 (최근 것부터)."""
+        key_hash = _key_hash(api_key)
+        with self._lock:
+            searches = [dict(search) for search in self._searches.values() if search["key_hash"] == key_hash]
+        return sorted(searches, key=lambda search: search["created_at"], reverse=True)
+
+    def delete(self, search_id):
+        with self._lock:
+            if search_id in self._refreshing or self._searches.pop(search_id, None) is None:
+                return
+        shutil.rmtree(os.path.join(self.root, search_id), ignore_errors=True)
+
+    def delta_params(self, search_id):
+        """다음 새로 고침에 쓸 검색 조건. 아직 동기화하지 않았으면 원래 검색 조건 그대로입니다."""
+        search = self.get(search_id)
+        if not search["watermark"]:
+            return dict(search["search_params"])
+        since = date.fromisoformat(search["watermark"]) - timedelta(days=REFRESH_OVERLAP_DAYS)
+        return dict(search["search_params"], published_since=since.isoformat())
+
+    # --- 동기화 ---
+    def refresh(self, api_key, search_id, progress_callback=None, raw_store=None, checkpoint_dir=None,
+                stop_event=None, on_records=None):
+        """워터마크 이후 공개된 특허를 받아 데이터셋에 덧붙입니다. 반환값: (이번에 받은 레코드 Parquet 임시 경로, 총 건수, 에러 메시지)
+
+        새로 공개된 특허가 없으면 (None, 0, None)입니다. 첫 동기화와 증분 모두 건수 제한 없이 날짜 구간 분할로 받습니다.
+        (checkpoint_dir로 이어받기) 받은 건수가 총 건수보다 적으면 받은 것은 덧붙이되 워터마크는 올리지 않습니다.
+        """
+        with self._lock:
+            search = self._searches.get(search_id)
+            if search is None:
+                return None, 0, "저장된 검색이 없습니다."
+            if search_id in self._refreshing:
+                return None, 0, "이미 새로 고침 중입니다."
+            self._refreshing.add(search_id)
+        try:
+            # 증분도 분할 다운로드로 받음: 건수 제한이 있는 경로로 받으면 잘린 특허가 워터마크 뒤로 밀려 다시 받지 못함
+            temp_path, total_hits, error = save_all_patents_sharded(
+                api_key, self.delta_params(search_id), progress_callback=progress_callback, checkpoint_dir=checkpoint_dir,
+                output_format='parquet', raw_store=raw_store, stop_event=stop_event, on_records=on_records, profile=search["profile"])
+            if error == NO_RESULTS:
+                self._record_delta(search_id, None)
+                return None, 0, None
+            if error:
+                return None, total_hits, error
+            self._record_delta(search_id, temp_path, complete=pq.read_metadata(temp_path).num_rows >= total_hits)
+            return temp_path, total_hits, None
+        finally:
+            with self._lock:
+                self._refreshing.discard(search_id)
+
+    def _record_delta(self, search_id, delta_path, complete=True):
+        """받은 레코드를 증분 파일로 복사하고 워터마크/받은 id/통계를 갱신합니다. (받은 건수에 비례하는 작업만 함)
+
+        complete=False(총 건수보다 적게 받음)면 워터마크는 그대로 두어 다음 새로 고침이 같은 구간을 다시 훑습니다.
+        """
+        with self._search_lock(search_id):
+            search = self.get(search_id)
+            fetched = new = 0
+            if delta_path:
+                part_name = f"part-{search['next_part']:05d}.parquet"
+                shutil.copyfile(delta_path, os.path.join(self.root, search_id, "parts", part_name))
+                table = pq.read_table(delta_path, columns=['lens_id', 'publication_date'])
+                seen = self._seen_ids(search_id)
+                new_ids = [lens_id for lens_id in dict.fromkeys(table['lens_id'].to_pylist()) if lens_id and lens_id not in seen]
+                with open(os.path.join(self.root, search_id, "seen_ids.txt"), 'a', encoding='utf-8') as f:
+                    f.writelines(f"{lens_id}\n" for lens_id in new_ids)
+
+                latest = pc.max(table['publication_date']).as_py()
+                if complete and latest and (not search["watermark"] or latest.isoformat() > search["watermark"]):
+                    search["watermark"] = latest.isoformat()
+                search["parts"] = search["parts"] + [part_name]
+                search["next_part"] += 1
+                fetched, new = table.num_rows, len(new_ids)
+            search.update(num_records=search["num_records"] + new, refreshed_at=time.time(),
+                          last_delta={"fetched": fetched, "new": new, "updated": fetched - new})
+            with self._lock:
+                self._searches[search_id] = search
+                self._save(search)
+        if len(search["parts"]) > MAX_PARTS:
+            self._compact(search_id)
+
+    def _seen_ids(self, search_id):
+        path = os.path.join(self.root, search_id, "seen_ids.txt")
+        if not os.path.exists(path):
+            return SeenIds()
+        with open(path, encoding='utf-8') as f:
+            return SeenIds(f.read().split())
+
+    # --- 데이터셋 ---
+    def dataset_path(self, search_id):
+        """저장된 검색의 전체 데이터셋 Parquet 경로 (증분 파일이 여러 개면 먼저 하나로 합침). 받은 것이 없으면 None."""
+        search = self.get(search_id)
+        if search is None or not search["parts"]:
+            return None
+        if len(search["parts"]) > 1:
+            search = self._compact(search_id)
+        return os.path.join(self.root, search_id, "parts", search["parts"][0])
+
+    def _compact(self, search_id):
+        """증분 파일들을 최신 것부터 읽어 lens_id가 처음 나온 행만 남긴 파일 하나로 합칩니다."""
+        with self._search_lock(search_id):
+            search = self.get(search_id)
+            if len(search["parts"]) <= 1:
+                return search
+            parts_dir = os.path.join(self.root, search_id, "parts")
+            part_name = f"part-{search['next_part']:05d}.parquet"
+            tmp_path = os.path.join(parts_dir, part_name + ".tmp")
+            seen = pa.array([], pa.string())
+            with pq.ParquetWriter(tmp_path, PATENT_SCHEMA, compression='zstd') as writer:
+                for name in reversed(search["parts"]):
+                    table = conform_to_schema(pq.read_table(os.path.join(parts_dir, name), memory_map=True))
+                    table = table.filter(pc.invert(pc.is_in(table['lens_id'], value_set=seen)))
+                    seen = pa.concat_arrays([seen, table['lens_id'].combine_chunks()])
+                    writer.write_table(table)
+            os.replace(tmp_path, os.path.join(parts_dir, part_name))
+
+            old_parts = search["parts"]
+            search.update(parts=[part_name], next_part=search["next_part"] + 1, num_records=len(seen))
+            with self._lock:
+                self._searches[search_id] = search
+                self._save(search)
+            for name in old_parts:
+                os.remove(os.path.join(parts_dir, name))
+            return search
+
+    def _search_lock(self, search_id):
+        with self._lock:
+            return self._search_locks.setdefault(search_id, threading.Lock())
+
+    def _save(self, search):
+        """search.json을 임시 파일에 쓴 뒤 교체합니다."""
+        path = os.path.join(self.root, search["search_id"], "search.json")
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(search, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)